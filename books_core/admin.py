@@ -1,6 +1,9 @@
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.forms.models import BaseInlineFormSet
 
 from .models import Author, Genre, Book, BookInstance, Language
+from .pagination import EstimatedCountPaginator
 
 admin.site.register(Genre)
 admin.site.register(Language)
@@ -10,29 +13,83 @@ admin.site.register(Language)
 class AuthorAdmin(admin.ModelAdmin):
     list_display = ('last_name', 'first_name', 'date_of_birth', 'date_of_death')
     fields = ['first_name', 'last_name', ('date_of_birth', 'date_of_death')]
+    # Нужен для autocomplete_fields в BookAdmin
+    search_fields = ('last_name', 'first_name')
+
+
+class PaginatedInlineFormSet(BaseInlineFormSet):
+    """
+    Inline formset showing one page of the related objects, the number comes from page_number.
+    """
+    per_page = 20
+    page_number = 1
+
+    def get_queryset(self):
+        if not hasattr(self, '_queryset'):
+            self.page = Paginator(super().get_queryset(), self.per_page).get_page(self.page_number)
+            self._queryset = list(self.page.object_list)
+        return self._queryset
 
 
 class BooksInstanceInline(admin.TabularInline):
+    """
+    Copies of the book by pages of PaginatedInlineFormSet.per_page (?copies_page=N).
+    """
     model = BookInstance
     extra = 1
+    formset = PaginatedInlineFormSet
+    template = 'admin/books_core/paginated_tabular.html'
+    page_param = 'copies_page'
+    autocomplete_fields = ('borrower',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('borrower').order_by('due_back', 'id')
+
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        formset.page_number = request.GET.get(self.page_param, 1)
+        formset.page_param = self.page_param
+        # Остальные параметры (_changelist_filters) сохраняются в ссылках на страницы
+        query = request.GET.copy()
+        query.pop(self.page_param, None)
+        formset.page_query = f'{query.urlencode()}&' if query else ''
+        return formset
 
 
 @admin.register(Book)
 class BookAdmin(admin.ModelAdmin):
     list_display = ('title', 'author', 'display_genre')
+    list_select_related = ('author',)
+    search_fields = ('title',)
+    autocomplete_fields = ('author',)
     inlines = [BooksInstanceInline]
+    # Полный порядок по индексу book_title_idx, иначе админка добавляет '-pk' и сортирует всю таблицу
+    ordering = ('title', 'id')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        # display_genre берёт жанры из prefetch, а не запросом на каждую строку
+        return super().get_queryset(request).prefetch_related('genre')
 
 
 @admin.register(BookInstance)
 class BookInstanceAdmin(admin.ModelAdmin):
     list_display = ('book', 'status', 'borrower', 'due_back', 'id')
     list_filter = ('status', 'due_back')
+    list_select_related = ('book', 'borrower')
+    autocomplete_fields = ('book', 'borrower')
+    # По индексу bookinst_due_back_idx, см. BookAdmin.ordering
+    ordering = ('due_back', 'id')
+    # Без COUNT(*) по всей таблице на каждой странице списка
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     fieldsets = (
         ('Тестовое название', {
             'fields': ('book', 'imprint', 'id')
         }),
         ('Availability', {
-            'fields': ('status', 'due_back')
+            'fields': ('status', 'due_back', 'borrower')
         }),
     )
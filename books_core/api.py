@@ -0,0 +1,104 @@
+"""
+Read-only REST API of the catalog.
+"""
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.views.decorators.http import condition
+from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.pagination import CursorPagination
+
+from books_core import snapshot, versioning
+from books_core.models import Author, Book, BookInstance
+from books_core.serializers import (
+    AuthorSerializer, BookInstanceSerializer, BooksSerializer, requested_fields,
+)
+
+EXPORT_CHUNK_SIZE = 2000
+
+
+def stream_json(rows):
+    """
+    Renders an iterable of dicts as a JSON array piece by piece, without building the whole document in memory.
+    """
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    yield '['
+    for num, row in enumerate(rows):
+        yield (',\n' if num else '\n') + encoder.encode(row)
+    yield '\n]\n'
+
+
+class BookCursorPagination(CursorPagination):
+    ordering = ('title', 'id')
+    page_size = 50
+
+
+class AuthorCursorPagination(CursorPagination):
+    ordering = ('last_name', 'first_name', 'id')
+    page_size = 50
+
+
+class BookInstanceCursorPagination(CursorPagination):
+    # due_back может быть NULL, курсор DRF по нему не работает
+    ordering = ('id',)
+    page_size = 50
+
+
+class ConditionalReadMixin:
+    """
+    Adds ETag and Last-Modified built from the catalog version and answers conditional GET with 304
+    before any query to the catalog is made.
+    """
+
+    version_namespaces = (versioning.CATALOG,)
+
+    def dispatch(self, request, *args, **kwargs):
+        self.stamps = stamps = versioning.Stamps(*self.version_namespaces)
+        return condition(
+            etag_func=lambda request, *args, **kwargs: stamps.etag(request),
+            last_modified_func=lambda request, *args, **kwargs: stamps.last_modified(),
+        )(super().dispatch)(request, *args, **kwargs)
+
+
+class BookViewSet(ConditionalReadMixin, viewsets.ReadOnlyModelViewSet):
+    serializer_class = BooksSerializer
+    pagination_class = BookCursorPagination
+    # Автор и язык из снимка каталога той же версии, что и ответ
+    version_namespaces = (versioning.CATALOG, versioning.TITLES)
+
+    def get_queryset(self):
+        queryset = Book.objects.all()
+        fields = requested_fields(self.request)
+        # Автор и язык берутся из books_core.snapshot (SnapshotField), жанры загружаются только если запрошены
+        if not fields or 'genre' in fields:
+            queryset = queryset.prefetch_related('genre')
+        return queryset
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page is not None:
+            snapshot.attach(page, key='pk', version=self.stamps.key(versioning.TITLES))
+        return page
+
+    @action(detail=False)
+    def export(self, request):
+        """
+        Все книги одним JSON-массивом, который отдаётся по частям.
+        """
+        rows = (Book.objects.order_by('id')
+                .values('id', 'title', 'isbn', 'summary', 'author__first_name', 'author__last_name', 'language__name')
+                .iterator(chunk_size=EXPORT_CHUNK_SIZE))
+        return StreamingHttpResponse(stream_json(rows), content_type='application/json')
+
+
+class AuthorViewSet(ConditionalReadMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = Author.objects.all()
+    serializer_class = AuthorSerializer
+    pagination_class = AuthorCursorPagination
+
+
+class BookInstanceViewSet(ConditionalReadMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = BookInstance.objects.all()
+    serializer_class = BookInstanceSerializer
+    pagination_class = BookInstanceCursorPagination
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class BooksConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'books_core'
+
+    def ready(self):
+        from books_core import database, signals  # noqa: F401
@@ -0,0 +1,140 @@
+"""
+Async versions of the catalog read views, used instead of the sync ones when settings.ASYNC_CATALOG_VIEWS is on.
+
+Django 4.0 has no async ORM (QuerySet.aget(), acount() and async iteration appear in 4.1), so the queries
+run through sync_to_async: each view makes one or two hops to the thread that owns the database connection,
+the rest of the request (auth check, cache lookups, response) stays on the event loop. When the project
+moves to Django 4.1+ aget() below can be replaced with the QuerySet method of the same name.
+"""
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.http import Http404
+from django.shortcuts import render
+
+from books_core import counters, views, visits
+from books_core.models import Author, Book
+
+
+async def aget(queryset, **kwargs):
+    return await sync_to_async(queryset.get)(**kwargs)
+
+
+arender = sync_to_async(render)
+
+
+@sync_to_async
+def _load_user(request):
+    """
+    Resolves the lazy request.user and its permissions, so templates can use them on the event loop.
+    """
+    user = request.user
+    if user.is_authenticated:
+        user.get_all_permissions()
+    return user
+
+
+async def _get_or_404(queryset, **kwargs):
+    try:
+        return await aget(queryset, **kwargs)
+    except queryset.model.DoesNotExist:
+        raise Http404(f'No {queryset.model._meta.verbose_name} found matching the query')
+
+
+@sync_to_async
+def _list_context(view_class, request, stamps, **kwargs):
+    """
+    Builds the context of a sync ListView (queryset, offset or keyset pagination) in one database hop.
+    """
+    view = view_class()
+    view.setup(request, **kwargs)
+    view.stamps = stamps
+    view.object_list = view.get_queryset()
+    context = view.get_context_data()
+    # Страница и число страниц вычисляются здесь, а не во время отрисовки шаблона
+    context['object_list'] = list(context['object_list'])
+    context[view.get_context_object_name(view.object_list)] = context['object_list']
+    if context['paginator'] is not None:
+        context['num_pages'] = context['paginator'].num_pages
+    return view.get_template_names(), context
+
+
+@sync_to_async
+def _stamps(view_class, request, **kwargs):
+    """
+    Version stamps of the sync view's page (views.ConditionalPageMixin), in one database hop.
+    """
+    view = view_class()
+    view.setup(request, **kwargs)
+    view.get_stamps()
+    return view
+
+
+async def _conditional(view_class, request, render_page, **kwargs):
+    """
+    Answers a conditional GET with 304 or renders the page with render_page(stamps), adding the validators.
+    """
+    view = await _stamps(view_class, request, **kwargs)
+    if request.method not in ('GET', 'HEAD'):
+        return await render_page(view.stamps)
+    validators = view.get_validators()
+    response = views.not_modified(request, validators) or await render_page(view.stamps)
+    return views.add_validators(response, validators)
+
+
+async def _list_view(view_class, request, login_required=False):
+    user = await _load_user(request)
+    if login_required and not user.is_authenticated:
+        return redirect_to_login(request.get_full_path())
+
+    async def render_page(stamps):
+        template_names, context = await _list_context(view_class, request, stamps)
+        return await arender(request, template_names, context)
+
+    return await _conditional(view_class, request, render_page)
+
+
+async def index(request):
+    user = await _load_user(request)
+    if not user.is_authenticated:
+        return redirect_to_login(request.get_full_path())
+    # При пустом кэше счётчики пересчитываются запросами к базе
+    counts = await sync_to_async(counters.get_counts)()
+    num_visits = await sync_to_async(visits.record_visit)(request)
+    return await arender(request, 'index.html', {**counts, 'num_visits': num_visits})
+
+
+async def book_list(request):
+    return await _list_view(views.BookListView, request, login_required=True)
+
+
+async def author_list(request):
+    return await _list_view(views.AuthorListView, request)
+
+
+async def loaned_books_by_user(request):
+    return await _list_view(views.LoanedBooksByUserListView, request, login_required=True)
+
+
+async def book_detail(request, pk):
+    await _load_user(request)
+
+    async def render_page(stamps):
+        book = await _get_or_404(Book.objects.select_related('author', 'language', 'availability'), pk=pk)
+        # Жанры и экземпляры загружаются шаблоном только при промахе кэша фрагмента
+        return await arender(request, 'books_core/book_detail.html', {
+            'object': book, 'book': book, 'fragment_version': stamps.key(),
+        })
+
+    return await _conditional(views.BookDetailView, request, render_page, pk=pk)
+
+
+async def author_detail(request, pk):
+    await _load_user(request)
+
+    async def render_page(stamps):
+        author = await _get_or_404(Author.objects.all(), pk=pk)
+        return await arender(request, 'books_core/author_detail.html', {
+            'object': author, 'author': author, 'fragment_version': stamps.key(),
+        })
+
+    return await _conditional(views.AuthorDetailView, request, render_page, pk=pk)
@@ -0,0 +1,44 @@
+"""
+Authentication backend that keeps the users of active sessions in the cache.
+
+AuthenticationMiddleware loads request.user with a query on every request. CachedModelBackend.get_user()
+reads it from the cache instead; the cached copy is dropped by the User post_save/post_delete signals
+(see books_core.signals), queryset update() of users is not tracked.
+
+Users are cached only when the default cache is shared by all processes (Redis, Memcached, database, ...).
+With a per-process cache (LocMemCache) a signal drops the copy only in the process that saved the user, and
+the other workers would keep accepting a deactivated user or a changed password until USER_TIMEOUT.
+"""
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+USER_TIMEOUT = 60 * 60
+
+
+def user_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def cache_is_shared():
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+def invalidate_user(user_id):
+    cache.delete(user_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+
+    def get_user(self, user_id):
+        if not cache_is_shared():
+            return super().get_user(user_id)
+        key = user_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            cache.set(key, user, USER_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
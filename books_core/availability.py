@@ -0,0 +1,45 @@
+"""
+Denormalized availability of books: BookAvailability keeps the number of copies in every status.
+
+refresh() recounts the books touched by a change of BookInstance (called from books_core.signals),
+rebuild() recounts the whole catalog after bulk operations that do not send signals.
+"""
+from django.db import transaction
+from django.db.models import Count, Min, Q
+
+from books_core.models import Book, BookAvailability, BookInstance
+
+STATUS_FIELDS = {'a': 'available', 'o': 'on_loan', 'm': 'maintenance', 'r': 'reserved'}
+EMPTY = {**{field: 0 for field in STATUS_FIELDS.values()}, 'next_due_back': None}
+
+
+def counts_by_book(queryset):
+    """
+    Rows {book_id, available, on_loan, maintenance, reserved, next_due_back} for the copies in the queryset.
+    """
+    return (queryset.order_by().values('book_id')
+            .annotate(**{field: Count('id', filter=Q(status=status)) for status, field in STATUS_FIELDS.items()},
+                      next_due_back=Min('due_back', filter=Q(status='o'))))
+
+
+def refresh(*book_ids):
+    book_ids = {book_id for book_id in book_ids if book_id is not None}
+    if not book_ids:
+        return
+    counts = {row.pop('book_id'): row for row in counts_by_book(BookInstance.objects.filter(book_id__in=book_ids))}
+    for book_id in book_ids:
+        BookAvailability.objects.update_or_create(book_id=book_id, defaults=counts.get(book_id, EMPTY))
+
+
+def rebuild(batch_size=5000):
+    """
+    Recounts all books, returns the number of rows written.
+    """
+    with transaction.atomic():
+        BookAvailability.objects.all().delete()
+        counts = {row.pop('book_id'): row for row in counts_by_book(BookInstance.objects.exclude(book=None))}
+        return len(BookAvailability.objects.bulk_create(
+            (BookAvailability(book_id=book_id, **counts.get(book_id, EMPTY))
+             for book_id in Book.objects.values_list('pk', flat=True).iterator()),
+            batch_size=batch_size,
+        ))
@@ -0,0 +1,75 @@
+"""
+Счётчики для домашней страницы (количество книг, экземпляров, авторов).
+
+Значения хранятся в кэше и поддерживаются сигналами из books_core.signals,
+поэтому главная страница не выполняет COUNT-запросов. Изменения применяются после фиксации транзакции
+(откаченная запись счётчики не меняет), а сами значения живут TIMEOUT секунд: кэш каждого процесса свой,
+и изменения, сделанные другими процессами, учитываются при следующем пересчёте.
+"""
+from django.core.cache import cache
+from django.db import transaction
+
+from books_core.models import Author, Book, BookInstance
+
+NUM_BOOKS = 'num_books'
+NUM_INSTANCES = 'num_instances'
+NUM_INSTANCES_AVAILABLE = 'num_instances_available'
+NUM_AUTHORS = 'num_authors'
+
+COUNTERS = (NUM_BOOKS, NUM_INSTANCES, NUM_INSTANCES_AVAILABLE, NUM_AUTHORS)
+# Не больше, чем на столько счётчики могут отставать от записей других процессов
+TIMEOUT = 5 * 60
+
+
+def _key(name):
+    return f'counters:{name}'
+
+
+def rebuild():
+    """
+    Counts every total from scratch and stores the result in the cache.
+    """
+    counts = {
+        NUM_BOOKS: Book.objects.count(),
+        NUM_INSTANCES: BookInstance.objects.count(),
+        # Доступные книги (статус = 'a')
+        NUM_INSTANCES_AVAILABLE: BookInstance.objects.filter(status__exact='a').count(),
+        NUM_AUTHORS: Author.objects.count(),
+    }
+    cache.set_many({_key(name): value for name, value in counts.items()}, timeout=TIMEOUT)
+    return counts
+
+
+def get_counts():
+    """
+    Returns a dict with all counters. Rebuilds them if any of them is missing from the cache.
+    """
+    cached = cache.get_many([_key(name) for name in COUNTERS])
+    if len(cached) < len(COUNTERS):
+        return rebuild()
+    return {name: cached[_key(name)] for name in COUNTERS}
+
+
+def change(name, delta):
+    """
+    Adds delta to the counter when the current transaction commits. A counter that is not in the cache is left
+    as is, it is rebuilt on the next read.
+    """
+    transaction.on_commit(lambda: _apply(name, delta))
+
+
+def _apply(name, delta):
+    try:
+        if delta > 0:
+            cache.incr(_key(name), delta)
+        elif delta < 0:
+            cache.decr(_key(name), -delta)
+    except ValueError:
+        pass
+
+
+def invalidate():
+    """
+    Drops all counters when the current transaction commits, so the next read counts them again.
+    """
+    transaction.on_commit(lambda: cache.delete_many([_key(name) for name in COUNTERS]))
@@ -0,0 +1,59 @@
+"""
+Connection setup of the database: SQLite pragmas and health checks of persistent connections.
+
+settings.SQLITE_PROFILE names a set of pragmas from SQLITE_PROFILES, which is applied to every new SQLite
+connection. 'production' switches the database to WAL, where readers do not wait for the writer and the
+writer does not wait for readers, with synchronous=NORMAL (durable at checkpoints, consistent always) and
+a busy timeout for the remaining writer-writer waits. 'default' is the SQLite behaviour: rollback journal,
+synchronous=FULL. The journal mode is stored in the database file, the other pragmas are per connection.
+
+Django 4.0 has no CONN_HEALTH_CHECKS (it appears in 4.1): check_connections() does the same for the
+databases with 'CONN_HEALTH_CHECKS': True, so a persistent connection that went bad is reopened at the start
+of the next request instead of failing it. When the project moves to Django 4.1+ it can be removed.
+"""
+import django
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+SQLITE_PROFILES = {
+    'default': {
+        'journal_mode': 'DELETE',
+        'synchronous': 'FULL',
+    },
+    'production': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        # мс ожидания блокировки другого писателя вместо немедленной ошибки "database is locked"
+        'busy_timeout': 5000,
+        # Отрицательное значение - размер в КиБ, 64 МиБ кэша страниц на соединение
+        'cache_size': -65536,
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+    },
+}
+
+
+def sqlite_pragmas(profile=None):
+    return SQLITE_PROFILES[profile or getattr(settings, 'SQLITE_PROFILE', 'default')]
+
+
+@receiver(connection_created)
+def configure_connection(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in sqlite_pragmas().items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+@receiver(request_started)
+def check_connections(**kwargs):
+    if django.VERSION >= (4, 1):
+        return
+    for connection in connections.all():
+        if (connection.connection is not None and connection.settings_dict.get('CONN_HEALTH_CHECKS')
+                and not connection.in_atomic_block and not connection.is_usable()):
+            connection.close()
@@ -0,0 +1,112 @@
+"""
+Streaming CSV/JSONL exports of the catalog for the reporting.
+
+Rows are read with values() and iterator(chunk_size), rendered and handed out one by one, so memory does
+not depend on the size of the table. The genres of books are loaded with one query per batch of books.
+"""
+import csv
+import datetime
+from collections import defaultdict
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from books_core.models import Book, BookInstance
+from books_core.notices import batched
+
+CHUNK_SIZE = 2000
+FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+
+def book_rows(chunk_size=CHUNK_SIZE):
+    rows = (Book.objects.order_by('id')
+            .values('id', 'title', 'isbn', 'author__last_name', 'author__first_name', 'language__name', 'summary')
+            .iterator(chunk_size=chunk_size))
+    for batch in batched(rows, chunk_size):
+        genres = defaultdict(list)
+        for book_id, name in (Book.genre.through.objects.filter(book_id__in=[row['id'] for row in batch])
+                              .order_by('genre__name').values_list('book_id', 'genre__name')):
+            genres[book_id].append(name)
+        for row in batch:
+            yield {
+                'id': row['id'],
+                'title': row['title'],
+                'isbn': row['isbn'],
+                'author': ' '.join(filter(None, [row['author__last_name'], row['author__first_name']])),
+                'language': row['language__name'],
+                'genres': '; '.join(genres[row['id']]),
+                'summary': row['summary'],
+            }
+
+
+def copy_rows(chunk_size=CHUNK_SIZE):
+    rows = (BookInstance.objects.order_by('id')
+            .values('id', 'book_id', 'book__title', 'imprint', 'status', 'due_back', 'borrower__username')
+            .iterator(chunk_size=chunk_size))
+    for row in rows:
+        yield {
+            'id': row['id'],
+            'book_id': row['book_id'],
+            'book': row['book__title'],
+            'imprint': row['imprint'],
+            'status': row['status'],
+            'due_back': row['due_back'],
+            'borrower': row['borrower__username'],
+        }
+
+
+def loan_rows(chunk_size=CHUNK_SIZE):
+    """
+    Copies currently on loan, ordered by the due date.
+    """
+    rows = (BookInstance.objects.on_loan().with_overdue().order_by('due_back', 'id')
+            .values('id', 'book_id', 'book__title', 'due_back', 'overdue', 'borrower__username', 'borrower__email')
+            .iterator(chunk_size=chunk_size))
+    for row in rows:
+        yield {
+            'id': row['id'],
+            'book_id': row['book_id'],
+            'book': row['book__title'],
+            'borrower': row['borrower__username'],
+            'email': row['borrower__email'],
+            'due_back': row['due_back'],
+            'overdue': bool(row['overdue']),
+        }
+
+
+EXPORTS = {
+    'books': (book_rows, ['id', 'title', 'isbn', 'author', 'language', 'genres', 'summary']),
+    'copies': (copy_rows, ['id', 'book_id', 'book', 'imprint', 'status', 'due_back', 'borrower']),
+    'loans': (loan_rows, ['id', 'book_id', 'book', 'borrower', 'email', 'due_back', 'overdue']),
+}
+
+
+class _Line:
+    """
+    File-like object for csv.writer that returns the written line instead of storing it.
+    """
+
+    def write(self, value):
+        return value
+
+
+def render(name, file_format, chunk_size=CHUNK_SIZE):
+    """
+    Yields the export as text lines: CSV with a header row or JSON Lines.
+    """
+    rows, columns = EXPORTS[name]
+    if file_format == 'csv':
+        writer = csv.writer(_Line())
+        yield writer.writerow(columns)
+        for row in rows(chunk_size):
+            yield writer.writerow([row[column] for column in columns])
+    else:
+        encoder = DjangoJSONEncoder(ensure_ascii=False)
+        for row in rows(chunk_size):
+            yield encoder.encode(row) + '\n'
+
+
+def filename(name, file_format):
+    return f'{name}-{datetime.date.today():%Y-%m-%d}.{file_format}'
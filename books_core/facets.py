@@ -0,0 +1,162 @@
+"""
+Faceted browsing of the book list: filters by genre, language, author and availability with the number
+of books for every value.
+
+The counts of a facet are one grouped query over the books selected by the other facets (so another value
+of the same facet can be picked) and a lookup of the names of the shown values, cached under the version
+stamps they depend on (books_core.versioning): genres, languages and authors of the books change with TITLES
+and FACETS (genre sets), their names with TAXONOMY, availability with every write to the catalog (CATALOG).
+
+    ?genre=3&language=1&author=12&available=1
+"""
+import hashlib
+import re
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from books_core import versioning
+from books_core.models import Author, Book, Genre, Language
+
+CACHE_TIMEOUT = 24 * 60 * 60
+# Авторов слишком много, показываются те, у кого больше всего книг
+AUTHOR_LIMIT = 20
+# Только ASCII-цифры (str.isdigit пропускает '²') и не больше 18 знаков, чтобы id влез в 64 бита
+ID_RE = re.compile(r'[0-9]{1,18}')
+
+Facet = namedtuple('Facet', ['name', 'label', 'values'])
+FacetValue = namedtuple('FacetValue', ['value', 'label', 'count', 'selected', 'query'])
+
+
+def _genre_filter(value):
+    # Подзапрос вместо JOIN: книги не повторяются, и SQLite может обходить book_title_idx
+    return Q(pk__in=Book.genre.through.objects.filter(genre_id=value).values('book_id'))
+
+
+FILTERS = {
+    'genre': _genre_filter,
+    'language': lambda value: Q(language_id=value),
+    'author': lambda value: Q(author_id=value),
+    'available': lambda value: Q(availability__available__gt=0),
+}
+
+LABELS = {'genre': 'Genre', 'language': 'Language', 'author': 'Author', 'available': 'Availability'}
+
+
+def selection(query):
+    """
+    {facet: value} of the facet parameters of the query dict. Values that are not ids (or too big for one)
+    are ignored.
+    """
+    selected = {}
+    for name in FILTERS:
+        value = query.get(name, '')
+        if ID_RE.fullmatch(value) and (name != 'available' or value == '1'):
+            selected[name] = int(value)
+    return selected
+
+
+def filter_books(queryset, selected):
+    for name, value in selected.items():
+        queryset = queryset.filter(FILTERS[name](value))
+    return queryset
+
+
+def _grouped(rows, field):
+    """
+    {value: number of rows}. COUNT(*) grouped by the indexed column is read from the index alone, names are
+    looked up afterwards only for the values that are shown.
+    """
+    return {value: count for value, count in rows.order_by().values_list(field).annotate(count=Count('*'))
+            if value is not None}
+
+
+def _labelled(model, counts, order_by_name=True):
+    labels = {obj.pk: str(obj) for obj in model.objects.filter(pk__in=counts)} if counts else {}
+    rows = [(value, labels.get(value, ''), count) for value, count in counts.items()]
+    return sorted(rows, key=lambda row: row[1]) if order_by_name else rows
+
+
+def _genre_counts(books, selected):
+    rows = Book.genre.through.objects.all()
+    if books.query.has_filters():
+        rows = rows.filter(book__in=books)
+    return _labelled(Genre, _grouped(rows, 'genre_id'))
+
+
+def _language_counts(books, selected):
+    return _labelled(Language, _grouped(books, 'language_id'))
+
+
+def _author_counts(books, selected):
+    rows = (books.order_by().filter(author__isnull=False).values_list('author_id')
+            .annotate(count=Count('*')).order_by('-count', 'author_id')[:AUTHOR_LIMIT])
+    counts = dict(rows)
+    if selected is not None and selected not in counts:
+        # Выбранный автор показывается, даже если не попал в первые AUTHOR_LIMIT
+        counts[selected] = books.filter(author_id=selected).count()
+    return _labelled(Author, counts, order_by_name=False)
+
+
+def _available_counts(books, selected):
+    return [(1, 'Available now', books.filter(FILTERS['available'](1)).count())]
+
+
+COUNTS = {
+    'genre': _genre_counts,
+    'language': _language_counts,
+    'author': _author_counts,
+    'available': _available_counts,
+}
+
+
+def _namespaces(name, others):
+    namespaces = [versioning.TITLES, versioning.FACETS, versioning.TAXONOMY]
+    # Доступность меняется при каждой выдаче и возврате экземпляра
+    if name == 'available' or 'available' in others:
+        namespaces.append(versioning.CATALOG)
+    return namespaces
+
+
+def counts(name, others, selected=None, stamps=None):
+    """
+    [(value, label, count)] of the facet for the books selected by the other facets, from the cache when
+    the data has not changed since they were counted. stamps are the versioning.Stamps read for all facets.
+    """
+    namespaces = _namespaces(name, others)
+    if stamps is None:
+        stamps = versioning.Stamps(*namespaces)
+    source = f'{stamps.key(*namespaces)}:{sorted(others.items())}:{selected}'
+    key = f'facets:{name}:{hashlib.md5(source.encode()).hexdigest()}'
+    rows = cache.get(key)
+    if rows is None:
+        rows = [tuple(row) for row in COUNTS[name](filter_books(Book.objects.all(), others), selected)]
+        cache.set(key, rows, CACHE_TIMEOUT)
+    return rows
+
+
+def facet_list(query):
+    """
+    [Facet] for the book list requested with the query dict. The query of every value selects it (or
+    drops it if it is selected) and keeps the other parameters except pagination.
+    """
+    selected = selection(query)
+    stamps = versioning.Stamps(versioning.TITLES, versioning.FACETS, versioning.TAXONOMY, versioning.CATALOG)
+    result = []
+    for name in FILTERS:
+        others = {other: value for other, value in selected.items() if other != name}
+        values = []
+        # Выбранное значение нужно только авторам, остальные фасеты показывают все значения
+        pinned = selected.get(name) if name == 'author' else None
+        for value, label, count in counts(name, others, pinned, stamps):
+            params = query.copy()
+            for param in ('page', 'cursor'):
+                params.pop(param, None)
+            if selected.get(name) == value:
+                params.pop(name, None)
+            else:
+                params[name] = str(value)
+            values.append(FacetValue(value, label, count, selected.get(name) == value, params.urlencode()))
+        result.append(Facet(name, LABELS[name], values))
+    return result
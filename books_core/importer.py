@@ -0,0 +1,155 @@
+"""
+Bulk import of catalog records (books with their copies).
+
+A record is a dict with the keys:
+    title, summary, isbn, author_first_name, author_last_name, language,
+    genres - list of genre names (in CSV a string separated by '|'),
+    copies - list of dicts with imprint, status and due_back (YYYY-MM-DD),
+             or a number of copies sharing the record's imprint and status (CSV).
+
+Records are written in batches with bulk_create. Authors, genres and languages are resolved by their
+natural key (names) through in-memory caches, missing ones are created once per batch.
+"""
+import csv
+import datetime
+import json
+import time
+from itertools import islice
+
+from django.db import connections, transaction
+
+from books_core.models import Author, Book, BookInstance, Genre, Language
+
+GENRE_SEPARATOR = '|'
+
+
+def read_jsonl(stream):
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def read_csv(stream):
+    for row in csv.DictReader(stream):
+        row['genres'] = [name for name in (row.get('genres') or '').split(GENRE_SEPARATOR) if name]
+        row['copies'] = int(row.get('copies') or 0)
+        yield row
+
+
+READERS = {
+    'csv': read_csv,
+    'jsonl': read_jsonl,
+}
+
+
+class CatalogImporter:
+    """
+    Writes records to the database in batches. Keeps the name -> id caches between batches.
+    """
+
+    def __init__(self, batch_size=1000, using='default'):
+        self.batch_size = batch_size
+        self.using = using
+        self.authors = None
+        self.genres = None
+        self.languages = None
+        self.books = 0
+        self.copies = 0
+        self.started = None
+
+    @property
+    def rows(self):
+        return self.books + self.copies
+
+    @property
+    def rows_per_second(self):
+        elapsed = time.perf_counter() - self.started
+        return self.rows / elapsed if elapsed else 0.0
+
+    def _load_caches(self):
+        self.authors = {}
+        for pk, first_name, last_name in (Author.objects.using(self.using)
+                                          .values_list('pk', 'first_name', 'last_name').iterator()):
+            self.authors.setdefault((first_name, last_name), pk)
+        self.genres = dict(Genre.objects.using(self.using).values_list('name', 'pk'))
+        self.languages = dict(Language.objects.using(self.using).values_list('name', 'pk'))
+
+    def _resolve_names(self, model, cache, names):
+        new = [model(name=name) for name in dict.fromkeys(names) if name and name not in cache]
+        for obj in model.objects.using(self.using).bulk_create(new):
+            cache[obj.name] = obj.pk
+
+    def _resolve_authors(self, records):
+        keys = {self._author_key(record) for record in records} - {None}
+        new = [Author(first_name=first_name, last_name=last_name)
+               for first_name, last_name in keys if (first_name, last_name) not in self.authors]
+        for author in Author.objects.using(self.using).bulk_create(new):
+            self.authors[(author.first_name, author.last_name)] = author.pk
+
+    @staticmethod
+    def _author_key(record):
+        key = (record.get('author_first_name') or '', record.get('author_last_name') or '')
+        return key if any(key) else None
+
+    @staticmethod
+    def _copies(record):
+        copies = record.get('copies') or []
+        if isinstance(copies, int):
+            copies = [{'imprint': record.get('imprint', ''), 'status': record.get('status')}] * copies
+        for copy in copies:
+            due_back = copy.get('due_back')
+            yield BookInstance(
+                imprint=copy.get('imprint') or '',
+                status=copy.get('status') or 'm',
+                due_back=datetime.date.fromisoformat(due_back) if due_back else None,
+            )
+
+    def import_batch(self, records):
+        self._resolve_authors(records)
+        self._resolve_names(Genre, self.genres, [name for record in records for name in record.get('genres') or []])
+        self._resolve_names(Language, self.languages, [record.get('language') for record in records])
+
+        books = Book.objects.using(self.using).bulk_create([
+            Book(
+                title=record['title'],
+                summary=record.get('summary') or '',
+                isbn=record.get('isbn') or '',
+                author_id=self.authors.get(self._author_key(record)),
+                language_id=self.languages.get(record.get('language')),
+            )
+            for record in records
+        ])
+
+        genre_links, copies = [], []
+        for book, record in zip(books, records):
+            genre_links.extend(
+                Book.genre.through(book_id=book.pk, genre_id=self.genres[name])
+                for name in dict.fromkeys(record.get('genres') or [])
+            )
+            for copy in self._copies(record):
+                copy.book_id = book.pk
+                copies.append(copy)
+        Book.genre.through.objects.using(self.using).bulk_create(genre_links)
+        BookInstance.objects.using(self.using).bulk_create(copies, batch_size=self.batch_size)
+
+        self.books += len(books)
+        self.copies += len(copies)
+
+    def run(self, records, progress=None):
+        """
+        Imports all records, every batch in its own transaction. progress(importer) is called after each batch.
+        """
+        if not connections[self.using].features.can_return_rows_from_bulk_insert:
+            raise RuntimeError('The database backend does not return primary keys from bulk inserts')
+
+        self.started = time.perf_counter()
+        if self.authors is None:
+            self._load_caches()
+
+        records = iter(records)
+        while batch := list(islice(records, self.batch_size)):
+            with transaction.atomic(using=self.using):
+                self.import_batch(batch)
+            if progress:
+                progress(self)
+        return self
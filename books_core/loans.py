@@ -0,0 +1,127 @@
+"""
+Loan operations on book copies: checkout, return, renew and reserve.
+
+Every operation reads the copy (with SELECT ... FOR UPDATE where the database supports row locks) and
+changes it with a conditional UPDATE ... WHERE status = <read status> AND borrower = <read borrower>.
+If a concurrent request changed the copy in between, the UPDATE matches no row and the operation
+is retried with fresh data, so a copy can never be lent twice, also on SQLite, which ignores
+select_for_update(). The changes are applied with update(), so post_save is sent explicitly to keep the
+counters and cache versions (books_core.signals) in sync.
+"""
+import datetime
+import time
+
+from django.db import OperationalError, connections, router, transaction
+from django.db.models.signals import post_save
+
+from books_core.models import BookInstance
+
+LOAN_PERIOD = datetime.timedelta(weeks=3)
+MAX_RENEWAL = datetime.timedelta(weeks=4)
+ATTEMPTS = 5
+
+
+class LoanError(Exception):
+    """
+    The operation is not allowed for the copy in its current state.
+    """
+
+
+class CopyNotAvailable(LoanError):
+    pass
+
+
+class NotOnLoan(LoanError):
+    pass
+
+
+class InvalidDueDate(LoanError):
+    pass
+
+
+class LoanConflict(LoanError):
+    """
+    The copy kept changing under concurrent requests, the operation may be repeated.
+    """
+
+
+def _load(copy_id, using):
+    queryset = BookInstance.objects.using(using)
+    if connections[using].features.has_select_for_update:
+        queryset = queryset.select_for_update()
+    return queryset.get(pk=copy_id)
+
+
+def _transition(copy_id, check, changes):
+    """
+    Applies `changes` to the copy if check(copy) accepts its current state (raises LoanError otherwise).
+    Returns the changed copy.
+    """
+    using = router.db_for_write(BookInstance)
+    for attempt in range(ATTEMPTS):
+        try:
+            with transaction.atomic(using=using):
+                copy = _load(copy_id, using)
+                check(copy)
+                updated = (BookInstance.objects.using(using)
+                           .filter(pk=copy.pk, status=copy.status, borrower_id=copy.borrower_id)
+                           .update(**changes))
+                if updated:
+                    for name, value in changes.items():
+                        setattr(copy, name, value)
+                    post_save.send(sender=BookInstance, instance=copy, created=False, raw=False, using=using,
+                                   update_fields=frozenset(changes))
+                    return copy
+        except OperationalError as exc:
+            # SQLite отвечает "database is locked" тому из параллельных писателей, кто не получил блокировку
+            if 'locked' not in str(exc):
+                raise
+        time.sleep(0.01 * 2 ** attempt)
+    raise LoanConflict(f'Copy {copy_id} is being changed by other requests')
+
+
+def checkout(copy_id, borrower, due_back=None):
+    """
+    Lends an available copy, or a copy reserved by the same borrower.
+    """
+    due_back = due_back or datetime.date.today() + LOAN_PERIOD
+
+    def check(copy):
+        if not (copy.status == 'a' or copy.status == 'r' and copy.borrower_id == borrower.pk):
+            raise CopyNotAvailable(f'Copy {copy.pk} is not available')
+
+    return _transition(copy_id, check, {'status': 'o', 'borrower': borrower, 'due_back': due_back})
+
+
+def return_copy(copy_id):
+    def check(copy):
+        if copy.status != 'o':
+            raise NotOnLoan(f'Copy {copy.pk} is not on loan')
+
+    return _transition(copy_id, check, {'status': 'a', 'borrower': None, 'due_back': None})
+
+
+def renew(copy_id, due_back):
+    """
+    Moves the due date of a copy on loan, at most MAX_RENEWAL from today.
+    """
+    today = datetime.date.today()
+    if not today <= due_back <= today + MAX_RENEWAL:
+        raise InvalidDueDate(f'Due date must be between {today} and {today + MAX_RENEWAL}')
+
+    def check(copy):
+        if copy.status != 'o':
+            raise NotOnLoan(f'Copy {copy.pk} is not on loan')
+
+    return _transition(copy_id, check, {'due_back': due_back})
+
+
+def reserve(copy_id, borrower):
+    """
+    Holds an available copy for the borrower, only this borrower can check it out then.
+    """
+    def check(copy):
+        if copy.status != 'a':
+            raise CopyNotAvailable(f'Copy {copy.pk} is not available')
+
+    return _transition(copy_id, check, {'status': 'r', 'borrower': borrower})
@@ -0,0 +1,163 @@
+import datetime
+import itertools
+import json
+import random
+import statistics
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from books_core.database import SQLITE_PROFILES
+from books_core.management.commands.benchmark import (
+    SIZES, benchmark_database, catalog_targets, dataset_sizes, environment,
+)
+from books_core.management.commands.loadtest import percentile
+from books_core.models import BookInstance
+
+
+def _summary(latencies, errors):
+    if not latencies:
+        return {'requests': 0, 'errors': len(errors)}
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'error_samples': sorted(set(errors))[:5],
+        'p50_ms': round(statistics.median(latencies) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'max_ms': round(max(latencies) * 1000, 2),
+    }
+
+
+def run_mixed(user, paths, copy_ids, threads, total, write_ratio, seed=0):
+    """
+    Sends `total` requests from `threads` threads, each with its own test client and database connection.
+    A write_ratio share of them renews a copy on loan (POST, a write transaction), the rest GET the paths.
+    """
+    counter = itertools.count()
+    latencies = {'read': [], 'write': []}
+    errors = {'read': [], 'write': []}
+    lock = threading.Lock()
+    renewal_date = (datetime.date.today() + datetime.timedelta(weeks=2)).isoformat()
+
+    def worker(num):
+        rnd = random.Random(seed + num)
+        client = Client()
+        try:
+            client.force_login(user)
+            while next(counter) < total:
+                write = copy_ids and rnd.random() < write_ratio
+                started = time.perf_counter()
+                try:
+                    if write:
+                        response = client.post(reverse('renew-book-librarian', args=[rnd.choice(copy_ids)]),
+                                                {'renewal_date': renewal_date})
+                    else:
+                        response = client.get(rnd.choice(paths))
+                    error = str(response.status_code) if response.status_code >= 400 else None
+                except Exception as exc:
+                    error = f'{type(exc).__name__}: {exc}'
+                elapsed = time.perf_counter() - started
+                kind = 'write' if write else 'read'
+                with lock:
+                    latencies[kind].append(elapsed)
+                    if error:
+                        errors[kind].append(error)
+        finally:
+            # Соединения потоков не закрываются сами, даже с CONN_MAX_AGE
+            connections.close_all()
+
+    workers = [threading.Thread(target=worker, args=[num]) for num in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    return {
+        'throughput_rps': round(sum(map(len, latencies.values())) / wall, 1),
+        'read': _summary(latencies['read'], errors['read']),
+        'write': _summary(latencies['write'], errors['write']),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Concurrency benchmark of the SQLite profiles (books_core.database): several threads send a mix of '
+        'catalog page reads and loan renewals (writes) to a seeded benchmark database, once per --profile.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profile', action='append', choices=list(SQLITE_PROFILES),
+                            help='SQLite profile to measure, repeatable (default: all)')
+        parser.add_argument('--conn-max-age', type=int,
+                            help='CONN_MAX_AGE of the run (default: 0 for "default", the setting for the others)')
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per profile')
+        parser.add_argument('--write-ratio', type=float, default=0.2, help='Share of the requests that write')
+        parser.add_argument('--only', action='append', help='Read only URLs whose name contains this, repeatable')
+        parser.add_argument('--size', choices=list(SIZES), default='10k', help='Number of books and copies')
+        parser.add_argument('--books', type=int, help='Overrides the number of books of --size')
+        parser.add_argument('--copies', type=int, help='Overrides the number of copies of --size')
+        parser.add_argument('--workdir', default=tempfile.gettempdir(),
+                            help='Where the seeded databases are kept between runs')
+        parser.add_argument('--reseed', action='store_true', help='Seed again even if the database exists')
+
+    def handle(self, *args, **options):
+        sizes = dataset_sizes(options)
+        results = {}
+        with benchmark_database(sizes, options['workdir'], options['reseed'], self.stderr):
+            user, _ = User.objects.get_or_create(username='benchmark',
+                                                 defaults={'is_staff': True, 'is_superuser': True})
+            paths = [path for name, path in catalog_targets()
+                     if not options['only'] or any(part in name for part in options['only'])]
+            copy_ids = list(BookInstance.objects.on_loan().values_list('pk', flat=True)[:1000])
+            database = connections.settings[DEFAULT_DB_ALIAS]
+            configured_max_age = database.get('CONN_MAX_AGE', 0)
+
+            for profile in options['profile'] or list(SQLITE_PROFILES):
+                max_age = options['conn_max_age']
+                if max_age is None:
+                    max_age = 0 if profile == 'default' else configured_max_age
+                connections.close_all()
+                database['CONN_MAX_AGE'] = max_age
+                try:
+                    with override_settings(SQLITE_PROFILE=profile,
+                                           ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                        # Режим журнала меняется первым соединением, пока других соединений нет
+                        with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+                            journal_mode = cursor.execute('PRAGMA journal_mode').fetchone()[0]
+                        self.stderr.write(f'{profile}: journal_mode={journal_mode}, CONN_MAX_AGE={max_age}')
+                        results[profile] = {
+                            'journal_mode': journal_mode,
+                            'conn_max_age': max_age,
+                            **run_mixed(user, paths, copy_ids, options['threads'], options['requests'],
+                                        options['write_ratio']),
+                        }
+                finally:
+                    connections.close_all()
+                    database['CONN_MAX_AGE'] = configured_max_age
+
+        self.stdout.write(json.dumps({
+            **environment(),
+            'dataset': sizes,
+            'threads': options['threads'],
+            'requests': options['requests'],
+            'write_ratio': options['write_ratio'],
+            'results': results,
+        }, indent=2))
+        self.stderr.write(f'{"profile":<12}{"rps":>8}{"read p50":>10}{"read p99":>10}{"write p50":>11}'
+                          f'{"write p99":>11}{"errors":>8}')
+        for profile, result in results.items():
+            read, write = result['read'], result['write']
+            self.stderr.write(f'{profile:<12}{result["throughput_rps"]:>8}{read.get("p50_ms", "-"):>10}'
+                              f'{read.get("p99_ms", "-"):>10}{write.get("p50_ms", "-"):>11}'
+                              f'{write.get("p99_ms", "-"):>11}{read["errors"] + write["errors"]:>8}')
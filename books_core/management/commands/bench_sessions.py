@@ -0,0 +1,64 @@
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+STRATEGIES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+
+# До: сессия записывается на каждом визите, пользователь читается из базы
+BEFORE = {
+    'VISITS_FLUSH_EVERY': 1,
+    'AUTHENTICATION_BACKENDS': ['django.contrib.auth.backends.ModelBackend'],
+}
+WRITES = ('INSERT', 'UPDATE', 'DELETE')
+
+
+def measure(path, num_requests, user):
+    """
+    Requests the page with a logged in client. Returns (writes per request, queries per request, ms per request).
+    """
+    client = Client()
+    client.force_login(user)
+    client.get(path)  # первый запрос заполняет кэши
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        for _ in range(num_requests):
+            client.get(path)
+        elapsed = time.perf_counter() - started
+    writes = sum(query['sql'].lstrip().upper().startswith(WRITES) for query in queries.captured_queries)
+    return writes / num_requests, len(queries) / num_requests, elapsed * 1000 / num_requests
+
+
+class Command(BaseCommand):
+    help = (
+        'Database writes and queries per home page request for every session strategy, with the visit '
+        'counter writing the session on each hit (before) and coalesced in the cache (after). '
+        'Everything written by the benchmark is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--strategy', action='append', choices=list(STRATEGIES), help='Can be repeated (default: all)')
+
+    def handle(self, *args, **options):
+        path = reverse('index')
+        self.stdout.write(f'{"strategy":<16}{"mode":<8}{"writes/req":>12}{"queries/req":>13}{"ms/req":>10}')
+        with transaction.atomic():
+            user = User.objects.create_user(username=f'bench-sessions-{uuid.uuid4().hex[:8]}')
+            for strategy in options['strategy'] or STRATEGIES:
+                for mode, overrides in (('before', BEFORE), ('after', {})):
+                    with override_settings(SESSION_ENGINE=STRATEGIES[strategy],
+                                           ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'], **overrides):
+                        writes, queries, ms = measure(path, options['requests'], user)
+                    self.stdout.write(f'{strategy:<16}{mode:<8}{writes:>12.2f}{queries:>13.2f}{ms:>10.2f}')
+            transaction.set_rollback(True)
@@ -0,0 +1,132 @@
+import importlib.util
+import json
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.template.backends.django import DjangoTemplates
+from django.test import RequestFactory
+from django.urls import reverse
+from django.utils.module_loading import import_string
+
+from books_core import views
+from books_core.models import Author, Book
+
+UNCACHED_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
+
+def template_engines():
+    """
+    {label: engine}: the Django backend with the cached loader as configured, the same backend without it,
+    and the Jinja2 backend of settings.JINJA2_BACKEND when jinja2 is installed.
+    """
+    django_config = next(config for config in settings.TEMPLATES
+                         if issubclass(import_string(config['BACKEND']), DjangoTemplates))
+    configs = {
+        'django-cached': django_config,
+        'django-uncached': {**django_config, 'OPTIONS': {**django_config['OPTIONS'], 'loaders': UNCACHED_LOADERS}},
+    }
+    if importlib.util.find_spec('jinja2') is not None:
+        configs['jinja2'] = settings.JINJA2_BACKEND
+    engines = {}
+    for label, config in configs.items():
+        params = {'DIRS': [], 'APP_DIRS': False, 'OPTIONS': {}, **config}
+        engines[label] = import_string(params.pop('BACKEND'))({**params, 'NAME': label})
+    return engines
+
+
+def _context(view_class, request, **kwargs):
+    """
+    Context of a catalog view for the request, with the querysets evaluated, so rendering makes no queries
+    except the ones in the templates.
+    """
+    view = view_class()
+    view.setup(request, **kwargs)
+    if kwargs:
+        view.object = view.get_object()
+        return view.get_context_data(object=view.object)
+    view.object_list = view.get_queryset()
+    context = view.get_context_data()
+    context['object_list'] = list(context['object_list'])
+    context[view.get_context_object_name(view.object_list)] = context['object_list']
+    return context
+
+
+def render_targets(user):
+    """
+    [(template name, request, context)] of the hot catalog pages.
+    """
+    factory = RequestFactory()
+    book, author = Book.objects.order_by('pk').first(), Author.objects.order_by('pk').first()
+    if book is None or author is None:
+        raise CommandError('The catalog is empty, fill it with seed_catalog first')
+    pages = [
+        ('books_core/book_list.html', views.BookListView, reverse('books'), {}),
+        ('books_core/book_detail.html', views.BookDetailView, reverse('book-detail', args=[book.pk]), {'pk': book.pk}),
+        ('books_core/author_list.html', views.AuthorListView, reverse('authors'), {}),
+        ('books_core/author_detail.html', views.AuthorDetailView, reverse('author-detail', args=[author.pk]),
+         {'pk': author.pk}),
+    ]
+    targets = []
+    for template_name, view_class, path, kwargs in pages:
+        request = factory.get(path)
+        request.user = user
+        targets.append((template_name, request, _context(view_class, request, **kwargs)))
+    return targets
+
+
+def measure_render(engine, template_name, request, context, repeat):
+    """
+    Renders the template `repeat` times the way a view does it (get_template() and render() per response).
+    Returns the median and mean time in microseconds and the size of the output.
+    """
+    content = engine.get_template(template_name).render(context, request)
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        engine.get_template(template_name).render(context, request)
+        timings.append((time.perf_counter() - started) * 1_000_000)
+    return {
+        'median_us': round(statistics.median(timings), 1),
+        'mean_us': round(statistics.fmean(timings), 1),
+        'bytes': len(content.encode()),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Render micro-benchmark of the hot catalog templates on the current database: the Django backend with '
+        'and without the cached loader and the Jinja2 backend (when jinja2 is installed).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=500, help='Renders per template and engine')
+        parser.add_argument('--engine', action='append', help='Measure only these engines, repeatable')
+        parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(is_superuser=True).first() or User.objects.first()
+        if user is None:
+            raise CommandError('Create a user first, the pages are rendered for a logged in user')
+        targets = render_targets(user)
+        engines = {label: engine for label, engine in template_engines().items()
+                   if not options['engine'] or label in options['engine']}
+
+        results = {
+            template_name: {label: measure_render(engine, template_name, request, context, options['repeat'])
+                            for label, engine in engines.items()}
+            for template_name, request, context in targets
+        }
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(f'{"template":<32}' + ''.join(f'{label + " us":>20}' for label in engines))
+        for template_name, by_engine in results.items():
+            self.stdout.write(f'{template_name:<32}'
+                              + ''.join(f'{by_engine[label]["median_us"]:>20}' for label in engines))
@@ -0,0 +1,258 @@
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import django
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import Client, override_settings
+from django.urls import URLPattern, URLResolver, reverse
+
+from books_core import routers, urls
+from books_core.models import Author, Book, BookInstance
+
+SIZES = {
+    '10k': {'books': 10_000, 'copies': 10_000},
+    '100k': {'books': 100_000, 'copies': 100_000},
+    '1m': {'books': 1_000_000, 'copies': 1_000_000},
+}
+
+# Объект, id которого подставляется в URL с параметром pk
+SAMPLE_MODELS = {
+    'book-detail': Book, 'book_update': Book, 'book_delete': Book, 'api-book-detail': Book,
+    'author-detail': Author, 'author_update': Author, 'author_delete': Author, 'api-author-detail': Author,
+    'renew-book-librarian': BookInstance, 'api-copy-detail': BookInstance,
+}
+SAMPLE_QUERIES = {'book-search': '?q=title', 'book-search-api': '?q=title'}
+
+
+def git_revision():
+    """
+    Returns (commit, dirty) of the working tree, or (None, None) outside a git checkout.
+    """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                                cwd=settings.BASE_DIR).stdout.strip()
+        status = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], capture_output=True,
+                                text=True, check=True, cwd=settings.BASE_DIR).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, bool(status.strip())
+
+
+def _walk(patterns):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from _walk(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            yield pattern
+
+
+def catalog_targets():
+    """
+    Returns [(name, path)] for every named URL of books_core.urls and the admin changelists of the app.
+    URLs with parameters get the first object of the matching model, the rest with parameters are skipped.
+    """
+    targets = []
+    for pattern in _walk(urls.urlpatterns):
+        converters = pattern.pattern.converters if hasattr(pattern.pattern, 'converters') else {}
+        params = set(converters) | set(pattern.pattern.regex.groupindex)
+        if 'format' in params:
+            continue  # DRF-суффиксы .json/.api повторяют те же страницы
+        kwargs = {}
+        if params:
+            model = SAMPLE_MODELS.get(pattern.name)
+            if params != {'pk'} or model is None:
+                continue
+            obj = model.objects.order_by('pk').first()
+            if obj is None:
+                continue
+            kwargs['pk'] = obj.pk
+        targets.append((pattern.name, reverse(pattern.name, kwargs=kwargs) + SAMPLE_QUERIES.get(pattern.name, '')))
+
+    for model in admin.site._registry:
+        if model._meta.app_label == 'books_core':
+            name = f'admin:{model._meta.app_label}_{model._meta.model_name}_changelist'
+            targets.append((name, reverse(name)))
+    return targets
+
+
+@contextmanager
+def benchmark_database(sizes, workdir, reseed=False, log=None):
+    """
+    Switches the default database to an SQLite file in workdir seeded with the catalog of the given sizes.
+    The file is kept for the next run with the same sizes unless reseed is given.
+    """
+    connection = connections[DEFAULT_DB_ALIAS]
+    if connection.vendor != 'sqlite':
+        raise CommandError('The benchmark database is created for SQLite only')
+    path = os.path.join(workdir, f'books-bench-{sizes["books"]}-{sizes["copies"]}.sqlite3')
+    keep = os.path.exists(path) and not reseed
+    connection.settings_dict['TEST'] = {**connection.settings_dict.get('TEST', {}), 'NAME': path}
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=keep, serialize=False)
+    try:
+        if not Book.objects.exists():
+            if log is not None:
+                log.write(f'Seeding {path}')
+            call_command('seed_catalog', books=sizes['books'], copies=sizes['copies'], stdout=log)
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+        yield path
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=True)
+
+
+def dataset_sizes(options):
+    sizes = {**SIZES[options['size']]}
+    for name in ('books', 'copies'):
+        if options[name]:
+            sizes[name] = options[name]
+    return sizes
+
+
+def environment():
+    commit, dirty = git_revision()
+    return {
+        'commit': commit,
+        'dirty': dirty,
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'sqlite': sqlite3.sqlite_version,
+    }
+
+
+class QueryCounter:
+    """
+    execute_wrapper counting the queries. CaptureQueriesContext does not fit here: with DEBUG on the query log
+    is cleared at the start of every request.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def _get(client, path):
+    response = client.get(path)
+    if response.streaming:
+        # Потоковый ответ формируется при чтении, его время тоже входит в замер
+        response.streaming_content = [b''.join(response.streaming_content)]
+    return response
+
+
+def measure(client, path, repeat):
+    """
+    Requests the page repeat times after a warm-up request. Returns latency, query count and peak memory.
+    """
+    started = time.perf_counter()
+    _get(client, path)
+    first_ms = (time.perf_counter() - started) * 1000
+
+    timings = []
+    for _ in range(repeat):
+        queries = QueryCounter()
+        with connections[DEFAULT_DB_ALIAS].execute_wrapper(queries):
+            started = time.perf_counter()
+            _get(client, path)
+            timings.append((time.perf_counter() - started) * 1000)
+
+    # Память измеряется отдельным запросом: tracemalloc замедляет выполнение
+    tracemalloc.start()
+    try:
+        response = _get(client, path)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    timings.sort()
+    return {
+        'path': path,
+        'status': response.status_code,
+        'first_ms': round(first_ms, 2),
+        'median_ms': round(statistics.median(timings), 2),
+        'p95_ms': round(timings[min(int(len(timings) * 0.95), len(timings) - 1)], 2),
+        'queries': queries.count,
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+def run_benchmark(repeat, only=None):
+    """
+    Measures all catalog targets with a logged in superuser, reads pinned to the primary database.
+    """
+    user, _ = User.objects.get_or_create(username='benchmark', defaults={'is_staff': True, 'is_superuser': True})
+    results = {}
+    with routers.use_primary(), override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+        client = Client()
+        client.force_login(user)
+        for name, path in catalog_targets():
+            if only and not any(part in name for part in only):
+                continue
+            results[name] = measure(client, path, repeat)
+    return results
+
+
+class Command(BaseCommand):
+    help = (
+        'Seeds a separate benchmark database with a catalog of the given size and measures latency, queries and '
+        'peak memory of every catalog URL and admin changelist. Prints a JSON report that can be compared with '
+        'a report of another commit (--compare).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', choices=list(SIZES), default='10k', help='Number of books and copies')
+        parser.add_argument('--books', type=int, help='Overrides the number of books of --size')
+        parser.add_argument('--copies', type=int, help='Overrides the number of copies of --size')
+        parser.add_argument('--repeat', type=int, default=10, help='Measured requests per URL')
+        parser.add_argument('--only', action='append', help='Measure only URLs whose name contains this, repeatable')
+        parser.add_argument('--workdir', default=tempfile.gettempdir(),
+                            help='Where the seeded databases are kept between runs')
+        parser.add_argument('--reseed', action='store_true', help='Seed again even if the database exists')
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+        parser.add_argument('--compare', help='JSON report to compare the median latency and queries with')
+
+    def handle(self, *args, **options):
+        sizes = dataset_sizes(options)
+        with benchmark_database(sizes, options['workdir'], options['reseed'], self.stderr):
+            results = run_benchmark(options['repeat'], options['only'])
+
+        report = {
+            **environment(),
+            'dataset': sizes,
+            'repeat': options['repeat'],
+            'results': results,
+        }
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+        if options['compare']:
+            with open(options['compare']) as file:
+                self.print_comparison(json.load(file), report)
+
+    def print_comparison(self, base, report):
+        self.stderr.write(f'{"url":<44}{"ms before":>11}{"ms after":>10}{"change":>9}{"queries":>12}')
+        for name, result in report['results'].items():
+            before = base['results'].get(name)
+            if before is None:
+                continue
+            change = (result['median_ms'] - before['median_ms']) / before['median_ms'] * 100 if before['median_ms'] else 0
+            self.stderr.write(f'{name:<44}{before["median_ms"]:>11}{result["median_ms"]:>10}{change:>+8.0f}%'
+                              f'{before["queries"]:>6} -> {result["queries"]:<3}')
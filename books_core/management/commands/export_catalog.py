@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from books_core import exports
+
+
+class Command(BaseCommand):
+    help = 'Writes the catalog, the copies or the current loans as CSV or JSON Lines without loading them into memory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', choices=list(exports.EXPORTS))
+        parser.add_argument('--format', choices=list(exports.FORMATS), default='csv')
+        parser.add_argument('--output', help='File to write, stdout by default')
+        parser.add_argument('--chunk-size', type=int, default=exports.CHUNK_SIZE, help='Rows fetched per query')
+
+    def handle(self, *args, **options):
+        lines = exports.render(options['name'], options['format'], options['chunk_size'])
+        if not options['output']:
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+        # newline='' - csv.writer уже завершает строки \r\n
+        with open(options['output'], 'w', encoding='utf-8', newline='') as file:
+            rows = 0
+            for line in lines:
+                file.write(line)
+                rows += 1
+        self.stderr.write(f'{rows} lines written to {options["output"]}')
@@ -0,0 +1,109 @@
+import http.client
+import itertools
+import json
+import statistics
+import threading
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def run_load(base_url, paths, concurrency, total, headers, timeout):
+    """
+    Sends `total` GET requests to the paths (round robin) from `concurrency` threads with keep-alive connections.
+    Returns the summary dict.
+    """
+    url = urlsplit(base_url)
+    connection_class = http.client.HTTPSConnection if url.scheme == 'https' else http.client.HTTPConnection
+    counter = itertools.count()
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def worker():
+        connection = connection_class(url.hostname, url.port, timeout=timeout)
+        while (num := next(counter)) < total:
+            path = url.path.rstrip('/') + paths[num % len(paths)]
+            started = time.perf_counter()
+            try:
+                connection.request('GET', path, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException) as exc:
+                connection.close()
+                connection = connection_class(url.hostname, url.port, timeout=timeout)
+                status = repr(exc)
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                if status != 200:
+                    errors.append(status)
+        connection.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'error_samples': sorted({str(error) for error in errors})[:5],
+        'throughput_rps': round(len(latencies) / wall, 1),
+        'p50_ms': round(statistics.median(latencies) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'max_ms': round(max(latencies) * 1000, 2),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Load test of running servers, e.g. the same catalog under WSGI and under ASGI:\n'
+        '  gunicorn core.wsgi:application -w 1 --threads 8 -b :8001\n'
+        '  uvicorn core.asgi:application --port 8002   (with ASYNC_CATALOG_VIEWS = True)\n'
+        '  manage.py loadtest --target wsgi=http://localhost:8001 --target asgi=http://localhost:8002 '
+        '--path /catalog/authors/ --path /catalog/author/1/'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', action='append', required=True, metavar='NAME=URL',
+                            help='Server to test, can be repeated')
+        parser.add_argument('--path', action='append', help='Path to request, can be repeated '
+                                                            '(default: /catalog/authors/)')
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--requests', type=int, default=1000, help='Requests per target')
+        parser.add_argument('--cookie', help='Cookie header, e.g. "sessionid=..." for pages that need login')
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+
+    def handle(self, *args, **options):
+        targets = []
+        for target in options['target']:
+            name, sep, url = target.partition('=')
+            if not sep:
+                raise CommandError(f'--target must look like NAME=URL, got "{target}"')
+            targets.append((name, url))
+
+        headers = {'Cookie': options['cookie']} if options['cookie'] else {}
+        paths = options['path'] or ['/catalog/authors/']
+        results = {
+            name: run_load(url, paths, options['concurrency'], options['requests'], headers, options['timeout'])
+            for name, url in targets
+        }
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(f'{"target":<12}{"rps":>10}{"p50 ms":>10}{"p99 ms":>10}{"max ms":>10}{"errors":>8}')
+        for name, result in results.items():
+            self.stdout.write(f'{name:<12}{result["throughput_rps"]:>10}{result["p50_ms"]:>10}'
+                              f'{result["p99_ms"]:>10}{result["max_ms"]:>10}{result["errors"]:>8}')
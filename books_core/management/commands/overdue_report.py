@@ -0,0 +1,33 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+
+from books_core import notices
+from books_core.models import BookInstance
+
+
+class Command(BaseCommand):
+    help = 'Overdue loans: a summary grouped by borrower or book, or one notice per borrower (--notices)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--group-by', choices=['borrower', 'book'], default='borrower')
+        parser.add_argument('--limit', type=int, default=50, help='Rows in the summary')
+        parser.add_argument('--notices', action='store_true', help='Print JSON lines with a notice per borrower')
+        parser.add_argument('--batch-size', type=int, default=500, help='Notices computed per batch')
+
+    def handle(self, *args, **options):
+        if options['notices']:
+            total = 0
+            for batch in notices.batched(notices.overdue_notices(chunk_size=options['batch_size'] * 4),
+                                         options['batch_size']):
+                for notice in batch:
+                    self.stdout.write(json.dumps(notice._asdict(), cls=DjangoJSONEncoder, ensure_ascii=False))
+                total += len(batch)
+                self.stderr.write(f'{total} notices')
+            return
+
+        summary = BookInstance.objects.overdue_summary(by=options['group_by'])[:options['limit']]
+        label = 'borrower__username' if options['group_by'] == 'borrower' else 'book__title'
+        for row in summary:
+            self.stdout.write(f'{row[label]}: {row["num_overdue"]} overdue, oldest due {row["oldest_due_back"]}')
@@ -0,0 +1,37 @@
+import json
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from books_core import profiling
+
+
+class Command(BaseCommand):
+    help = (
+        'Per URL statistics of the profiled requests (books_core.profiling), merged from the aggregates the '
+        'web workers publish to the cache every 30 seconds. Needs a cache shared with the workers.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--json', action='store_true', help='Print the statistics as JSON')
+        parser.add_argument('--limit', type=int, default=30, help='Number of URLs in the table')
+
+    def handle(self, *args, **options):
+        keys = list(cache.get(profiling.WORKERS_KEY) or {})
+        published = cache.get_many(keys)
+        summary = profiling.summarize(profiling.merge(published.values()))
+
+        if options['json']:
+            self.stdout.write(json.dumps({'workers': len(published), 'views': summary}, indent=2))
+            return
+        if not summary:
+            self.stdout.write('No published statistics (is the cache shared with the web workers?)')
+            return
+        self.stdout.write(f'{len(published)} workers')
+        self.stdout.write(f'{"url":<44}{"count":>8}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}'
+                          f'{"queries":>9}{"db ms":>8}{"tpl ms":>8}{"cache hit":>10}')
+        for name, row in list(summary.items())[:options['limit']]:
+            ratio = '-' if row['cache_hit_ratio'] is None else f'{row["cache_hit_ratio"]:.0%}'
+            self.stdout.write(f'{name:<44}{row["count"]:>8}{row["p50_ms"]:>9.1f}{row["p95_ms"]:>9.1f}'
+                              f'{row["p99_ms"]:>9.1f}{row["avg_queries"]:>9}{row["avg_db_ms"]:>8}'
+                              f'{row["avg_template_ms"]:>8}{ratio:>10}')
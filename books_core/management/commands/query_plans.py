@@ -0,0 +1,49 @@
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from books_core.models import Author, Book, BookInstance
+
+
+def hot_queries():
+    """
+    Queries behind the catalog pages: (name, queryset, callable running the query the way the view does).
+    """
+    borrower = User.objects.filter(bookinstance__status='o').order_by('pk').first()
+    loans = (BookInstance.objects.filter(borrower=borrower, status__exact='o')
+             .order_by('due_back', 'id'))
+    borrowed = BookInstance.objects.filter(due_back__isnull=False).order_by('due_back', 'id')
+    available = BookInstance.objects.filter(status__exact='a').order_by()
+    books = Book.objects.order_by('title', 'id')
+    authors = Author.objects.order_by('last_name', 'first_name', 'id')
+    return [
+        ('my-borrowed', loans, lambda: list(loans[:10])),
+        ('all-borrowed', borrowed, lambda: list(borrowed[:20])),
+        ('index: available copies', available, available.count),
+        ('books: page 1000', books, lambda: list(books[4000:4004])),
+        ('authors: first page', authors, lambda: list(authors[:3])),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        'Prints the query plan and the run time of the catalog hot queries. '
+        'To compare with and without indexes run it after "migrate books_core 0004" and after "migrate".'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5, help='How many times each query is run')
+
+    def handle(self, *args, **options):
+        for name, queryset, run in hot_queries():
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                run()
+                timings.append((time.perf_counter() - started) * 1000)
+
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(queryset.explain())
+            self.stdout.write(f'median {statistics.median(timings):.2f} ms, max {max(timings):.2f} ms\n')
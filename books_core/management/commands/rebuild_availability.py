@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from books_core import availability
+
+
+class Command(BaseCommand):
+    help = 'Recounts the copies of every book by status (BookAvailability)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        rows = availability.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Availability rebuilt for {rows} books'))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from books_core import counters
+
+
+class Command(BaseCommand):
+    help = 'Recounts the home page counters and stores them in the cache'
+
+    def handle(self, *args, **options):
+        for name, value in counters.rebuild().items():
+            self.stdout.write(f'{name}: {value}')
+        self.stdout.write(self.style.SUCCESS('Counters rebuilt'))
@@ -0,0 +1,82 @@
+import datetime
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from books_core import availability, counters, versioning
+from books_core.models import Author, Book, BookInstance, Genre, Language
+
+STATUSES = [code for code, _ in BookInstance.LOAN_STATUS]
+
+
+class Command(BaseCommand):
+    help = 'Fills the database with generated catalog data (for benchmarks and query plan checks)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, default=10000, help='Number of books')
+        parser.add_argument('--copies', type=int, default=100000, help='Number of book copies')
+        parser.add_argument('--authors', type=int, help='Number of authors (default: books / 10)')
+        parser.add_argument('--borrowers', type=int, default=1000, help='Number of users borrowing books')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42, help='Random seed, the same seed gives the same data')
+
+    def handle(self, *args, **options):
+        rnd = random.Random(options['seed'])
+        batch_size = options['batch_size']
+        started = time.perf_counter()
+
+        with transaction.atomic():
+            languages = Language.objects.bulk_create(
+                [Language(name=name) for name in ('English', 'French', 'German', 'Russian', 'Japanese')]
+            )
+            genres = Genre.objects.bulk_create([Genre(name=f'Genre {num}') for num in range(20)])
+            authors = Author.objects.bulk_create(
+                (Author(first_name=f'First {num}', last_name=f'Last {rnd.randrange(5000)}')
+                 for num in range(options['authors'] or max(options['books'] // 10, 1))),
+                batch_size=batch_size,
+            )
+            borrowers = User.objects.bulk_create(
+                (User(username=f'seed-borrower-{num}-{options["seed"]}') for num in range(options['borrowers'])),
+                batch_size=batch_size,
+            )
+        self.stdout.write(f'{len(authors)} authors, {len(borrowers)} borrowers')
+
+        book_ids = []
+        for start in range(0, options['books'], batch_size):
+            with transaction.atomic():
+                books = Book.objects.bulk_create([
+                    Book(title=f'Title {rnd.randrange(10 ** 6):06d} {num}', summary=f'Summary of book {num}',
+                         isbn=f'{rnd.randrange(10 ** 13):013d}', author=rnd.choice(authors),
+                         language=rnd.choice(languages))
+                    for num in range(start, min(start + batch_size, options['books']))
+                ])
+                Book.genre.through.objects.bulk_create([
+                    Book.genre.through(book_id=book.pk, genre_id=genre.pk)
+                    for book in books for genre in rnd.sample(genres, rnd.randint(1, 3))
+                ])
+                book_ids.extend(book.pk for book in books)
+        self.stdout.write(f'{len(book_ids)} books')
+
+        today = datetime.date.today()
+        for start in range(0, options['copies'], batch_size):
+            copies = []
+            for _ in range(start, min(start + batch_size, options['copies'])):
+                status = rnd.choice(STATUSES)
+                on_loan = status == 'o'
+                copies.append(BookInstance(
+                    book_id=rnd.choice(book_ids), imprint=f'Imprint {rnd.randrange(100)}', status=status,
+                    borrower=rnd.choice(borrowers) if on_loan else None,
+                    due_back=today + datetime.timedelta(days=rnd.randint(-30, 30)) if on_loan else None,
+                ))
+            with transaction.atomic():
+                BookInstance.objects.bulk_create(copies)
+        self.stdout.write(f'{options["copies"]} copies')
+
+        # bulk_create не отправляет сигналы: пересчитываем счётчики, доступность и обновляем версию каталога
+        counters.rebuild()
+        availability.rebuild()
+        versioning.bump(versioning.CATALOG, versioning.TITLES)
+        self.stdout.write(self.style.SUCCESS(f'Catalog seeded in {time.perf_counter() - started:.1f}s'))
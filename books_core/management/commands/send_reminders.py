@@ -0,0 +1,38 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from books_core import notices
+
+
+class Command(BaseCommand):
+    help = (
+        'Sends one e-mail per borrower listing the loans due back within --days days (or overdue with --overdue). '
+        'Messages are sent in batches over reused mail connections.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=3, help='Remind about loans due within this many days')
+        parser.add_argument('--overdue', action='store_true', help='Send notices about overdue loans instead')
+        parser.add_argument('--batch-size', type=int, default=100, help='Messages per send_messages() call')
+        parser.add_argument('--concurrency', type=int, default=1, help='Sending threads, each with its own connection')
+        parser.add_argument('--rate', type=float, default=0, help='Messages per second, 0 for no limit')
+
+    def handle(self, *args, **options):
+        if getattr(settings, 'EMAIL_DISABLED', False):
+            self.stdout.write(self.style.WARNING('EMAIL_DISABLED is on, nothing is sent'))
+            return
+
+        if options['overdue']:
+            selected = notices.overdue_notices(chunk_size=options['batch_size'] * 10)
+            template_name, subject = 'books_core/email/overdue.txt', 'Overdue books'
+        else:
+            selected = notices.due_soon_notices(options['days'], chunk_size=options['batch_size'] * 10)
+            template_name, subject = 'books_core/email/due_soon.txt', 'Books due back soon'
+
+        started = time.perf_counter()
+        stats = notices.send_notices(selected, template_name, subject, batch_size=options['batch_size'],
+                                     concurrency=options['concurrency'], rate=options['rate'])
+        self.stdout.write(f'{stats["sent"]} sent, {stats["skipped"]} without e-mail, {stats["failed"]} failed '
+                          f'in {time.perf_counter() - started:.1f}s')
@@ -0,0 +1,108 @@
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date, parse_etags
+
+from books_core import routers
+from books_core.staticfiles import ENCODINGS, collected_files
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+
+class ReplicaPinningMiddleware:
+    """
+    Pins requests that change data to the primary database and sets a short-lived cookie, so the requests
+    of the same client in the next settings.REPLICA_PIN_SECONDS read from the primary too (read after write).
+    """
+    cookie_name = 'pin_primary'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        unsafe = request.method not in SAFE_METHODS
+        token = routers.begin_request(pinned=unsafe or self.cookie_name in request.COOKIES)
+        try:
+            response = self.get_response(request)
+        finally:
+            routers.end_request(token)
+        if unsafe and routers.replicas():
+            response.set_cookie(self.cookie_name, '1', max_age=settings.REPLICA_PIN_SECONDS,
+                                httponly=True, samesite='Lax')
+        return response
+
+
+def accepted_encodings(header):
+    """
+    Content codings the client accepts from an Accept-Encoding header (without the ones with q=0).
+    """
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        quality = params.strip()
+        if quality.startswith('q=') and quality[2:].strip() in ('0', '0.0', '0.00', '0.000'):
+            continue
+        if coding:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+class StaticFilesMiddleware:
+    """
+    Serves the files collected to STATIC_ROOT before the rest of the middleware. Hashed names of the manifest
+    get far-future immutable caching, the .br/.gz variants written by collectstatic are chosen by
+    Accept-Encoding. The file is handed to the server as is (FileResponse), servers with wsgi.file_wrapper send
+    it with sendfile(). STATIC_ROOT is indexed once, run collectstatic before starting the server.
+    """
+    immutable_max_age = 365 * 24 * 60 * 60
+    max_age = 60
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        static_url = settings.STATIC_URL or ''
+        # STATIC_URL на другом хосте (CDN) - файлы отдаёт не этот процесс
+        self.prefix = static_url if static_url.startswith('/') else None
+        self.files = collected_files(settings.STATIC_ROOT) if self.prefix else {}
+
+    def __call__(self, request):
+        if (self.prefix is None or request.method not in ('GET', 'HEAD')
+                or not request.path_info.startswith(self.prefix)):
+            return self.get_response(request)
+        static_file = self.files.get(request.path_info[len(self.prefix):])
+        if static_file is None:
+            return self.get_response(request)
+        return self.serve(request, static_file)
+
+    def serve(self, request, static_file):
+        path, size, encoding = static_file.path, static_file.size, None
+        accepted = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        for name, _ in ENCODINGS:
+            if name in static_file.variants and name in accepted:
+                (path, size), encoding = static_file.variants[name], name
+                break
+        # У каждого варианта свой ETag: сильный валидатор не может совпадать у разных байтов
+        etag = f'{static_file.mtime:x}-{static_file.size:x}' + (f'-{encoding}' if encoding else '')
+        headers = {
+            'Cache-Control': (f'public, max-age={self.immutable_max_age}, immutable' if static_file.immutable
+                              else f'public, max-age={self.max_age}'),
+            'ETag': f'"{etag}"',
+            'Last-Modified': http_date(static_file.mtime),
+            'X-Content-Type-Options': 'nosniff',
+        }
+        if headers['ETag'] in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            response = HttpResponseNotModified()
+        else:
+            if request.method == 'HEAD':
+                response = HttpResponse(content_type=static_file.content_type)
+            else:
+                response = FileResponse(open(path, 'rb'), content_type=static_file.content_type)
+                # FileResponse добавляет имя файла (с .gz/.br), для статики оно не нужно
+                del response['Content-Disposition']
+            response['Content-Length'] = size
+            if encoding:
+                response['Content-Encoding'] = encoding
+        for name, value in headers.items():
+            response[name] = value
+        if static_file.variants:
+            patch_vary_headers(response, ['Accept-Encoding'])
+        return response
@@ -0,0 +1,80 @@
+from django.db import migrations, OperationalError
+
+# Имя должно совпадать с books_core.search.FTS_TABLE
+FTS_TABLE = 'books_core_book_fts'
+
+AUTHOR_NAME = "coalesce((SELECT last_name || ' ' || first_name FROM books_core_author WHERE id = {}), '')"
+
+CREATE_STATEMENTS = [
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(title, summary, author, tokenize = 'unicode61 remove_diacritics 2')",
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_book_insert AFTER INSERT ON books_core_book BEGIN
+        INSERT INTO {FTS_TABLE} (rowid, title, summary, author)
+        VALUES (new.id, new.title, new.summary, {AUTHOR_NAME.format('new.author_id')});
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_book_update AFTER UPDATE OF title, summary, author_id ON books_core_book BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+        INSERT INTO {FTS_TABLE} (rowid, title, summary, author)
+        VALUES (new.id, new.title, new.summary, {AUTHOR_NAME.format('new.author_id')});
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_book_delete AFTER DELETE ON books_core_book BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_author_update AFTER UPDATE OF first_name, last_name ON books_core_author BEGIN
+        UPDATE {FTS_TABLE} SET author = new.last_name || ' ' || new.first_name
+        WHERE rowid IN (SELECT id FROM books_core_book WHERE author_id = new.id);
+    END
+    """,
+    f"""
+    INSERT INTO {FTS_TABLE} (rowid, title, summary, author)
+    SELECT id, title, summary, {AUTHOR_NAME.format('books_core_book.author_id')} FROM books_core_book
+    """,
+]
+
+DROP_STATEMENTS = [
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_book_insert',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_book_update',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_book_delete',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_author_update',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+
+
+def create_fts(apps, schema_editor):
+    """
+    Full-text index exists only on SQLite built with FTS5, other backends use the LIKE fallback of books_core.search.
+    """
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        try:
+            cursor.execute(CREATE_STATEMENTS[0])
+        except OperationalError:
+            return
+        for statement in CREATE_STATEMENTS[1:]:
+            cursor.execute(statement)
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for statement in DROP_STATEMENTS:
+            cursor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books_core', '0005_catalog_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts, drop_fts),
+    ]
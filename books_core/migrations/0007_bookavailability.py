@@ -0,0 +1,49 @@
+# Generated by Django 4.0.10 on 2026-10-18 18:06
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Q
+import django.db.models.deletion
+
+# Повторяет books_core.availability.rebuild() на исторических моделях
+STATUS_FIELDS = {'a': 'available', 'o': 'on_loan', 'm': 'maintenance', 'r': 'reserved'}
+
+
+def fill_availability(apps, schema_editor):
+    db = schema_editor.connection.alias
+    Book = apps.get_model('books_core', 'Book')
+    BookInstance = apps.get_model('books_core', 'BookInstance')
+    BookAvailability = apps.get_model('books_core', 'BookAvailability')
+    counts = {
+        row.pop('book_id'): row
+        for row in BookInstance.objects.using(db).exclude(book=None).order_by().values('book_id').annotate(
+            **{field: Count('id', filter=Q(status=status)) for status, field in STATUS_FIELDS.items()},
+            next_due_back=Min('due_back', filter=Q(status='o')),
+        )
+    }
+    BookAvailability.objects.using(db).bulk_create(
+        (BookAvailability(book_id=book_id, **counts.get(book_id, {}))
+         for book_id in Book.objects.using(db).values_list('pk', flat=True).iterator()),
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books_core', '0006_book_search_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookAvailability',
+            fields=[
+                ('book', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='availability', serialize=False, to='books_core.book')),
+                ('available', models.PositiveIntegerField(default=0)),
+                ('on_loan', models.PositiveIntegerField(default=0)),
+                ('maintenance', models.PositiveIntegerField(default=0)),
+                ('reserved', models.PositiveIntegerField(default=0)),
+                ('next_due_back', models.DateField(blank=True, help_text='Earliest due date of the copies on loan', null=True)),
+            ],
+        ),
+        migrations.RunPython(fill_availability, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.0.10 on 2026-10-18 18:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books_core', '0007_bookavailability'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['language', 'title', 'id'], name='book_language_title_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.0.10 on 2026-10-18 19:12
+
+import time
+
+from django.db import migrations, models
+
+# Общие пространства books_core.versioning: без строк у страниц каталога не было бы Last-Modified до первой записи
+NAMESPACES = ('catalog', 'taxonomy', 'titles', 'facets')
+
+
+def create_stamps(apps, schema_editor):
+    VersionStamp = apps.get_model('books_core', 'VersionStamp')
+    now = time.time()
+    VersionStamp.objects.using(schema_editor.connection.alias).bulk_create(
+        [VersionStamp(namespace=namespace, version=1, changed=now) for namespace in NAMESPACES]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books_core', '0008_book_language_title_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionStamp',
+            fields=[
+                ('namespace', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('changed', models.FloatField(help_text='Time of the last change (Unix timestamp)')),
+            ],
+        ),
+        migrations.RunPython(create_stamps, migrations.RunPython.noop),
+    ]
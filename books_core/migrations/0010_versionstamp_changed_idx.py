@@ -0,0 +1,18 @@
+# Generated by Django 4.0.10 on 2026-10-18 19:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books_core', '0009_versionstamp'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='versionstamp',
+            name='changed',
+            field=models.FloatField(db_index=True, help_text='Time of the last change (Unix timestamp)'),
+        ),
+    ]
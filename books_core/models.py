@@ -1,10 +1,25 @@
 import uuid
-from datetime import date
+from datetime import date, timedelta
 
 from django.contrib.auth.models import User
 from django.db import models
+from django.db.models import BooleanField, Count, ExpressionWrapper, Min, Q
 from django.urls import reverse
 
+from books_core import snapshot
+
+
+class LoadedValuesMixin:
+    """
+    Keeps the field values the object was loaded with, signals compare them with the saved ones.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {name: instance.__dict__[name] for name in field_names}
+        return instance
+
 
 class Genre(models.Model):
     """
@@ -32,7 +47,7 @@ class Language(models.Model):
         return self.name
 
 
-class Book(models.Model):
+class Book(LoadedValuesMixin, models.Model):
     """
     Model representing a book (but not a specific copy of a book).
     """
@@ -66,6 +81,15 @@ class Book(models.Model):
         null=True
     )
 
+    class Meta:
+        indexes = [
+            # Список книг сортируется по названию (и id для постраничного вывода по курсору)
+            models.Index(fields=['title', 'id'], name='book_title_idx'),
+            # Фильтр по языку (books_core.facets) с той же сортировкой: языков мало, и обход book_title_idx
+            # для редкого языка просматривал бы почти всю таблицу
+            models.Index(fields=['language', 'title', 'id'], name='book_language_title_idx'),
+        ]
+
     def __str__(self):
         """
         String for representing the Model object.
@@ -90,7 +114,49 @@ class Book(models.Model):
     #     return 'pfgjhfdhgdj'
 
 
-class BookInstance(models.Model):
+class BookInstanceQuerySet(models.QuerySet):
+    """
+    Loan queries computed by the database, so overdue lists do not need every row in Python.
+    """
+
+    def on_loan(self):
+        return self.filter(status__exact='o')
+
+    def overdue(self, today=None):
+        """
+        Copies on loan with the due date in the past.
+        """
+        return self.on_loan().filter(due_back__lt=today or date.today())
+
+    def due_within(self, days, today=None):
+        """
+        Copies on loan due back between today and `days` days ahead (inclusive).
+        """
+        today = today or date.today()
+        return self.on_loan().filter(due_back__gte=today, due_back__lte=today + timedelta(days=days))
+
+    def with_overdue(self, today=None):
+        """
+        Annotates `overdue`, which BookInstance.is_overdue returns instead of comparing dates per row.
+        """
+        return self.annotate(
+            overdue=ExpressionWrapper(Q(due_back__lt=today or date.today()), output_field=BooleanField())
+        )
+
+    def overdue_summary(self, by='borrower', today=None):
+        """
+        Overdue copies grouped by borrower or by book: number of copies and the oldest due date.
+        """
+        group = {
+            'borrower': ('borrower_id', 'borrower__username'),
+            'book': ('book_id', 'book__title'),
+        }[by]
+        return (self.overdue(today).values(*group)
+                .annotate(num_overdue=Count('id'), oldest_due_back=Min('due_back'))
+                .order_by('-num_overdue', group[0]))
+
+
+class BookInstance(LoadedValuesMixin, models.Model):
     """
     Model representing a specific copy of a book (i.e. that can be borrowed from the library).
     """
@@ -133,8 +199,18 @@ class BookInstance(models.Model):
         blank=True
     )
 
+    objects = BookInstanceQuerySet.as_manager()
+
     class Meta:
         ordering = ["due_back"]
+        indexes = [
+            # Книги пользователя (LoanedBooksByUserListView)
+            models.Index(fields=['borrower', 'status', 'due_back'], name='bookinst_borrower_status_idx'),
+            # Доступные экземпляры на главной странице
+            models.Index(fields=['status'], name='bookinst_status_idx'),
+            # Сортировка по дате возврата (Meta.ordering, BorrowedBookStaffList)
+            models.Index(fields=['due_back', 'id'], name='bookinst_due_back_idx'),
+        ]
         permissions = (
             ("can_mark_returned", "Set book as returned"),
             ('staff_perms', 'Staff permissions')
@@ -142,6 +218,9 @@ class BookInstance(models.Model):
 
     @property
     def is_overdue(self):
+        # Значение, посчитанное базой в BookInstanceQuerySet.with_overdue()
+        if 'overdue' in self.__dict__:
+            return bool(self.overdue)
         if self.due_back and date.today() > self.due_back:
             return True
         return False
@@ -150,9 +229,56 @@ class BookInstance(models.Model):
         """
         String for representing the Model object
         """
+        if not BookInstance.book.is_cached(self):
+            # Название из снимка каталога, без запроса Book на каждый экземпляр. Снимок здесь не строится:
+            # пока его нет (или в нём нет книги), название читается из базы
+            current = snapshot.current()
+            title = current.title(self.book_id) if current is not None else None
+            if title is not None:
+                return f'{self.id} {title}'
         return f'{self.id} {self.book.title}'
 
 
+class BookAvailability(models.Model):
+    """
+    Number of copies of a book in each status, kept in sync by books_core.availability.
+    """
+    book = models.OneToOneField(
+        'Book',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='availability'
+    )
+    available = models.PositiveIntegerField(default=0)
+    on_loan = models.PositiveIntegerField(default=0)
+    maintenance = models.PositiveIntegerField(default=0)
+    reserved = models.PositiveIntegerField(default=0)
+    next_due_back = models.DateField(
+        null=True,
+        blank=True,
+        help_text='Earliest due date of the copies on loan'
+    )
+
+    # Индекс по available не нужен: с ним SQLite выбирает поиск по available и сортировку всех книг вместо
+    # обхода book_title_idx для списка доступных книг (?available=1)
+
+    def __str__(self):
+        return f'{self.book_id}: {self.available} available'
+
+
+class VersionStamp(models.Model):
+    """
+    Version of a part of the catalog data, bumped by books_core.versioning in the transaction of the change.
+    """
+    namespace = models.CharField(max_length=100, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+    # Снимок каталога (books_core.snapshot) ищет книги, изменённые после его построения
+    changed = models.FloatField(db_index=True, help_text='Time of the last change (Unix timestamp)')
+
+    def __str__(self):
+        return f'{self.namespace}: {self.version}'
+
+
 class Author(models.Model):
     """
     Model representing an author.
@@ -173,6 +299,11 @@ class Author(models.Model):
         blank=True
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['last_name', 'first_name', 'id'], name='author_name_idx'),
+        ]
+
     def get_absolute_url(self):
         """
         Returns the url to access a particular author instance.
@@ -0,0 +1,158 @@
+"""
+Notices for borrowers about their loans, computed in batches.
+
+Loans are read with values() and iterator(), ordered by borrower, and grouped into one notice per
+borrower, so memory does not depend on the number of active loans. send_notices() renders the
+notices in batches and sends them over reused mail connections.
+"""
+import logging
+import queue
+import threading
+import time
+from collections import namedtuple
+from itertools import groupby, islice
+from operator import itemgetter
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.template.loader import get_template
+
+from books_core.models import BookInstance
+
+logger = logging.getLogger(__name__)
+
+LOAN_FIELDS = (
+    'id', 'due_back', 'book_id', 'book__title',
+    'borrower_id', 'borrower__username', 'borrower__email', 'borrower__first_name',
+)
+
+Notice = namedtuple('Notice', ['borrower_id', 'username', 'email', 'first_name', 'loans'])
+
+
+def notices_for(queryset, chunk_size=2000):
+    """
+    Yields a Notice for every borrower in the queryset of copies, loans are dicts with LOAN_FIELDS.
+    """
+    rows = (queryset.filter(borrower__isnull=False)
+            .order_by('borrower_id', 'due_back', 'id')
+            .values(*LOAN_FIELDS)
+            .iterator(chunk_size=chunk_size))
+    for borrower_id, loans in groupby(rows, key=itemgetter('borrower_id')):
+        loans = list(loans)
+        first = loans[0]
+        yield Notice(borrower_id, first['borrower__username'], first['borrower__email'],
+                     first['borrower__first_name'], loans)
+
+
+def overdue_notices(today=None, chunk_size=2000):
+    return notices_for(BookInstance.objects.overdue(today), chunk_size=chunk_size)
+
+
+def due_soon_notices(days, today=None, chunk_size=2000):
+    return notices_for(BookInstance.objects.due_within(days, today), chunk_size=chunk_size)
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class RateLimiter:
+    """
+    Lets through at most `rate` messages per second, shared by all sending threads. Rate 0 means no limit.
+    """
+
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate else 0
+        self.lock = threading.Lock()
+        self.next_slot = time.monotonic()
+
+    def wait(self, count=1):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(self.next_slot, now)
+            self.next_slot = slot + self.interval * count
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def render_messages(batch, template_name, subject, from_email=None):
+    """
+    Builds one EmailMessage per notice of the batch. The template is loaded once for the whole batch,
+    borrowers without an e-mail address are skipped.
+    """
+    template = get_template(template_name)
+    return [
+        EmailMessage(subject, template.render({'notice': notice, 'loans': notice.loans}),
+                     from_email or settings.DEFAULT_FROM_EMAIL, [notice.email])
+        for notice in batch if notice.email
+    ]
+
+
+def _close(connection):
+    try:
+        connection.close()
+    except Exception:
+        logger.exception('Failed to close the mail connection')
+
+
+def send_notices(notices, template_name, subject, batch_size=100, concurrency=1, rate=0):
+    """
+    Renders and sends the notices in batches. Every sending thread opens one mail connection and
+    reuses it for all its batches. Returns a dict with the numbers of sent, skipped and failed messages.
+    """
+    if getattr(settings, 'EMAIL_DISABLED', False):
+        return {'sent': 0, 'skipped': sum(len(batch) for batch in batched(notices, batch_size)), 'failed': 0}
+
+    limiter = RateLimiter(rate)
+    # Очередь ограничена, чтобы выборка не обгоняла отправку и не копилась в памяти
+    batches = queue.Queue(maxsize=concurrency * 2)
+    stats = {'sent': 0, 'skipped': 0, 'failed': 0}
+    lock = threading.Lock()
+
+    def worker():
+        # Поток вычитывает очередь до конца при любых ошибках, иначе основной поток навсегда повиснет на put()
+        try:
+            connection = get_connection()
+        except Exception:
+            logger.exception('Failed to open a mail connection')
+            connection = None
+        try:
+            while (messages := batches.get()) is not None:
+                sent, failed = 0, 0
+                if connection is None:
+                    failed = len(messages)
+                else:
+                    try:
+                        limiter.wait(len(messages))
+                        sent = connection.send_messages(messages) or 0
+                    except Exception:
+                        logger.exception('Failed to send %d notices', len(messages))
+                        # Соединение переоткрывается при следующей отправке
+                        _close(connection)
+                        failed = len(messages)
+                with lock:
+                    stats['sent'] += sent
+                    stats['failed'] += failed
+        finally:
+            if connection is not None:
+                _close(connection)
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    try:
+        for batch in batched(notices, batch_size):
+            messages = render_messages(batch, template_name, subject)
+            stats['skipped'] += len(batch) - len(messages)
+            if messages:
+                batches.put(messages)
+    finally:
+        for _ in threads:
+            batches.put(None)
+        for thread in threads:
+            thread.join()
+    return stats
@@ -0,0 +1,266 @@
+"""
+Keyset (cursor) pagination for the list views.
+
+Offset pagination needs COUNT(*) and an OFFSET scan that gets slower on every next page. In the keyset mode
+the page is selected with a WHERE on the ordering columns of the last shown row, so any page costs the same
+single query. Links carry opaque next/previous tokens instead of page numbers.
+"""
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DatabaseError, connections
+from django.db.models import F, Q
+from django.db.models.constants import LOOKUP_SEP
+from django.http import Http404
+from django.utils.functional import cached_property
+from django.utils.translation import gettext as _
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class KeysetPage:
+    """
+    Page of objects selected with keyset pagination. Mirrors the parts of django.core.paginator.Page
+    used by the templates, page numbers are not known in this mode.
+    """
+    cursor_mode = True
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<KeysetPage of {len(self.object_list)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def encode_cursor(direction, values):
+    payload = json.dumps([direction, values], cls=DjangoJSONEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, size):
+    """
+    Returns (direction, values) stored in the cursor. Raises Http404 for a broken or foreign cursor.
+    """
+    try:
+        payload = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        direction, values = json.loads(payload)
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise Http404(_('Invalid cursor'))
+    if direction not in (NEXT, PREVIOUS) or not isinstance(values, list) or len(values) != size:
+        raise Http404(_('Invalid cursor'))
+    return direction, values
+
+
+def _is_nullable(model, path):
+    """
+    Checks whether the value at the end of the lookup path can be NULL (nullable field or a reverse relation).
+    """
+    for name in path.split(LOOKUP_SEP):
+        field = model._meta.get_field(name)
+        if getattr(field, 'null', False) or not field.concrete:
+            return True
+        model = field.related_model
+    return False
+
+
+def _field(model, path):
+    for name in path.split(LOOKUP_SEP):
+        field = model._meta.get_field(name)
+        model = field.related_model
+    return field
+
+
+def _to_python(model, fields, values):
+    """
+    Converts the cursor values to the types of the keyset fields. Raises Http404 for values the fields
+    do not accept (a tampered cursor).
+    """
+    converted = []
+    for field, value in zip(fields, values):
+        if value is not None:
+            field = _field(model, field.lstrip('-'))
+            try:
+                value = field.to_python(value)
+                field.run_validators(value)
+            except (ValidationError, TypeError, ValueError):
+                raise Http404(_('Invalid cursor'))
+            # Валидаторы полей не проверяют диапазон id, а SQLite не принимает числа больше 64 бит
+            if isinstance(value, int) and not -2 ** 63 <= value < 2 ** 63:
+                raise Http404(_('Invalid cursor'))
+        converted.append(value)
+    return converted
+
+
+def _value(obj, path):
+    for name in path.split(LOOKUP_SEP):
+        obj = getattr(obj, name, None)
+        if obj is None:
+            return None
+    return obj
+
+
+def _order_by(model, field, backwards):
+    """
+    Ordering expression for a keyset field. NULL is always treated as the smallest value.
+    """
+    name = field.lstrip('-')
+    descending = field.startswith('-') != backwards
+    if not _is_nullable(model, name):
+        return f'-{name}' if descending else name
+    return F(name).desc(nulls_last=True) if descending else F(name).asc(nulls_first=True)
+
+
+def _after(model, fields, values, backwards):
+    """
+    Builds the condition selecting the rows that follow the row with the given key values in the
+    (possibly reversed) ordering.
+    """
+    field, value = fields[0], values[0]
+    name = field.lstrip('-')
+    greater = field.startswith('-') == backwards
+
+    if value is None:
+        strict = Q(**{f'{name}__isnull': False}) if greater else None
+        equal = Q(**{f'{name}__isnull': True})
+    else:
+        strict = Q(**{f'{name}__{"gt" if greater else "lt"}': value})
+        if not greater and _is_nullable(model, name):
+            strict |= Q(**{f'{name}__isnull': True})
+        equal = Q(**{name: value})
+
+    if len(fields) == 1:
+        return strict if strict is not None else Q(pk__in=[])
+    following = equal & _after(model, fields[1:], values[1:], backwards)
+    return following if strict is None else strict | following
+
+
+def paginate_keyset(queryset, fields, per_page, cursor=None):
+    """
+    Selects one page of the queryset ordered by the keyset fields ('-' prefix for descending order).
+    The last field must be unique (usually 'id'), so the ordering is total.
+    """
+    model = queryset.model
+    direction, values = decode_cursor(cursor, len(fields)) if cursor else (NEXT, None)
+    if values is not None:
+        values = _to_python(model, fields, values)
+    backwards = direction == PREVIOUS
+
+    queryset = queryset.order_by(*[_order_by(model, field, backwards) for field in fields])
+    if values is not None:
+        queryset = queryset.filter(_after(model, fields, values, backwards))
+
+    # Одна лишняя строка показывает, есть ли следующая страница
+    object_list = list(queryset[:per_page + 1])
+    has_more = len(object_list) > per_page
+    object_list = object_list[:per_page]
+    if backwards:
+        object_list.reverse()
+        has_next, has_previous = True, has_more
+    else:
+        has_next, has_previous = has_more, values is not None
+
+    def cursor_for(direction, obj):
+        return encode_cursor(direction, [_value(obj, field.lstrip('-')) for field in fields])
+
+    return KeysetPage(
+        object_list,
+        next_cursor=cursor_for(NEXT, object_list[-1]) if has_next and object_list else None,
+        previous_cursor=cursor_for(PREVIOUS, object_list[0]) if has_previous and object_list else None,
+    )
+
+
+class KeysetPaginationMixin:
+    """
+    Opt-in keyset pagination for ListView. Used when settings.KEYSET_PAGINATION is on
+    or the request carries a cursor, otherwise the usual page numbers are used.
+    """
+    keyset_fields = ('id',)
+    cursor_kwarg = 'cursor'
+
+    def use_keyset_pagination(self):
+        return self.cursor_kwarg in self.request.GET or getattr(settings, 'KEYSET_PAGINATION', False)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Остальные GET-параметры (фильтры) сохраняются в ссылках на соседние страницы
+        query = self.request.GET.copy()
+        for name in (self.page_kwarg, self.cursor_kwarg):
+            query.pop(name, None)
+        context['pagination_query'] = f'{query.urlencode()}&' if query else ''
+        return context
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.use_keyset_pagination():
+            return super().paginate_queryset(queryset, page_size)
+        page = paginate_keyset(queryset, self.keyset_fields, page_size, self.request.GET.get(self.cursor_kwarg))
+        return None, page, page.object_list, page.has_other_pages()
+
+
+def estimated_count(model, using='default'):
+    """
+    Row count of the model table from the database statistics (sqlite_stat1 after ANALYZE,
+    pg_class.reltuples on PostgreSQL). Returns None when there are no statistics.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    if connection.vendor == 'sqlite':
+        # Первое число в stat - количество строк таблицы (для любого её индекса без условия)
+        sql = 'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1'
+    elif connection.vendor == 'postgresql':
+        sql = 'SELECT reltuples::bigint FROM pg_class WHERE relname = %s'
+    else:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [table])
+            row = cursor.fetchone()
+    except DatabaseError:  # ANALYZE ещё не запускался, таблицы sqlite_stat1 нет
+        return None
+    if row is None:
+        return None
+    count = int(str(row[0]).split()[0])
+    return count if count > 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for big unfiltered querysets: takes the number of rows from the table statistics instead
+    of COUNT(*), which reads the whole table. Filtered querysets and small tables are counted exactly.
+    The last pages may be empty if the statistics are stale.
+    """
+    exact_count_below = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if hasattr(queryset, 'query') and not queryset.query.where and not queryset.query.distinct:
+            estimate = estimated_count(queryset.model, queryset.db)
+            if estimate is not None and estimate >= self.exact_count_below:
+                return estimate
+        return super().count
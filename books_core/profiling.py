@@ -0,0 +1,290 @@
+"""
+Request profiling without an external APM.
+
+ProfilingMiddleware measures the requests when settings.PROFILING is on (settings.PROFILING_SAMPLE_RATE of
+them, every request from settings.INTERNAL_IPS): wall time, number and time of database queries (execute_wrapper), template render time (ProfilingDjangoTemplates
+backend, books_core.jinja.ProfilingJinja2) and cache hits/misses (InstrumentedLocMemCache). The numbers of the
+request are sent in the Server-Timing header, only to settings.INTERNAL_IPS and is_staff users, and aggregated per URL
+name in the process memory (`registry`). The staff view views.profiling_stats shows the aggregate of the
+current process. Every worker also publishes its aggregate to the cache, from where the profiling_stats
+command merges them (this needs a cache shared by the workers, LocMem is per process). Workers that have not
+published for WORKER_TIMEOUT seconds (stopped or restarted) are dropped from the list.
+"""
+import contextvars
+import os
+import random
+import statistics
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+from django.utils.functional import empty
+
+WORKERS_KEY = 'profiling:workers'
+PUBLISH_INTERVAL = 30
+# Агрегат воркера, который столько не публиковался, считается устаревшим
+WORKER_TIMEOUT = PUBLISH_INTERVAL * 10
+_MISSING = object()
+
+_current = contextvars.ContextVar('profiling_stats', default=None)
+
+
+class RequestStats:
+    __slots__ = ('queries', 'db_time', 'template_time', 'template_depth', 'cache_hits', 'cache_misses')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def server_timing(self, total):
+        return ', '.join([
+            f'total;dur={total * 1000:.1f}',
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries"',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+            f'cache;desc="{self.cache_hits} hits, {self.cache_misses} misses"',
+        ])
+
+
+def current():
+    """
+    Stats of the request being profiled, or None.
+    """
+    return _current.get()
+
+
+def _record_queries(execute, sql, params, many, context):
+    stats = _current.get()
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        if stats is not None:
+            stats.queries += 1
+            stats.db_time += time.perf_counter() - started
+
+
+class TemplateTimingMixin:
+    """
+    Adds the render time of a backend template (Django or Jinja2) to the request stats.
+    """
+
+    def render(self, context=None, request=None):
+        stats = _current.get()
+        if stats is None:
+            return super().render(context, request)
+        # Вложенные отрисовки (render_to_string внутри шаблонного тега) уже входят во внешнюю
+        stats.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            stats.template_depth -= 1
+            if not stats.template_depth:
+                stats.template_time += time.perf_counter() - started
+
+
+class TimedTemplate(TemplateTimingMixin, Template):
+    pass
+
+
+class ProfilingDjangoTemplates(DjangoTemplates):
+    """
+    Django template backend that adds the render time of templates to the request stats.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+
+class CacheStatsMixin:
+    """
+    Counts cache hits and misses of get() and get_many() in the request stats.
+    """
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version=version)
+        stats = _current.get()
+        if stats is not None:
+            if value is _MISSING:
+                stats.cache_misses += 1
+            else:
+                stats.cache_hits += 1
+        return default if value is _MISSING else value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        # BaseCache.get_many() вызывает get() для каждого ключа, считаем без него
+        token = _current.set(None)
+        try:
+            values = super().get_many(keys, version=version)
+        finally:
+            _current.reset(token)
+        stats = _current.get()
+        if stats is not None:
+            stats.cache_hits += len(values)
+            stats.cache_misses += len(keys) - len(values)
+        return values
+
+
+class InstrumentedLocMemCache(CacheStatsMixin, LocMemCache):
+    pass
+
+
+class Registry:
+    """
+    Per URL name aggregate of the profiled requests: counts, sums and the last PROFILING_SAMPLES durations.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.views = defaultdict(lambda: {
+                'count': 0, 'queries': 0, 'db_ms': 0.0, 'template_ms': 0.0, 'cache_hits': 0, 'cache_misses': 0,
+                'samples': deque(maxlen=getattr(settings, 'PROFILING_SAMPLES', 1000)),
+            })
+            self.published = time.monotonic()
+
+    def record(self, name, total, stats):
+        with self.lock:
+            view = self.views[name]
+            view['count'] += 1
+            view['queries'] += stats.queries
+            view['db_ms'] += stats.db_time * 1000
+            view['template_ms'] += stats.template_time * 1000
+            view['cache_hits'] += stats.cache_hits
+            view['cache_misses'] += stats.cache_misses
+            view['samples'].append(round(total * 1000, 2))
+            publish = time.monotonic() - self.published >= PUBLISH_INTERVAL
+            if publish:
+                self.published = time.monotonic()
+        if publish:
+            self.publish()
+
+    def raw(self):
+        with self.lock:
+            return {name: {**view, 'samples': list(view['samples'])} for name, view in self.views.items()}
+
+    def publish(self):
+        """
+        Stores the aggregate of this process in the cache for the profiling_stats command.
+        """
+        key = f'profiling:{os.getpid()}'
+        now = time.time()
+        cache.set(key, self.raw(), WORKER_TIMEOUT)
+        # {ключ: время публикации}, остановленные воркеры (и их pid после перезапуска) выпадают из списка
+        workers = {worker: published for worker, published in (cache.get(WORKERS_KEY) or {}).items()
+                   if now - published < WORKER_TIMEOUT}
+        workers[key] = now
+        cache.set(WORKERS_KEY, workers, WORKER_TIMEOUT)
+
+
+def summarize(raw_views):
+    """
+    Turns raw aggregates (possibly merged from several processes) into percentiles and averages per URL name.
+    """
+    summary = {}
+    for name, view in raw_views.items():
+        samples = sorted(view['samples'])
+        count = view['count']
+        if not count or not samples:
+            continue
+        lookups = view['cache_hits'] + view['cache_misses']
+        summary[name] = {
+            'count': count,
+            'p50_ms': statistics.median(samples),
+            'p95_ms': samples[min(int(len(samples) * 0.95), len(samples) - 1)],
+            'p99_ms': samples[min(int(len(samples) * 0.99), len(samples) - 1)],
+            'max_ms': samples[-1],
+            'avg_queries': round(view['queries'] / count, 2),
+            'avg_db_ms': round(view['db_ms'] / count, 2),
+            'avg_template_ms': round(view['template_ms'] / count, 2),
+            'cache_hit_ratio': round(view['cache_hits'] / lookups, 3) if lookups else None,
+        }
+    # Сначала URL с наибольшим суммарным временем
+    return dict(sorted(summary.items(), key=lambda item: -item[1]['p50_ms'] * item[1]['count']))
+
+
+def merge(raw_aggregates):
+    merged = {}
+    for raw in raw_aggregates:
+        for name, view in raw.items():
+            target = merged.setdefault(name, {
+                'count': 0, 'queries': 0, 'db_ms': 0.0, 'template_ms': 0.0, 'cache_hits': 0, 'cache_misses': 0,
+                'samples': [],
+            })
+            for field in ('count', 'queries', 'db_ms', 'template_ms', 'cache_hits', 'cache_misses'):
+                target[field] += view[field]
+            target['samples'].extend(view['samples'])
+    return merged
+
+
+registry = Registry()
+
+
+def show_timing(request):
+    """
+    Checks whether the Server-Timing header may be sent to the client of the request.
+    """
+    if request.META.get('REMOTE_ADDR') in settings.INTERNAL_IPS:
+        return True
+    user = getattr(request, 'user', None)
+    # Без запросов к базе после ответа: только пользователь, которого уже загрузил view, и его is_staff
+    if user is None or getattr(user, '_wrapped', None) is empty:
+        return False
+    return user.is_staff
+
+
+def sampled(request):
+    """
+    Checks whether the request is profiled, see settings.PROFILING_SAMPLE_RATE.
+    """
+    if request.META.get('REMOTE_ADDR') in settings.INTERNAL_IPS:
+        return True
+    return random.random() < getattr(settings, 'PROFILING_SAMPLE_RATE', 1.0)
+
+
+class ProfilingMiddleware:
+    """
+    Profiles the request when settings.PROFILING is on, see the module docstring.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'PROFILING', False) or not sampled(request):
+            return self.get_response(request)
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(_record_queries))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total = time.perf_counter() - started
+
+        if show_timing(request):
+            response['Server-Timing'] = stats.server_timing(total)
+        match = request.resolver_match
+        registry.record(match.view_name if match else 'unresolved', total, stats)
+        return response
@@ -0,0 +1,111 @@
+"""
+Routing of reads to the read-only replicas listed in settings.DATABASE_REPLICAS.
+
+Writes always go to the primary ('default'). Only the catalog models (REPLICA_MODELS) are read from a
+replica, and only while books_core.middleware.ReplicaPinningMiddleware handles a request: sessions, users
+and everything outside requests (management commands, worker threads) use the primary. A request reads
+the primary inside a transaction, after a write in the same request, and when the middleware pins it
+(unsafe methods and a short time after them, so the page shown after a form redirect sees its own write).
+All reads of a request go to the same replica, and the version stamps (books_core.versioning) are read
+from it too: ETags and cache keys of a page are never newer than the data it was built from.
+The request state is a context variable owned by the middleware, so it is kept per thread and per asyncio
+task and ends with the request.
+"""
+import contextvars
+import random
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_MODELS = {
+    'books_core.author', 'books_core.book', 'books_core.book_genre', 'books_core.bookavailability',
+    'books_core.bookinstance', 'books_core.genre', 'books_core.language', 'books_core.versionstamp',
+}
+
+_pinned = contextvars.ContextVar('pinned_to_primary', default=False)
+_request = contextvars.ContextVar('replica_request', default=None)
+
+
+class RequestState:
+    """
+    Routing state of one request: the replica it reads from, becomes pinned after the first write.
+    """
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.replica = None
+
+
+def begin_request(pinned=False):
+    """
+    Starts routing the reads of a request to replicas, returns the token for end_request().
+    """
+    return _request.set(RequestState(pinned))
+
+
+def end_request(token):
+    _request.reset(token)
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def pin(value=True):
+    """
+    Sets the pin, returns the token for unpin().
+    """
+    return _pinned.set(value)
+
+
+def unpin(token):
+    _pinned.reset(token)
+
+
+def is_pinned():
+    state = _request.get()
+    return _pinned.get() or state is None or state.pinned
+
+
+@contextmanager
+def use_primary():
+    token = pin()
+    try:
+        yield
+    finally:
+        unpin(token)
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        aliases = replicas()
+        if (not aliases or model._meta.label_lower not in REPLICA_MODELS or is_pinned()
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return DEFAULT_DB_ALIAS
+        state = _request.get()
+        # Реплики отстают по-разному: версии и данные страницы должны читаться с одной
+        if state.replica not in aliases:
+            state.replica = random.choice(aliases)
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        # Дальнейшие чтения в этом запросе идут с основной базы, где эта запись уже видна.
+        # Меняется состояние запроса, а не контекстная переменная: пин не переживает запрос
+        state = _request.get()
+        if state is not None:
+            state.pinned = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Реплики получают схему вместе с данными с основной базы
+        if db in replicas():
+            return False
+        return None
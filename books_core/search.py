@@ -0,0 +1,106 @@
+"""
+Full-text search over book title, summary and author name.
+
+On SQLite the search uses the FTS5 table created by migration 0006 and kept in sync by triggers on
+books_core_book and books_core_author (so bulk_create and queryset updates are indexed too).
+Other backends, or SQLite built without FTS5, fall back to icontains lookups.
+"""
+import re
+from collections import namedtuple
+
+from django.db import connections
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from books_core.models import Book
+
+FTS_TABLE = 'books_core_book_fts'
+
+# Маркеры подсветки не встречаются в тексте, поэтому текст можно экранировать до замены их на <mark>
+MARK_START = '\x02'
+MARK_END = '\x03'
+
+# Вес столбцов title, summary, author в ранжировании bm25
+RANK_WEIGHTS = (10.0, 1.0, 5.0)
+
+SNIPPET_TOKENS = 24
+FALLBACK_SNIPPET_LENGTH = 200
+
+SearchHit = namedtuple('SearchHit', ['book_id', 'title', 'author', 'snippet'])
+
+_fts_tables = {}
+
+
+def fts_available(using='default'):
+    """
+    Checks (once per database alias) whether the FTS5 table exists.
+    """
+    if using not in _fts_tables:
+        connection = connections[using]
+        _fts_tables[using] = connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names()
+    return _fts_tables[using]
+
+
+def search_terms(query):
+    return re.findall(r'\w+', query)
+
+
+def _mark(text):
+    """
+    Escapes the text and turns the highlight markers into <mark> tags.
+    """
+    return mark_safe(escape(text).replace(MARK_START, '<mark>').replace(MARK_END, '</mark>'))
+
+
+def _fts_search(terms, limit, offset, using):
+    # Каждое слово в кавычках (без синтаксиса FTS5 из пользовательского ввода) и как префикс
+    match = ' '.join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+    sql = f"""
+        SELECT rowid,
+               highlight({FTS_TABLE}, 0, %s, %s),
+               highlight({FTS_TABLE}, 2, %s, %s),
+               snippet({FTS_TABLE}, 1, %s, %s, '…', {SNIPPET_TOKENS})
+        FROM {FTS_TABLE}
+        WHERE {FTS_TABLE} MATCH %s
+        ORDER BY bm25({FTS_TABLE}, {', '.join(map(str, RANK_WEIGHTS))})
+        LIMIT %s OFFSET %s
+    """
+    with connections[using].cursor() as cursor:
+        cursor.execute(sql, [MARK_START, MARK_END] * 3 + [match, limit, offset])
+        rows = cursor.fetchall()
+    return [SearchHit(book_id, _mark(title), _mark(author), _mark(snippet))
+            for book_id, title, author, snippet in rows]
+
+
+def _highlight(text, pattern):
+    return _mark(pattern.sub(lambda match: f'{MARK_START}{match.group(0)}{MARK_END}', text))
+
+
+def _fallback_search(terms, limit, offset, using):
+    condition = Q()
+    for term in terms:
+        condition &= (Q(title__icontains=term) | Q(summary__icontains=term)
+                      | Q(author__first_name__icontains=term) | Q(author__last_name__icontains=term))
+    books = (Book.objects.using(using).filter(condition).select_related('author')
+             .order_by('title', 'id')[offset:offset + limit])
+
+    pattern = re.compile('|'.join(re.escape(term) for term in terms), re.IGNORECASE)
+    return [
+        SearchHit(book.pk, _highlight(book.title, pattern), _highlight(str(book.author or ''), pattern),
+                  _highlight(book.summary[:FALLBACK_SNIPPET_LENGTH], pattern))
+        for book in books
+    ]
+
+
+def search_books(query, limit=20, offset=0, using='default'):
+    """
+    Returns a list of SearchHit for the query, best matches first.
+    Title, author and snippet of the summary are HTML with matches wrapped in <mark>.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return []
+    if fts_available(using):
+        return _fts_search(terms, limit, offset, using)
+    return _fallback_search(terms, limit, offset, using)
@@ -1,9 +1,72 @@
-from rest_framework.serializers import ModelSerializer
+from rest_framework.serializers import ModelSerializer, ReadOnlyField, SlugRelatedField
 
-from books_core.models import Book
+from books_core import snapshot, versioning
+from books_core.models import Author, Book, BookInstance
 
 
-class BooksSerializer(ModelSerializer):
+def requested_fields(request):
+    """
+    Field names from the ?fields= query parameter (comma separated), an empty set means all fields.
+    """
+    if request is None:
+        return set()
+    return {name.strip() for name in request.query_params.get('fields', '').split(',') if name.strip()}
+
+
+class SparseFieldsMixin:
+    """
+    Leaves in the serializer only the fields requested with ?fields=.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = requested_fields(self.context.get('request'))
+        if fields:
+            for name in set(self.fields) - fields:
+                self.fields.pop(name)
+
+
+class SnapshotField(ReadOnlyField):
+    """
+    Author name or language of the book from books_core.snapshot instead of the related object.
+    Pages get the entries of all their books at once (snapshot.attach), single books look theirs up.
+    """
+
+    def __init__(self, attribute, **kwargs):
+        self.attribute = attribute
+        kwargs['source'] = '*'
+        super().__init__(**kwargs)
+
+    def get_attribute(self, instance):
+        if not hasattr(instance, 'book_entry'):
+            # Версия TITLES, прочитанная представлением API вместе с данными (ConditionalReadMixin)
+            stamps = getattr(self.context.get('view'), 'stamps', None)
+            version = stamps.key(versioning.TITLES) if stamps is not None else None
+            snapshot.attach([instance], key='pk', version=version)
+        return instance.book_entry
+
+    def to_representation(self, entry):
+        return getattr(entry, self.attribute)
+
+
+class AuthorSerializer(SparseFieldsMixin, ModelSerializer):
+    class Meta:
+        model = Author
+        fields = ['id', 'first_name', 'last_name', 'date_of_birth', 'date_of_death']
+
+
+class BooksSerializer(SparseFieldsMixin, ModelSerializer):
+    author = SnapshotField('author')
+    language = SnapshotField('language')
+    genre = SlugRelatedField(many=True, read_only=True, slug_field='name')
+
     class Meta:
         model = Book
         fields = '__all__'
+
+
+class BookInstanceSerializer(SparseFieldsMixin, ModelSerializer):
+    class Meta:
+        model = BookInstance
+        # Заёмщик не публикуется
+        fields = ['id', 'book', 'imprint', 'status', 'due_back']
@@ -0,0 +1,167 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from books_core import auth, availability, counters, versioning
+from books_core.models import Author, Book, BookInstance, Genre, Language
+
+CATALOG_MODELS = (Author, Book, BookInstance, Genre, Language)
+
+NOT_LOADED = object()
+
+
+def loaded_value(instance, attname):
+    """
+    Value of the field at the time the object was loaded (or last saved), NOT_LOADED if it is unknown.
+    """
+    return getattr(instance, '_loaded_values', {}).get(attname, NOT_LOADED)
+
+
+def remember_values(instance):
+    instance._loaded_values = {
+        field.attname: instance.__dict__[field.attname]
+        for field in instance._meta.concrete_fields if field.attname in instance.__dict__
+    }
+
+
+@receiver(post_save, sender=Book)
+def book_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.change(counters.NUM_BOOKS, 1)
+        availability.refresh(instance.pk)
+
+    # Книга показывается на странице автора, в том числе прежнего
+    namespaces = {versioning.book_namespace(instance.pk), versioning.author_namespace(instance.author_id)}
+    old_author_id = loaded_value(instance, 'author_id')
+    if old_author_id is not NOT_LOADED:
+        namespaces.add(versioning.author_namespace(old_author_id))
+    if created or any(loaded_value(instance, name) != getattr(instance, name)
+                      for name in ('title', 'author_id', 'language_id')):
+        namespaces.add(versioning.TITLES)
+    versioning.bump(*namespaces)
+    remember_values(instance)
+
+
+@receiver(post_delete, sender=Book)
+def book_deleted(sender, instance, **kwargs):
+    counters.change(counters.NUM_BOOKS, -1)
+    versioning.bump(versioning.book_namespace(instance.pk), versioning.author_namespace(instance.author_id),
+                    versioning.TITLES)
+
+
+@receiver(post_save, sender=Author)
+def author_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.change(counters.NUM_AUTHORS, 1)
+    else:
+        bump_author(instance)
+
+
+@receiver(pre_delete, sender=Author)
+def author_deleting(sender, instance, **kwargs):
+    # Книги автора будут обновлены через queryset (SET_NULL), без сигналов
+    bump_author(instance)
+
+
+@receiver(post_delete, sender=Author)
+def author_deleted(sender, instance, **kwargs):
+    counters.change(counters.NUM_AUTHORS, -1)
+
+
+def bump_author(author):
+    """
+    Author's name is shown on the pages of all their books.
+    """
+    book_ids = Book.objects.filter(author=author).values_list('pk', flat=True)
+    versioning.bump(versioning.author_namespace(author.pk), versioning.TITLES,
+                    *map(versioning.book_namespace, book_ids))
+
+
+@receiver(post_save, sender=BookInstance)
+def book_instance_saved(sender, instance, created, **kwargs):
+    old_status = loaded_value(instance, 'status')
+    if created:
+        counters.change(counters.NUM_INSTANCES, 1)
+        if instance.status == 'a':
+            counters.change(counters.NUM_INSTANCES_AVAILABLE, 1)
+    elif old_status is NOT_LOADED:
+        # Предыдущий статус неизвестен, пересчитаем при следующем чтении
+        counters.invalidate()
+    elif old_status != instance.status:
+        if old_status == 'a':
+            counters.change(counters.NUM_INSTANCES_AVAILABLE, -1)
+        elif instance.status == 'a':
+            counters.change(counters.NUM_INSTANCES_AVAILABLE, 1)
+
+    namespaces = {versioning.book_namespace(instance.book_id)}
+    old_book_id = loaded_value(instance, 'book_id')
+    if old_book_id is not NOT_LOADED:
+        namespaces.add(versioning.book_namespace(old_book_id))
+    versioning.bump(*namespaces)
+
+    # BookAvailability пересчитывается, только если изменилось то, что в нём учитывается
+    if created or any(loaded_value(instance, name) != getattr(instance, name)
+                      for name in ('status', 'book_id', 'due_back')):
+        availability.refresh(instance.book_id, None if old_book_id is NOT_LOADED else old_book_id)
+    remember_values(instance)
+
+
+@receiver(post_delete, sender=BookInstance)
+def book_instance_deleted(sender, instance, **kwargs):
+    counters.change(counters.NUM_INSTANCES, -1)
+    status = loaded_value(instance, 'status')
+    if (instance.status if status is NOT_LOADED else status) == 'a':
+        counters.change(counters.NUM_INSTANCES_AVAILABLE, -1)
+    versioning.bump(versioning.book_namespace(instance.book_id))
+    availability.refresh(instance.book_id)
+
+
+@receiver(m2m_changed, sender=Book.genre.through)
+def book_genres_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        book_ids = [instance.pk]
+    elif pk_set is not None:
+        book_ids = pk_set
+    else:
+        # genre.book_set.clear(): затронутые книги уже неизвестны
+        book_ids = []
+        versioning.bump(versioning.TAXONOMY)
+    versioning.bump(versioning.CATALOG, versioning.FACETS, *map(versioning.book_namespace, book_ids))
+
+
+def taxonomy_changed(sender, **kwargs):
+    """
+    Genre and language names are shown on every book page.
+    """
+    versioning.bump(versioning.TAXONOMY)
+
+
+def language_changed(sender, **kwargs):
+    versioning.bump(versioning.TITLES)
+
+
+def catalog_changed(sender, **kwargs):
+    versioning.bump(versioning.CATALOG)
+
+
+for model in CATALOG_MODELS:
+    post_save.connect(catalog_changed, sender=model, dispatch_uid=f'catalog_saved_{model.__name__}')
+    post_delete.connect(catalog_changed, sender=model, dispatch_uid=f'catalog_deleted_{model.__name__}')
+
+for model in (Genre, Language):
+    post_save.connect(taxonomy_changed, sender=model, dispatch_uid=f'taxonomy_saved_{model.__name__}')
+    post_delete.connect(taxonomy_changed, sender=model, dispatch_uid=f'taxonomy_deleted_{model.__name__}')
+
+post_save.connect(language_changed, sender=Language, dispatch_uid='titles_language_saved')
+post_delete.connect(language_changed, sender=Language, dispatch_uid='titles_language_deleted')
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def user_changed(sender, instance, **kwargs):
+    """
+    Drops the cached session user, see books_core.auth.
+    """
+    auth.invalidate_user(instance.pk)
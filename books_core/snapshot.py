@@ -0,0 +1,332 @@
+"""
+In-process read-only snapshot of the book titles, author names and languages.
+
+Lists of copies and the API need only these strings of a book, the snapshot gives them by book id without
+building Book, Author and Language instances. Book ids are kept sorted in an array and looked up with bisect,
+authors and languages are stored once and referenced by their index, so a book costs its title string and
+three array items.
+
+The snapshot follows the versioning.TITLES stamp. books_core.signals bumps it only when a title, an author
+or a language of a book changes (loans and copies do not), together with the stamps of the changed books.
+A stale snapshot is updated in a background thread: only the books whose stamps changed since it was built
+are read again (a full build is done only for the first snapshot and after mass changes). Requests never
+wait for it. Pages pass the TITLES stamp their data was read with to entries(), and a snapshot of another
+version is not used for them: their books (and all books before the first snapshot is built) are read with
+one query per page instead.
+"""
+import logging
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+from django.db import connections, transaction
+
+from books_core import models, versioning
+
+CHUNK_SIZE = 5000
+CHECK_INTERVAL = 1
+# Больше изменённых книг - дешевле построить снимок заново (и не больше 999 параметров запроса в SQLite)
+MAX_CHANGES = 500
+# Запас на расхождение часов процессов и транзакции, зафиксированные позже своей отметки
+CHANGES_MARGIN = 60
+_NONE = -1
+
+logger = logging.getLogger(__name__)
+
+
+class Entry:
+    __slots__ = ('id', 'title', 'author', 'language')
+
+    def __init__(self, id, title, author, language):
+        self.id = id
+        self.title = title
+        self.author = author
+        self.language = language
+
+    def __str__(self):
+        return self.title
+
+    def __repr__(self):
+        return f'<Entry {self.id}: {self.title}>'
+
+
+class Snapshot:
+    __slots__ = ('version', 'changed', 'ids', 'titles', 'author_index', 'author_names', 'author_refs',
+                 'language_index', 'language_names', 'language_refs')
+
+    def __init__(self, version, changed=None):
+        self.version = version
+        self.changed = changed
+        self.ids = array('q')
+        self.titles = []
+        self.author_index = {}
+        self.author_names = []
+        self.author_refs = array('l')
+        self.language_index = {}
+        self.language_names = []
+        self.language_refs = array('l')
+
+    def copy(self, version, changed):
+        """
+        Copy for an update, the served snapshot is never changed.
+        """
+        snapshot = Snapshot(version, changed)
+        snapshot.ids = array('q', self.ids)
+        snapshot.titles = list(self.titles)
+        snapshot.author_index = dict(self.author_index)
+        snapshot.author_names = list(self.author_names)
+        snapshot.author_refs = array('l', self.author_refs)
+        snapshot.language_index = dict(self.language_index)
+        snapshot.language_names = list(self.language_names)
+        snapshot.language_refs = array('l', self.language_refs)
+        return snapshot
+
+    def set_author(self, pk, name):
+        _set_name(self.author_index, self.author_names, pk, name)
+
+    def set_language(self, pk, name):
+        _set_name(self.language_index, self.language_names, pk, name)
+
+    def set_book(self, book_id, row):
+        """
+        Adds, changes or (row is None) removes the book, row is (title, author_id, language_id).
+        """
+        index = bisect_left(self.ids, book_id)
+        present = index < len(self.ids) and self.ids[index] == book_id
+        if row is None:
+            if present:
+                for items in (self.ids, self.titles, self.author_refs, self.language_refs):
+                    del items[index]
+            return
+        title, author_id, language_id = row
+        author = self.author_index.get(author_id, _NONE)
+        language = self.language_index.get(language_id, _NONE)
+        if present:
+            self.titles[index], self.author_refs[index], self.language_refs[index] = title, author, language
+        else:
+            self.ids.insert(index, book_id)
+            self.titles.insert(index, title)
+            self.author_refs.insert(index, author)
+            self.language_refs.insert(index, language)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, book_id):
+        return self._index(book_id) is not None
+
+    def _index(self, book_id):
+        if book_id is None:
+            return None
+        index = bisect_left(self.ids, book_id)
+        if index < len(self.ids) and self.ids[index] == book_id:
+            return index
+        return None
+
+    def get(self, book_id):
+        """
+        Entry of the book, or None if the book is not in the snapshot.
+        """
+        index = self._index(book_id)
+        if index is None:
+            return None
+        author = self.author_refs[index]
+        language = self.language_refs[index]
+        return Entry(
+            book_id, self.titles[index],
+            None if author == _NONE else self.author_names[author],
+            None if language == _NONE else self.language_names[language],
+        )
+
+    def title(self, book_id, default=None):
+        index = self._index(book_id)
+        return default if index is None else self.titles[index]
+
+
+def _names(rows):
+    """
+    {id: index} and the list of names for (id, name) rows.
+    """
+    refs, names = {}, []
+    for pk, name in rows:
+        _set_name(refs, names, pk, name)
+    return refs, names
+
+
+def _set_name(refs, names, pk, name):
+    if pk in refs:
+        names[refs[pk]] = name
+    else:
+        refs[pk] = len(names)
+        names.append(name)
+
+
+def _author_name(last_name, first_name):
+    return f'{last_name} {first_name}'
+
+
+def build(version=None, changed=None, chunk_size=CHUNK_SIZE):
+    snapshot = Snapshot(version, changed)
+    snapshot.author_index, snapshot.author_names = _names(
+        (pk, _author_name(last_name, first_name))
+        for pk, last_name, first_name in models.Author.objects.values_list('pk', 'last_name', 'first_name').iterator()
+    )
+    snapshot.language_index, snapshot.language_names = _names(models.Language.objects.values_list('pk', 'name'))
+    rows = (models.Book.objects.order_by('pk').values_list('pk', 'title', 'author_id', 'language_id')
+            .iterator(chunk_size=chunk_size))
+    for pk, title, author_id, language_id in rows:
+        snapshot.ids.append(pk)
+        snapshot.titles.append(title)
+        snapshot.author_refs.append(snapshot.author_index.get(author_id, _NONE))
+        snapshot.language_refs.append(snapshot.language_index.get(language_id, _NONE))
+    return snapshot
+
+
+def update(snapshot, version=None, changed=None):
+    """
+    Copy of the snapshot with the books whose stamps (versioning.book_namespace) changed since it was built,
+    or None when there are more than MAX_CHANGES of them and a full build is cheaper.
+    """
+    if snapshot.changed is None:
+        return None
+    namespaces = (models.VersionStamp.objects
+                  .filter(changed__gte=snapshot.changed - CHANGES_MARGIN, namespace__startswith='book:')
+                  .values_list('namespace', flat=True)[:MAX_CHANGES + 1])
+    book_ids = [int(namespace.split(':', 1)[1]) for namespace in namespaces]
+    if len(book_ids) > MAX_CHANGES:
+        return None
+    rows = {pk: (title, author_id, language_id) for pk, title, author_id, language_id in
+            models.Book.objects.filter(pk__in=book_ids).values_list('pk', 'title', 'author_id', 'language_id')}
+    updated = snapshot.copy(version, changed)
+    # Переименование автора отмечает все его книги, языков немного - они читаются все
+    author_ids = {author_id for title, author_id, language_id in rows.values() if author_id is not None}
+    for pk, last_name, first_name in models.Author.objects.filter(pk__in=author_ids).values_list(
+            'pk', 'last_name', 'first_name'):
+        updated.set_author(pk, _author_name(last_name, first_name))
+    languages = dict(models.Language.objects.values_list('pk', 'name'))
+    if not snapshot.language_index.keys() <= languages.keys():
+        # Удалённый язык снимается с книг через queryset, без отметок книг
+        return None
+    for pk, name in languages.items():
+        updated.set_language(pk, name)
+    for book_id in book_ids:
+        updated.set_book(book_id, rows.get(book_id))
+    return updated
+
+
+_snapshot = None
+_checked = 0.0
+_refreshing = False
+_lock = threading.Lock()
+
+
+def _titles_stamp():
+    stamps = versioning.Stamps(versioning.TITLES)
+    return stamps.key(), stamps.changed(versioning.TITLES)
+
+
+def refresh():
+    """
+    Brings the snapshot to the current TITLES version in the calling thread: updates the books changed since
+    it was built, or builds it anew.
+    """
+    global _snapshot, _checked
+    # Версия читается до данных: изменения во время обновления снова сделают снимок устаревшим
+    version, changed = _titles_stamp()
+    snapshot = _snapshot
+    updated = update(snapshot, version, changed) if snapshot is not None else None
+    if updated is None:
+        updated = build(version, changed)
+    with _lock:
+        _snapshot = updated
+        _checked = time.monotonic()
+    return updated
+
+
+def _refresh_in_background():
+    global _refreshing
+    try:
+        refresh()
+    except Exception:
+        logger.exception('Failed to refresh the catalog snapshot')
+    finally:
+        _refreshing = False
+        connections.close_all()
+
+
+def _start_refresh():
+    global _refreshing
+    with _lock:
+        if _refreshing:
+            return
+        _refreshing = True
+    threading.Thread(target=_refresh_in_background, name='catalog-snapshot', daemon=True).start()
+
+
+def current():
+    """
+    The last built snapshot (possibly a little stale), or None before the first one is built. A missing or
+    stale snapshot is refreshed in the background, never in the caller.
+    """
+    global _checked
+    snapshot = _snapshot
+    now = time.monotonic()
+    if snapshot is not None and now - _checked < CHECK_INTERVAL:
+        return snapshot
+    _checked = now
+    if snapshot is None or snapshot.version != versioning.get_version(versioning.TITLES):
+        # Поток читает базу своим соединением и видит только зафиксированные данные
+        transaction.on_commit(_start_refresh)
+    return snapshot
+
+
+def clear():
+    """
+    Forgets the built snapshot (tests).
+    """
+    global _snapshot, _checked
+    with _lock:
+        _snapshot = None
+        _checked = 0.0
+
+
+def entries(book_ids, version=None):
+    """
+    {book id: Entry} of the books, from the snapshot and with one query for the books it does not have.
+    version is the TITLES stamp the caller read with its data (versioning.Stamps.key()): a snapshot of
+    another version is not used, so the entries are not older or newer than the rest of the page.
+    """
+    if version is None:
+        snapshot = current()
+    else:
+        # Версия уже прочитана вызывающим, отдельный запрос current() не нужен
+        snapshot = _snapshot
+        if snapshot is None or snapshot.version != version:
+            snapshot = None
+            transaction.on_commit(_start_refresh)
+    found, missing = {}, set()
+    for book_id in book_ids:
+        entry = snapshot.get(book_id) if snapshot is not None else None
+        if entry is not None:
+            found[book_id] = entry
+        elif book_id is not None:
+            missing.add(book_id)
+    if missing:
+        rows = models.Book.objects.filter(pk__in=missing).values_list(
+            'pk', 'title', 'author_id', 'author__last_name', 'author__first_name', 'language__name')
+        for pk, title, author_id, last_name, first_name, language in rows:
+            author = None if author_id is None else _author_name(last_name, first_name)
+            found[pk] = Entry(pk, title, author, language)
+    return found
+
+
+def attach(instances, attname='book_entry', key='book_id', version=None):
+    """
+    Sets the snapshot Entry of instance.book_id (or another key) on every instance (e.g. a page of copies)
+    and returns them. version as in entries().
+    """
+    found = entries([getattr(instance, key) for instance in instances], version)
+    for instance in instances:
+        setattr(instance, attname, found.get(getattr(instance, key)))
+    return instances
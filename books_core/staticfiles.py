@@ -0,0 +1,98 @@
+"""
+Static files pipeline: content-hashed names, precompressed variants and an index for in-process serving.
+
+CompressedManifestStaticFilesStorage (STATICFILES_STORAGE when DEBUG is off) is the manifest storage of
+django.contrib.staticfiles that also writes .gz and, when the brotli package is installed, .br files next
+to every compressible collected file. collected_files() indexes STATIC_ROOT for
+books_core.middleware.StaticFilesMiddleware, which serves the files and their compressed variants.
+"""
+import gzip
+import json
+import mimetypes
+import os
+from collections import namedtuple
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.map', '.json', '.svg', '.txt', '.html', '.xml', '.eot', '.ttf', '.ico'}
+# Меньшие файлы и файлы, сжатые меньше чем на 5%, отдаются как есть
+MIN_COMPRESS_SIZE = 256
+MIN_COMPRESS_RATIO = 0.95
+# Content-Encoding в порядке предпочтения и расширение файла с ним
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+StaticFile = namedtuple('StaticFile', ['path', 'size', 'mtime', 'content_type', 'variants', 'immutable'])
+
+
+def _compressors():
+    yield '.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0)
+    if brotli is not None:
+        yield '.br', lambda data: brotli.compress(data, quality=11)
+
+
+def compress_file(path):
+    """
+    Writes the compressed variants of the file that are worth keeping. Returns their paths.
+    """
+    if os.path.splitext(path)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+        return []
+    with open(path, 'rb') as file:
+        data = file.read()
+    if len(data) < MIN_COMPRESS_SIZE:
+        return []
+    written = []
+    for extension, compress in _compressors():
+        compressed = compress(data)
+        if len(compressed) < len(data) * MIN_COMPRESS_RATIO:
+            with open(path + extension, 'wb') as file:
+                file.write(compressed)
+            written.append(path + extension)
+    return written
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        # Сжимаются и хэшированные копии, и исходные имена (на них ссылаются сторонние CSS и JS)
+        for name in {*paths, *self.hashed_files.values()}:
+            if self.exists(name):
+                compress_file(self.path(name))
+
+
+def collected_files(root, manifest_name=ManifestStaticFilesStorage.manifest_name):
+    """
+    {relative URL path: StaticFile} of the files in STATIC_ROOT. Hashed names from the manifest are
+    immutable, they can be cached forever.
+    """
+    if not root or not os.path.isdir(root):
+        return {}
+    hashed = set()
+    manifest_path = os.path.join(root, manifest_name)
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as file:
+            hashed = set(json.load(file).get('paths', {}).values())
+
+    files = {}
+    compressed_extensions = tuple(extension for _, extension in ENCODINGS)
+    for directory, _, names in os.walk(root):
+        for filename in names:
+            if filename.endswith(compressed_extensions) or filename == manifest_name:
+                continue
+            path = os.path.join(directory, filename)
+            name = os.path.relpath(path, root).replace(os.sep, '/')
+            stat = os.stat(path)
+            variants = {
+                encoding: (path + extension, os.path.getsize(path + extension))
+                for encoding, extension in ENCODINGS if os.path.exists(path + extension)
+            }
+            content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+            files[name] = StaticFile(path, stat.st_size, int(stat.st_mtime), content_type, variants, name in hashed)
+    return files
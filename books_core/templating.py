@@ -0,0 +1,51 @@
+"""
+Template rendering fast path.
+
+The Django backend uses the cached loader (core/settings.py), so a template is read and compiled once per
+process. precompile() loads the hot catalog templates with every configured engine at the start of the
+WSGI/ASGI application, so the first requests do not pay for it. navigation() gives the sidebar its URLs,
+reversed once per script prefix instead of by {% url %} on every page.
+"""
+from functools import lru_cache
+
+from django.template import TemplateDoesNotExist, engines
+from django.urls import get_script_prefix, reverse
+
+HOT_TEMPLATES = [
+    'base_generic.html',
+    'index.html',
+    'books_core/book_list.html',
+    'books_core/book_detail.html',
+    'books_core/author_list.html',
+    'books_core/author_detail.html',
+]
+
+NAVIGATION = ['index', 'books', 'authors', 'book-search', 'my-borrowed', 'all-borrowed', 'login', 'logout']
+
+
+def precompile(names=HOT_TEMPLATES):
+    """
+    Loads the templates with every template engine that has them. Returns the number of loaded templates.
+    """
+    loaded = 0
+    for engine in engines.all():
+        for name in names:
+            try:
+                engine.get_template(name)
+            except TemplateDoesNotExist:
+                continue
+            loaded += 1
+    return loaded
+
+
+@lru_cache(maxsize=8)
+def _navigation(script_prefix):
+    # reverse() добавляет префикс текущего запроса, поэтому URL кэшируются для каждого префикса
+    return {name.replace('-', '_'): reverse(name) for name in NAVIGATION}
+
+
+def navigation(request):
+    """
+    Context processor: URLs of the sidebar as `nav.<url name>` (dashes replaced with underscores).
+    """
+    return {'nav': _navigation(get_script_prefix())}
@@ -0,0 +1,76 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from books_core.models import Author, Book, BookInstance, Genre
+from books_core.pagination import EstimatedCountPaginator
+
+
+class AdminChangelistTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username='admin', password='12345')
+        genres = [Genre.objects.create(name=f'Genre {num}') for num in range(3)]
+        for num in range(30):
+            author = Author.objects.create(first_name='John', last_name=f'Smith {num}')
+            book = Book.objects.create(title=f'Book {num:02d}', summary='Summary', isbn='ABCDEFG', author=author)
+            book.genre.set(genres)
+            BookInstance.objects.create(book=book, imprint='Imprint', status='o', borrower=cls.admin)
+        cls.book = book
+        for num in range(45):
+            BookInstance.objects.create(book=book, imprint=f'Copy {num}', status='a')
+
+    def setUp(self):
+        self.client.login(username='admin', password='12345')
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        urls = [reverse('admin:books_core_book_changelist'), reverse('admin:books_core_bookinstance_changelist')]
+        self.count_queries(urls[0])  # пользователь сессии попадает в кэш
+        before = [self.count_queries(url) for url in urls]
+        author = Author.objects.create(first_name='Jane', last_name='Doe')
+        for num in range(10):
+            book = Book.objects.create(title=f'More {num}', summary='Summary', isbn='ABCDEFG', author=author)
+            book.genre.set(Genre.objects.all())
+            BookInstance.objects.create(book=book, imprint='Imprint', status='o', borrower=self.admin)
+        self.assertEqual([self.count_queries(url) for url in urls], before)
+
+    def test_inline_is_paginated(self):
+        url = reverse('admin:books_core_book_change', args=[self.book.pk])
+        resp = self.client.get(url)
+        formset = resp.context['inline_admin_formsets'][0].formset
+        self.assertEqual(formset.initial_form_count(), 20)
+        self.assertContains(resp, 'page 1 of 3')
+
+        resp = self.client.get(url, {'copies_page': 3})
+        self.assertEqual(resp.context['inline_admin_formsets'][0].formset.initial_form_count(), 6)
+
+    def test_inline_page_links_keep_changelist_filters(self):
+        url = reverse('admin:books_core_book_change', args=[self.book.pk])
+        resp = self.client.get(url, {'_changelist_filters': 'q=war', 'copies_page': 2})
+        self.assertContains(resp, 'href="?_changelist_filters=q%3Dwar&amp;copies_page=3"')
+        self.assertContains(resp, 'href="?_changelist_filters=q%3Dwar&amp;copies_page=1"')
+
+
+class EstimatedCountPaginatorTest(TestCase):
+
+    def test_uses_statistics_for_unfiltered_querysets(self):
+        author = Author.objects.create(first_name='John', last_name='Smith')
+        queryset = Author.objects.order_by('id')
+        # Без статистики (ANALYZE не запускался) число строк считается точно
+        self.assertEqual(EstimatedCountPaginator(queryset, 10).count, 1)
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+            cursor.execute("UPDATE sqlite_stat1 SET stat = '50000 1' WHERE tbl = %s", [Author._meta.db_table])
+        with self.assertNumQueries(1):
+            self.assertEqual(EstimatedCountPaginator(queryset, 10).count, 50000)
+        self.assertEqual(EstimatedCountPaginator(queryset.filter(pk=author.pk), 10).count, 1)
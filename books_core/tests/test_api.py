@@ -0,0 +1,80 @@
+import json
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from books_core import snapshot
+from books_core.models import Author, Book, BookInstance, Genre, Language
+from books_core.tests.utils import QueryBudgetMixin
+
+
+class CatalogApiTest(QueryBudgetMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(first_name='Leo', last_name='Tolstoy')
+        language = Language.objects.create(name='Russian')
+        genres = [Genre.objects.create(name='Novel'), Genre.objects.create(name='History')]
+        for num in range(60):
+            book = Book.objects.create(title=f'Book {num:02d}', summary='Summary', isbn=str(num),
+                                       author=cls.author, language=language)
+            book.genre.set(genres)
+            BookInstance.objects.create(book=book, imprint='Imprint', status='a')
+        cls.book = book
+
+    def setUp(self):
+        cache.clear()
+
+    def test_book_list_queries_do_not_grow(self):
+        # Пока снимка каталога нет, авторы и языки страницы читаются одним запросом
+        resp = self.assertQueryBudget(4, reverse('api-book-list'))
+        data = resp.json()
+        self.assertEqual(len(data['results']), 50)
+        self.assertEqual(data['results'][0]['author'], 'Tolstoy Leo')
+        self.assertEqual(data['results'][0]['genre'], ['Novel', 'History'])
+        self.assertIsNotNone(data['next'])
+
+        resp = self.client.get(data['next'])
+        self.assertEqual(len(resp.json()['results']), 10)
+
+    def test_book_list_from_snapshot(self):
+        snapshot.refresh()
+        self.addCleanup(snapshot.clear)
+        resp = self.assertQueryBudget(3, reverse('api-book-list'))
+        self.assertEqual(resp.json()['results'][0]['author'], 'Tolstoy Leo')
+
+    def test_book_detail(self):
+        resp = self.client.get(reverse('api-book-detail', args=[self.book.pk]))
+        self.assertEqual((resp.json()['author'], resp.json()['language']), ('Tolstoy Leo', 'Russian'))
+
+    def test_sparse_fields(self):
+        resp = self.assertQueryBudget(2, reverse('api-book-detail', args=[self.book.pk]) + '?fields=id,title')
+        self.assertEqual(resp.json(), {'id': self.book.pk, 'title': 'Book 59'})
+
+    def test_copies_do_not_expose_borrower(self):
+        resp = self.client.get(reverse('api-copy-list'))
+        self.assertNotIn('borrower', resp.json()['results'][0])
+
+    def test_conditional_get(self):
+        url = reverse('api-author-list')
+        resp = self.client.get(url)
+        etag = resp['ETag']
+        self.assertIn('Last-Modified', resp)
+
+        # Только версия каталога
+        with self.assertNumQueries(1):
+            resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+
+        Author.objects.create(first_name='Fyodor', last_name='Dostoevsky')
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.json()['results']), 2)
+
+    def test_streaming_export(self):
+        resp = self.client.get(reverse('api-book-export'))
+        self.assertTrue(resp.streaming)
+        rows = json.loads(b''.join(resp.streaming_content))
+        self.assertEqual(len(rows), 60)
+        self.assertEqual(rows[0]['author__last_name'], 'Tolstoy')
@@ -0,0 +1,79 @@
+from django.contrib.auth.models import AnonymousUser, User
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.cache import cache
+from django.http import Http404
+from django.test import RequestFactory, TestCase
+from django.test.client import AsyncRequestFactory
+
+from books_core import async_views, views
+from books_core.models import Author, Book, BookInstance
+
+
+class AsyncCatalogViewsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='testuser', password='12345')
+        cls.author = Author.objects.create(first_name='Leo', last_name='Tolstoy')
+        for num in range(6):
+            cls.book = Book.objects.create(title=f'Book {num}', summary='Summary', isbn=str(num), author=cls.author)
+            BookInstance.objects.create(book=cls.book, imprint='Imprint', status='o', borrower=cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def make_request(self, factory, path, user):
+        request = factory.get(path)
+        request.user = user
+        request.session = SessionStore()
+        return request
+
+    async def test_login_required(self):
+        request = self.make_request(AsyncRequestFactory(), '/catalog/books/', AnonymousUser())
+        resp = await async_views.book_list(request)
+        self.assertEqual(resp.status_code, 302)
+        self.assertTrue(resp.url.startswith('/accounts/login/'))
+
+    async def test_list_views_match_sync_output(self):
+        for async_view, sync_view, path in (
+            (async_views.book_list, views.BookListView.as_view(), '/catalog/books/?page=2'),
+            (async_views.author_list, views.AuthorListView.as_view(), '/catalog/authors/'),
+            (async_views.loaned_books_by_user, views.LoanedBooksByUserListView.as_view(), '/catalog/mybooks/'),
+        ):
+            resp = await async_view(self.make_request(AsyncRequestFactory(), path, self.user))
+            expected = self.make_request(RequestFactory(), path, self.user)
+            expected = await async_views.sync_to_async(lambda: sync_view(expected).render())()
+            self.assertEqual(resp.status_code, 200)
+            self.assertEqual(resp.content, expected.content)
+
+    async def test_detail_views(self):
+        resp = await async_views.book_detail(
+            self.make_request(AsyncRequestFactory(), '/', self.user), pk=self.book.pk)
+        self.assertContains(resp, 'Book 5')
+        self.assertContains(resp, 'Imprint')
+
+        resp = await async_views.author_detail(
+            self.make_request(AsyncRequestFactory(), '/', AnonymousUser()), pk=self.author.pk)
+        self.assertContains(resp, 'Book 0')
+
+        with self.assertRaises(Http404):
+            await async_views.book_detail(self.make_request(AsyncRequestFactory(), '/', self.user), pk=0)
+
+    async def test_conditional_get(self):
+        resp = await async_views.author_list(self.make_request(AsyncRequestFactory(), '/catalog/authors/', self.user))
+        request = AsyncRequestFactory().get('/catalog/authors/', **{'if-none-match': resp['ETag']})
+        request.user, request.session = self.user, SessionStore()
+        resp = await async_views.author_list(request)
+        self.assertEqual(resp.status_code, 304)
+
+        # Страница книги зависит только от версии этой книги
+        path = f'/catalog/book/{self.book.pk}/'
+        resp = await async_views.book_detail(self.make_request(AsyncRequestFactory(), path, self.user), pk=self.book.pk)
+        request = AsyncRequestFactory().get(path, **{'if-none-match': resp['ETag']})
+        request.user, request.session = self.user, SessionStore()
+        resp = await async_views.book_detail(request, pk=self.book.pk)
+        self.assertEqual(resp.status_code, 304)
+
+    async def test_index(self):
+        resp = await async_views.index(self.make_request(AsyncRequestFactory(), '/catalog/', self.user))
+        self.assertContains(resp, '<strong>Books:</strong> 6')
@@ -0,0 +1,80 @@
+import datetime
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from books_core import loans
+from books_core.models import Author, Book, BookAvailability, BookInstance
+
+
+class AvailabilityTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='12345')
+        author = Author.objects.create(first_name='John', last_name='Smith')
+        self.book = Book.objects.create(title='Alpha', summary='Summary', isbn='ABCDEFG', author=author)
+        self.other = Book.objects.create(title='Beta', summary='Summary', isbn='ABCDEFG', author=author)
+        self.empty = Book.objects.create(title='Gamma', summary='Summary', isbn='ABCDEFG', author=author)
+        self.copies = [BookInstance.objects.create(book=self.book, imprint='Imprint', status=status)
+                       for status in ('a', 'a', 'm')]
+        BookInstance.objects.create(book=self.other, imprint='Imprint', status='a')
+
+    def counts(self, book):
+        row = BookAvailability.objects.get(book=book)
+        return row.available, row.on_loan, row.maintenance, row.reserved, row.next_due_back
+
+    def test_follows_copy_changes(self):
+        self.assertEqual(self.counts(self.book), (2, 0, 1, 0, None))
+        self.assertEqual(self.counts(self.empty), (0, 0, 0, 0, None))
+
+        due_back = datetime.date.today() + datetime.timedelta(days=5)
+        loans.checkout(self.copies[0].pk, self.user, due_back=due_back)
+        self.assertEqual(self.counts(self.book), (1, 1, 1, 0, due_back))
+
+        copy = BookInstance.objects.get(pk=self.copies[1].pk)
+        copy.book = self.other
+        copy.save()
+        self.assertEqual(self.counts(self.book), (0, 1, 1, 0, due_back))
+        self.assertEqual(self.counts(self.other), (2, 0, 0, 0, None))
+
+        BookInstance.objects.get(pk=self.copies[2].pk).delete()
+        self.assertEqual(self.counts(self.book), (0, 1, 0, 0, due_back))
+
+    def test_unrelated_changes_do_not_recount(self):
+        copy = BookInstance.objects.get(pk=self.copies[0].pk)
+        copy.imprint = 'Other imprint'
+        # UPDATE экземпляра и версии книги и каталога (books_core.versioning), BookAvailability не трогается
+        with self.assertNumQueries(3):
+            copy.save()
+
+    def test_rebuild_command(self):
+        BookInstance.objects.update(status='a')  # update() не отправляет сигналы
+        BookAvailability.objects.filter(book=self.empty).delete()
+        call_command('rebuild_availability', stdout=StringIO())
+        self.assertEqual(self.counts(self.book), (3, 0, 0, 0, None))
+        self.assertEqual(self.counts(self.empty), (0, 0, 0, 0, None))
+
+    def test_book_list_filter_and_sort(self):
+        self.client.login(username='testuser', password='12345')
+        resp = self.client.get(reverse('books'), {'available': 1})
+        self.assertEqual([book.title for book in resp.context['book_list']], ['Alpha', 'Beta'])
+        self.assertContains(resp, '2 available')
+
+        resp = self.client.get(reverse('books'), {'sort': 'available', 'cursor': ''})
+        self.assertEqual([book.title for book in resp.context['book_list']], ['Alpha', 'Beta', 'Gamma'])
+        loans.checkout(self.copies[0].pk, self.user)
+        loans.checkout(self.copies[1].pk, self.user)
+        resp = self.client.get(reverse('books'), {'sort': 'available'})
+        self.assertEqual([book.title for book in resp.context['book_list']], ['Beta', 'Alpha', 'Gamma'])
+        resp = self.client.get(reverse('books'), {'sort': 'available', 'available': 1})
+        self.assertEqual([book.title for book in resp.context['book_list']], ['Beta'])
+
+    def test_detail_shows_summary(self):
+        resp = self.client.get(self.book.get_absolute_url())
+        self.assertContains(resp, '2 available')
+        self.assertContains(resp, '1 in maintenance')
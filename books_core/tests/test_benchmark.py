@@ -0,0 +1,29 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+
+from books_core.management.commands import benchmark
+from books_core.models import Author, Book, BookInstance
+
+
+class BenchmarkTargetsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = Author.objects.create(first_name='John', last_name='Smith')
+        book = Book.objects.create(title='Book Title', summary='Summary', isbn='ABCDEFG', author=author)
+        BookInstance.objects.create(book=book, imprint='Imprint', status='o', borrower=User.objects.create_user('u'))
+
+    def setUp(self):
+        cache.clear()
+
+    def test_targets_cover_catalog_urls(self):
+        names = {name for name, path in benchmark.catalog_targets()}
+        self.assertTrue({'index', 'books', 'book-detail', 'renew-book-librarian', 'api-book-list',
+                         'admin:books_core_bookinstance_changelist'} <= names)
+
+    def test_every_target_is_measured(self):
+        results = benchmark.run_benchmark(repeat=1)
+        self.assertEqual({name: result['status'] for name, result in results.items() if result['status'] != 200}, {})
+        self.assertGreater(results['books']['queries'], 0)
+        self.assertGreater(results['books']['peak_kib'], 0)
@@ -0,0 +1,90 @@
+import time
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from books_core import counters
+from books_core.models import Author, Book, BookInstance
+
+
+class CountersTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.author = Author.objects.create(first_name='John', last_name='Smith')
+        self.book = Book.objects.create(title='Book Title', summary='Summary', isbn='ABCDEFG', author=self.author)
+        self.copy = BookInstance.objects.create(book=self.book, imprint='Imprint', status='a')
+        BookInstance.objects.create(book=self.book, imprint='Imprint', status='m')
+
+    def test_counts_match_database(self):
+        self.assertEqual(counters.get_counts(), {
+            'num_books': 1, 'num_instances': 2, 'num_instances_available': 1, 'num_authors': 1,
+        })
+
+    def test_counts_follow_creates_and_deletes(self):
+        counters.get_counts()
+        with self.captureOnCommitCallbacks(execute=True):
+            Book.objects.create(title='Second', summary='Summary', isbn='ABCDEFG', author=self.author)
+            Author.objects.create(first_name='Jane', last_name='Doe').delete()
+            BookInstance.objects.create(book=self.book, imprint='Imprint', status='a')
+            self.copy.delete()
+
+        counts = counters.get_counts()
+        self.assertEqual(counts['num_books'], 2)
+        self.assertEqual(counts['num_authors'], 1)
+        self.assertEqual(counts['num_instances'], 2)
+        self.assertEqual(counts['num_instances_available'], 1)
+
+    def test_counts_follow_status_changes(self):
+        counters.get_counts()
+        copy = BookInstance.objects.get(pk=self.copy.pk)
+        copy.status = 'o'
+        with self.captureOnCommitCallbacks(execute=True):
+            copy.save()
+        self.assertEqual(counters.get_counts()['num_instances_available'], 0)
+
+        copy.status = 'a'
+        with self.captureOnCommitCallbacks(execute=True):
+            copy.save()
+        self.assertEqual(counters.get_counts()['num_instances_available'], 1)
+
+    def test_rolled_back_writes_are_not_counted(self):
+        counters.get_counts()
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    Book.objects.create(title='Second', summary='Summary', isbn='ABCDEFG', author=self.author)
+                    raise ValueError
+            except ValueError:
+                pass
+        self.assertEqual(counters.get_counts()['num_books'], 1)
+
+    def test_counts_expire(self):
+        counters.get_counts()
+        # Запись другого процесса: сигналы этого процесса о ней не знают
+        BookInstance.objects.update(status='a')
+        self.assertEqual(counters.get_counts()['num_instances_available'], 1)
+        with mock.patch('django.core.cache.backends.locmem.time.time', return_value=time.time() + counters.TIMEOUT):
+            self.assertEqual(counters.get_counts()['num_instances_available'], 2)
+
+    def test_rebuild_command(self):
+        counters.get_counts()
+        BookInstance.objects.update(status='a')  # update() не отправляет сигналы
+        call_command('rebuild_counters', stdout=StringIO())
+        self.assertEqual(counters.get_counts()['num_instances_available'], 2)
+
+    def test_index_does_not_count(self):
+        User.objects.create_user(username='testuser', password='12345')
+        self.client.login(username='testuser', password='12345')
+        counters.get_counts()
+        with CaptureQueriesContext(connection) as context:
+            resp = self.client.get(reverse('index'))
+        self.assertEqual(resp.context['num_instances'], 2)
+        self.assertFalse([query for query in context.captured_queries if 'COUNT(' in query['sql']])
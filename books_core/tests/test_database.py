@@ -0,0 +1,80 @@
+import datetime
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from books_core import database
+from books_core.management.commands import bench_concurrency
+from books_core.models import Author, Book, BookInstance
+
+
+class SqlitePragmasTest(SimpleTestCase):
+    databases = {'default'}
+
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            return cursor.execute(f'PRAGMA {name}').fetchone()[0]
+
+    # Соединение с тестовой базой в памяти не закрывается, поэтому прагмы применяются вызовом обработчика
+    def configure(self, profile):
+        with override_settings(SQLITE_PROFILE=profile):
+            database.configure_connection(sender=None, connection=connection)
+
+    def tearDown(self):
+        self.configure('production')
+
+    def test_profiles(self):
+        for profile, synchronous in (('default', 2), ('production', 1)):
+            with self.subTest(profile=profile):
+                self.configure(profile)
+                self.assertEqual(self.pragma('synchronous'), synchronous)
+
+    def test_production_pragmas(self):
+        self.configure('production')
+        self.assertEqual(self.pragma('busy_timeout'), 5000)
+        self.assertEqual(self.pragma('cache_size'), -65536)
+        self.assertEqual(self.pragma('temp_store'), 2)
+
+    def test_applied_to_new_connections(self):
+        connection.ensure_connection()
+        self.assertEqual(self.pragma('busy_timeout'), 5000)
+
+    def test_unusable_connection_closed_before_request(self):
+        connection.ensure_connection()
+        with mock.patch.dict(connection.settings_dict, CONN_HEALTH_CHECKS=True), \
+                mock.patch.object(connection, 'is_usable', return_value=False), \
+                mock.patch.object(connection, 'close') as close:
+            database.check_connections()
+        close.assert_called_once_with()
+
+    def test_usable_connection_kept(self):
+        connection.ensure_connection()
+        with mock.patch.dict(connection.settings_dict, CONN_HEALTH_CHECKS=True), \
+                mock.patch.object(connection, 'close') as close:
+            database.check_connections()
+        close.assert_not_called()
+
+
+class MixedLoadTest(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_superuser('benchmark', password='12345')
+        author = Author.objects.create(first_name='John', last_name='Smith')
+        self.book = Book.objects.create(title='Book Title', summary='Summary', isbn='ABCDEFG', author=author)
+        self.copies = [BookInstance.objects.create(book=self.book, imprint='Imprint', status='o', borrower=self.user,
+                                                   due_back=datetime.date.today()) for _ in range(3)]
+
+    def test_reads_and_writes(self):
+        paths = [reverse('books'), reverse('book-detail', args=[self.book.pk])]
+        # Один поток: тестовая база в памяти с общим кэшем блокирует таблицы, и busy_timeout там не действует
+        result = bench_concurrency.run_mixed(self.user, paths, [copy.pk for copy in self.copies],
+                                             threads=1, total=30, write_ratio=0.5)
+        self.assertEqual(result['read']['requests'] + result['write']['requests'], 30)
+        self.assertGreater(result['write']['requests'], 0)
+        self.assertEqual(result['read']['errors'] + result['write']['errors'], 0)
+        self.assertEqual(BookInstance.objects.filter(due_back__gt=datetime.date.today()).count(), 3)
@@ -0,0 +1,98 @@
+import csv
+import datetime
+import io
+import json
+import os
+import tempfile
+
+from django.contrib.auth.models import Permission, User
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from books_core import exports
+from books_core.models import Author, Book, BookInstance, Genre, Language
+
+
+class ExportTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.today = datetime.date.today()
+        cls.reader = User.objects.create_user(username='reader', password='12345', email='reader@example.com')
+        cls.librarian = User.objects.create_user(username='librarian', password='12345')
+        cls.librarian.user_permissions.add(Permission.objects.get(codename='staff_perms'))
+        author = Author.objects.create(first_name='John', last_name='Smith')
+        language = Language.objects.create(name='English')
+        cls.books = [Book.objects.create(title=f'Book {i}', summary='Line one\nline "two"', isbn=f'{i:013}',
+                                         author=author, language=language) for i in range(5)]
+        cls.books[0].genre.add(Genre.objects.create(name='Poetry'), Genre.objects.create(name='Drama'))
+        cls.late = BookInstance.objects.create(book=cls.books[0], imprint='Imprint', status='o', borrower=cls.reader,
+                                               due_back=cls.today - datetime.timedelta(days=2))
+        cls.soon = BookInstance.objects.create(book=cls.books[1], imprint='Imprint', status='o', borrower=cls.reader,
+                                               due_back=cls.today + datetime.timedelta(days=2))
+        BookInstance.objects.create(book=cls.books[2], imprint='Imprint', status='a')
+
+    def test_book_rows(self):
+        rows = list(exports.book_rows(chunk_size=2))
+        self.assertEqual([row['id'] for row in rows], [book.pk for book in self.books])
+        self.assertEqual(rows[0]['genres'], 'Drama; Poetry')
+        self.assertEqual(rows[0]['author'], 'Smith John')
+        self.assertEqual(rows[0]['language'], 'English')
+        self.assertEqual(rows[1]['genres'], '')
+
+    def test_book_queries_per_chunk(self):
+        # Запрос строк плюс запрос жанров на каждую порцию
+        with self.assertNumQueries(1 + 3):
+            list(exports.book_rows(chunk_size=2))
+
+    def test_loan_rows(self):
+        rows = list(exports.loan_rows())
+        self.assertEqual([row['id'] for row in rows], [self.late.pk, self.soon.pk])
+        self.assertEqual([row['overdue'] for row in rows], [True, False])
+        self.assertEqual(rows[0]['email'], 'reader@example.com')
+
+    def test_render_csv(self):
+        rows = list(csv.reader(io.StringIO(''.join(exports.render('books', 'csv')), newline='')))
+        self.assertEqual(rows[0], ['id', 'title', 'isbn', 'author', 'language', 'genres', 'summary'])
+        self.assertEqual(len(rows), 1 + len(self.books))
+        self.assertEqual(rows[1][6], 'Line one\nline "two"')
+
+    def test_render_jsonl(self):
+        rows = [json.loads(line) for line in exports.render('copies', 'jsonl')]
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]['id'], str(BookInstance.objects.order_by('id').first().pk))
+
+    def test_view_streams(self):
+        self.client.login(username='librarian', password='12345')
+        response = self.client.get(reverse('export', args=['loans']))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertTrue(response['Content-Type'].startswith('text/csv'))
+        self.assertIn(f'loans-{self.today:%Y-%m-%d}.csv', response['Content-Disposition'])
+        content = b''.join(response.streaming_content).decode()
+        self.assertEqual(len(content.splitlines()), 3)
+
+        response = self.client.get(reverse('export', args=['books']), {'format': 'jsonl'})
+        self.assertTrue(response['Content-Type'].startswith('application/x-ndjson'))
+        self.assertEqual(len(b''.join(response.streaming_content).splitlines()), len(self.books))
+
+    def test_view_unknown(self):
+        self.client.login(username='librarian', password='12345')
+        self.assertEqual(self.client.get(reverse('export', args=['users'])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('export', args=['books']), {'format': 'xml'}).status_code, 404)
+
+    def test_view_staff_only(self):
+        self.client.login(username='reader', password='12345')
+        self.assertEqual(self.client.get(reverse('export', args=['books'])).status_code, 302)
+
+    def test_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'books.jsonl')
+            call_command('export_catalog', 'books', format='jsonl', output=path, chunk_size=2, stderr=io.StringIO())
+            with open(path, encoding='utf-8') as file:
+                self.assertEqual(len(file.readlines()), len(self.books))
+
+        out = io.StringIO()
+        call_command('export_catalog', 'loans', stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 3)
@@ -0,0 +1,109 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.http import QueryDict
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.html import escape
+
+from books_core import facets
+from books_core.models import Author, Book, BookInstance, Genre, Language
+
+
+class FacetsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='reader', password='12345')
+        cls.tolstoy = Author.objects.create(first_name='Leo', last_name='Tolstoy')
+        cls.pushkin = Author.objects.create(first_name='Alexander', last_name='Pushkin')
+        cls.russian = Language.objects.create(name='Russian')
+        cls.english = Language.objects.create(name='English')
+        cls.novel = Genre.objects.create(name='Novel')
+        cls.poetry = Genre.objects.create(name='Poetry')
+        cls.books = {}
+        for title, author, language, genres, available in (
+            ('War and Peace', cls.tolstoy, cls.russian, [cls.novel], True),
+            ('Anna Karenina', cls.tolstoy, cls.english, [cls.novel], False),
+            ('Eugene Onegin', cls.pushkin, cls.russian, [cls.novel, cls.poetry], True),
+            ('Ruslan and Ludmila', cls.pushkin, cls.russian, [cls.poetry], False),
+        ):
+            book = Book.objects.create(title=title, summary='Summary', isbn='ABCDEFG', author=author,
+                                       language=language)
+            book.genre.set(genres)
+            BookInstance.objects.create(book=book, imprint='Imprint', status='a' if available else 'o')
+            cls.books[title] = book
+
+    def setUp(self):
+        cache.clear()
+
+    def facet_counts(self, query=''):
+        return {facet.name: {value.label: value.count for value in facet.values}
+                for facet in facets.facet_list(QueryDict(query))}
+
+    def test_counts(self):
+        self.assertEqual(self.facet_counts(), {
+            'genre': {'Novel': 3, 'Poetry': 2},
+            'language': {'English': 1, 'Russian': 3},
+            'author': {'Pushkin Alexander': 2, 'Tolstoy Leo': 2},
+            'available': {'Available now': 2},
+        })
+
+    def test_counts_use_the_other_facets(self):
+        counts = self.facet_counts(f'genre={self.poetry.pk}&available=1')
+        # Значения выбранного фасета считаются без него, чтобы можно было выбрать другое
+        self.assertEqual(counts['genre'], {'Novel': 2, 'Poetry': 1})
+        self.assertEqual(counts['language'], {'Russian': 1})
+        self.assertEqual(counts['author'], {'Pushkin Alexander': 1})
+        self.assertEqual(counts['available'], {'Available now': 1})
+
+    def test_selection_ignores_bad_values(self):
+        self.assertEqual(facets.selection(QueryDict('genre=x&language=2&available=yes&author=')), {'language': 2})
+        # Надстрочные цифры и числа больше 64 бит тоже не id
+        self.assertEqual(facets.selection(QueryDict('genre=%C2%B2&author=99999999999999999999&language=1')),
+                         {'language': 1})
+
+    def test_book_list_with_bad_values(self):
+        self.client.login(username='reader', password='12345')
+        resp = self.client.get(reverse('books'), {'genre': '\u00b2', 'author': '9' * 30})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.context['book_list']), len(self.books))
+
+    def test_counts_are_cached_until_data_changes(self):
+        self.facet_counts()
+        # Версии всех фасетов читаются одним запросом
+        with self.assertNumQueries(1):
+            self.facet_counts()
+        self.books['Anna Karenina'].genre.add(self.poetry)
+        self.assertEqual(self.facet_counts()['genre'], {'Novel': 3, 'Poetry': 3})
+        # Возврат экземпляра меняет только счётчик доступности
+        copy = BookInstance.objects.get(book=self.books['Anna Karenina'])
+        copy.status = 'a'
+        copy.save()
+        with self.assertNumQueries(2):
+            self.assertEqual(self.facet_counts()['available'], {'Available now': 3})
+
+    def test_selected_author_outside_the_top_is_shown(self):
+        original, facets.AUTHOR_LIMIT = facets.AUTHOR_LIMIT, 1
+        try:
+            authors = self.facet_counts(f'author={self.pushkin.pk}')['author']
+        finally:
+            facets.AUTHOR_LIMIT = original
+        self.assertEqual(authors, {'Pushkin Alexander': 2, 'Tolstoy Leo': 2})
+
+    def test_book_list_filters(self):
+        self.client.login(username='reader', password='12345')
+        resp = self.client.get(reverse('books'), {'language': self.russian.pk, 'genre': self.novel.pk,
+                                                  'sort': 'available'})
+        self.assertEqual([book.title for book in resp.context['book_list']], ['Eugene Onegin', 'War and Peace'])
+        genre = next(facet for facet in resp.context['facets'] if facet.name == 'genre')
+        novel = next(value for value in genre.values if value.label == 'Novel')
+        # Ссылка на выбранное значение снимает фильтр, остальные параметры сохраняются
+        self.assertTrue(novel.selected)
+        self.assertEqual(QueryDict(novel.query), QueryDict(f'language={self.russian.pk}&sort=available'))
+        self.assertContains(resp, f'href="?{escape(novel.query)}"')
+        self.assertEqual(resp.context['pagination_query'].count('&'), 3)
+
+    def test_book_list_available(self):
+        self.client.login(username='reader', password='12345')
+        resp = self.client.get(reverse('books'), {'available': 1, 'author': self.pushkin.pk})
+        self.assertEqual([book.title for book in resp.context['book_list']], ['Eugene Onegin'])
@@ -0,0 +1,60 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from books_core.models import Author, Book, BookInstance, Genre, Language
+
+
+class DetailFragmentCacheTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.author = Author.objects.create(first_name='Leo', last_name='Tolstoy')
+        self.genre = Genre.objects.create(name='Novel')
+        self.book = Book.objects.create(title='War and Peace', summary='Summary', isbn='1', author=self.author,
+                                        language=Language.objects.create(name='Russian'))
+        self.book.genre.add(self.genre)
+        self.copy = BookInstance.objects.create(book=self.book, imprint='Penguin', status='a')
+        self.book_url = reverse('book-detail', args=[self.book.pk])
+        self.author_url = reverse('author-detail', args=[self.author.pk])
+
+    def test_book_detail_served_from_cache(self):
+        with self.assertNumQueries(4):
+            self.client.get(self.book_url)
+        # Только версии и сама книга, жанры и экземпляры берутся из кэша
+        with self.assertNumQueries(2):
+            resp = self.client.get(self.book_url)
+        self.assertContains(resp, 'Penguin')
+
+    def test_book_detail_follows_copies(self):
+        self.client.get(self.book_url)
+        copy = BookInstance.objects.get(pk=self.copy.pk)
+        copy.status = 'o'
+        copy.save()
+        self.assertContains(self.client.get(self.book_url), 'On loan')
+
+        BookInstance.objects.create(book=self.book, imprint='Vintage')
+        self.assertContains(self.client.get(self.book_url), 'Vintage')
+
+    def test_book_detail_follows_genres_and_author(self):
+        self.client.get(self.book_url)
+        self.genre.name = 'Epic'
+        self.genre.save()
+        self.assertContains(self.client.get(self.book_url), 'Epic')
+
+        self.book.genre.add(Genre.objects.create(name='History'))
+        self.assertContains(self.client.get(self.book_url), 'History')
+
+        self.author.last_name = 'Tolstoi'
+        self.author.save()
+        self.assertContains(self.client.get(self.book_url), 'Tolstoi')
+
+    def test_author_detail_follows_books(self):
+        self.client.get(self.author_url)
+        with self.assertNumQueries(2):
+            self.client.get(self.author_url)
+
+        book = Book.objects.get(pk=self.book.pk)
+        book.author = Author.objects.create(first_name='Fyodor', last_name='Dostoevsky')
+        book.save()
+        self.assertNotContains(self.client.get(self.author_url), 'War and Peace')
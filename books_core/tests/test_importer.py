@@ -0,0 +1,75 @@
+import datetime
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from books_core import counters
+from books_core.importer import CatalogImporter
+from books_core.models import Author, Book, BookAvailability, BookInstance, Genre, Language
+
+CSV_DATA = '''title,summary,isbn,author_first_name,author_last_name,language,genres,copies,imprint,status
+War and Peace,Napoleon,1,Leo,Tolstoy,English,Novel|History,3,Penguin,a
+Anna Karenina,Trains,2,Leo,Tolstoy,Russian,Novel,1,Vintage,m
+'''
+
+
+class CatalogImporterTest(TestCase):
+
+    def test_records_are_resolved_by_natural_key(self):
+        Author.objects.create(first_name='Leo', last_name='Tolstoy')
+        Genre.objects.create(name='Novel')
+        records = [
+            {'title': 'War and Peace', 'author_first_name': 'Leo', 'author_last_name': 'Tolstoy',
+             'language': 'Russian', 'genres': ['Novel', 'History', 'Novel'],
+             'copies': [{'imprint': 'Penguin', 'status': 'o', 'due_back': '2030-01-01'}, {'imprint': 'Vintage'}]},
+            {'title': 'Dune', 'author_first_name': 'Frank', 'author_last_name': 'Herbert',
+             'language': 'Russian', 'genres': ['Novel']},
+        ]
+        importer = CatalogImporter(batch_size=10)
+        with CaptureQueriesContext(connection) as context:
+            importer.run(records)
+        # По одному INSERT на пачку: авторы, жанры, языки, книги, связи с жанрами, экземпляры
+        self.assertEqual(len([query for query in context.captured_queries if query['sql'].startswith('INSERT')]), 6)
+
+        self.assertEqual((importer.books, importer.copies), (2, 2))
+        self.assertEqual(Author.objects.count(), 2)
+        self.assertEqual(Language.objects.count(), 1)
+        book = Book.objects.get(title='War and Peace')
+        self.assertEqual(sorted(genre.name for genre in book.genre.all()), ['History', 'Novel'])
+        self.assertEqual(book.author.last_name, 'Tolstoy')
+        copy = book.bookinstance_set.get(imprint='Penguin')
+        self.assertEqual((copy.status, copy.due_back), ('o', datetime.date(2030, 1, 1)))
+        self.assertEqual(book.bookinstance_set.get(imprint='Vintage').status, 'm')
+
+    def test_command_imports_csv(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv') as file:
+            file.write(CSV_DATA)
+            file.flush()
+            out = StringIO()
+            call_command('import_catalog', file.name, stdout=out)
+
+        self.assertIn('Imported 2 books and 4 copies', out.getvalue())
+        self.assertEqual(Author.objects.count(), 1)
+        self.assertEqual(Genre.objects.count(), 2)
+        self.assertEqual(BookInstance.objects.filter(status='a', imprint='Penguin').count(), 3)
+
+    def test_command_failure_keeps_derived_data_in_sync(self):
+        # Вторая пачка с ошибкой: первая уже записана, счётчики и доступность должны её учитывать
+        data = CSV_DATA + 'Broken,Summary,3,Leo,Tolstoy,English,Novel,many,Penguin,a\n'
+        with tempfile.NamedTemporaryFile('w', suffix='.csv') as file:
+            file.write(data)
+            file.flush()
+            with self.assertRaisesMessage(CommandError, 'Import failed after 2 books'):
+                call_command('import_catalog', file.name, '--batch-size', '2', stdout=StringIO())
+
+        self.assertEqual(Book.objects.count(), 2)
+        self.assertEqual(counters.get_counts()['num_books'], 2)
+        self.assertEqual(BookAvailability.objects.get(book__title='War and Peace').available, 3)
+
+    def test_command_missing_file(self):
+        with self.assertRaisesMessage(CommandError, 'Cannot open'):
+            call_command('import_catalog', '/nonexistent/catalog.csv', stdout=StringIO())
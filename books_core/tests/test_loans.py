@@ -0,0 +1,128 @@
+import datetime
+import threading
+
+from django.contrib.auth.models import Permission, User
+from django.core.cache import cache
+from django.db import connections
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from books_core import counters, loans
+from books_core.models import Author, Book, BookInstance
+
+
+class LoansTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.reader = User.objects.create_user(username='reader', password='12345')
+        self.other = User.objects.create_user(username='other', password='12345')
+        author = Author.objects.create(first_name='John', last_name='Smith')
+        self.book = Book.objects.create(title='Book Title', summary='Summary', isbn='ABCDEFG', author=author)
+        self.copy = BookInstance.objects.create(book=self.book, imprint='Imprint', status='a')
+
+    def test_checkout_and_return(self):
+        counters.get_counts()
+        with self.captureOnCommitCallbacks(execute=True):
+            copy = loans.checkout(self.copy.pk, self.reader)
+        self.assertEqual((copy.status, copy.borrower, copy.due_back),
+                         ('o', self.reader, datetime.date.today() + loans.LOAN_PERIOD))
+        self.assertEqual(BookInstance.objects.get(pk=self.copy.pk).borrower, self.reader)
+        # Счётчики обновляются сигналом post_save после фиксации транзакции
+        self.assertEqual(counters.get_counts()['num_instances_available'], 0)
+
+        with self.assertRaises(loans.CopyNotAvailable):
+            loans.checkout(self.copy.pk, self.other)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            loans.return_copy(self.copy.pk)
+        copy = BookInstance.objects.get(pk=self.copy.pk)
+        self.assertEqual((copy.status, copy.borrower, copy.due_back), ('a', None, None))
+        self.assertEqual(counters.get_counts()['num_instances_available'], 1)
+        with self.assertRaises(loans.NotOnLoan):
+            loans.return_copy(self.copy.pk)
+
+    def test_reserve(self):
+        loans.reserve(self.copy.pk, self.reader)
+        with self.assertRaises(loans.CopyNotAvailable):
+            loans.checkout(self.copy.pk, self.other)
+        with self.assertRaises(loans.CopyNotAvailable):
+            loans.reserve(self.copy.pk, self.other)
+        self.assertEqual(loans.checkout(self.copy.pk, self.reader).status, 'o')
+
+    def test_renew(self):
+        with self.assertRaises(loans.NotOnLoan):
+            loans.renew(self.copy.pk, datetime.date.today())
+        loans.checkout(self.copy.pk, self.reader)
+        due_back = datetime.date.today() + datetime.timedelta(weeks=2)
+        loans.renew(self.copy.pk, due_back)
+        self.assertEqual(BookInstance.objects.get(pk=self.copy.pk).due_back, due_back)
+        with self.assertRaises(loans.InvalidDueDate):
+            loans.renew(self.copy.pk, datetime.date.today() + datetime.timedelta(weeks=5))
+
+    def test_stale_read_is_not_applied(self):
+        loans.checkout(self.copy.pk, self.reader)
+        # Экземпляр вернули между чтением и записью: продление не должно снова выдать его
+        original_load = loans._load
+
+        def load_then_return(copy_id, using):
+            copy = original_load(copy_id, using)
+            if copy.status == 'o':
+                BookInstance.objects.filter(pk=copy_id).update(status='a', borrower=None, due_back=None)
+            return copy
+
+        loans._load = load_then_return
+        try:
+            with self.assertRaises(loans.NotOnLoan):
+                loans.renew(self.copy.pk, datetime.date.today())
+        finally:
+            loans._load = original_load
+        self.assertEqual(BookInstance.objects.get(pk=self.copy.pk).status, 'a')
+
+    def test_renew_view_reports_conflict(self):
+        self.reader.user_permissions.add(Permission.objects.get(codename='staff_perms'))
+        self.client.login(username='reader', password='12345')
+        resp = self.client.post(reverse('renew-book-librarian', args=[self.copy.pk]),
+                                {'renewal_date': datetime.date.today()})
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn('is not on loan', str(resp.context['form'].non_field_errors()))
+
+
+class ConcurrentCheckoutTest(TransactionTestCase):
+    """
+    Parallel checkouts of the same copy from separate threads (and database connections).
+    """
+    THREADS = 10
+
+    def setUp(self):
+        cache.clear()
+        author = Author.objects.create(first_name='John', last_name='Smith')
+        book = Book.objects.create(title='Book Title', summary='Summary', isbn='ABCDEFG', author=author)
+        self.copy = BookInstance.objects.create(book=book, imprint='Imprint', status='a')
+        self.readers = [User.objects.create_user(username=f'reader{num}') for num in range(self.THREADS)]
+
+    def test_copy_is_lent_once(self):
+        barrier = threading.Barrier(self.THREADS)
+        results = []
+
+        def attempt(reader):
+            barrier.wait()
+            try:
+                loans.checkout(self.copy.pk, reader)
+                results.append(reader)
+            except loans.LoanError as exc:
+                results.append(exc)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=attempt, args=(reader,)) for reader in self.readers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        winners = [result for result in results if isinstance(result, User)]
+        self.assertEqual(len(results), self.THREADS)
+        self.assertEqual(len(winners), 1)
+        copy = BookInstance.objects.get(pk=self.copy.pk)
+        self.assertEqual((copy.status, copy.borrower), ('o', winners[0]))
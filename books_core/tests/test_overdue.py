@@ -0,0 +1,98 @@
+import datetime
+import json
+from io import StringIO
+
+from django.contrib.auth.models import Permission, User
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from books_core import notices
+from books_core.models import Author, Book, BookInstance
+
+
+class OverdueTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.today = datetime.date.today()
+        cls.reader = User.objects.create_user(username='reader', password='12345', email='reader@example.com')
+        cls.other = User.objects.create_user(username='other', password='12345')
+        cls.librarian = User.objects.create_user(username='librarian', password='12345')
+        cls.librarian.user_permissions.add(Permission.objects.get(codename='staff_perms'))
+        author = Author.objects.create(first_name='John', last_name='Smith')
+        cls.book = Book.objects.create(title='First', summary='Summary', isbn='ABCDEFG', author=author)
+        cls.second = Book.objects.create(title='Second', summary='Summary', isbn='ABCDEFG', author=author)
+
+        def copy(book, days, borrower, status='o'):
+            return BookInstance.objects.create(book=book, imprint='Imprint', status=status, borrower=borrower,
+                                               due_back=cls.today + datetime.timedelta(days=days))
+
+        cls.late = copy(cls.book, -10, cls.reader)
+        cls.later = copy(cls.second, -3, cls.reader)
+        cls.other_late = copy(cls.book, -1, cls.other)
+        cls.due_today = copy(cls.book, 0, cls.other)
+        cls.due_soon = copy(cls.second, 5, cls.reader)
+        cls.returned = copy(cls.second, -20, None, status='a')
+
+    def test_overdue(self):
+        self.assertQuerysetEqual(BookInstance.objects.overdue().order_by('due_back'),
+                                 [self.late, self.later, self.other_late])
+
+    def test_due_within(self):
+        self.assertQuerysetEqual(BookInstance.objects.due_within(7).order_by('due_back'),
+                                 [self.due_today, self.due_soon])
+        self.assertQuerysetEqual(BookInstance.objects.due_within(0), [self.due_today])
+
+    def test_annotation_matches_property(self):
+        with self.assertNumQueries(1):
+            annotated = {copy.pk: copy.is_overdue for copy in BookInstance.objects.with_overdue()}
+        for copy in BookInstance.objects.all():
+            self.assertEqual(annotated[copy.pk], copy.is_overdue)
+
+    def test_summary_by_borrower(self):
+        summary = list(BookInstance.objects.overdue_summary(by='borrower'))
+        self.assertEqual([(row['borrower__username'], row['num_overdue'], row['oldest_due_back']) for row in summary],
+                         [('reader', 2, self.late.due_back), ('other', 1, self.other_late.due_back)])
+
+    def test_summary_by_book(self):
+        summary = list(BookInstance.objects.overdue_summary(by='book'))
+        self.assertEqual([(row['book__title'], row['num_overdue']) for row in summary], [('First', 2), ('Second', 1)])
+
+    def test_staff_filters(self):
+        self.client.login(username='librarian', password='12345')
+        resp = self.client.get(reverse('all-borrowed'), {'overdue': 1})
+        self.assertEqual(list(resp.context['bookinstance_list_staff']), [self.late, self.later, self.other_late])
+        self.assertTrue(all(copy.overdue for copy in resp.context['bookinstance_list_staff']))
+        self.assertEqual(resp.context['pagination_query'], 'overdue=1&')
+
+        resp = self.client.get(reverse('all-borrowed'), {'due_within': 7})
+        self.assertEqual(list(resp.context['bookinstance_list_staff']), [self.due_today, self.due_soon])
+
+    def test_staff_filter_bad_days(self):
+        self.client.login(username='librarian', password='12345')
+        everything = list(self.client.get(reverse('all-borrowed')).context['bookinstance_list_staff'])
+        # Слишком большое число ограничивается годом, надстрочная цифра не число
+        resp = self.client.get(reverse('all-borrowed'), {'due_within': '99999999'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(list(resp.context['bookinstance_list_staff']), [self.due_today, self.due_soon])
+        resp = self.client.get(reverse('all-borrowed'), {'due_within': '\u00b2'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(list(resp.context['bookinstance_list_staff']), everything)
+
+    def test_notices_group_loans_by_borrower(self):
+        result = list(notices.overdue_notices(chunk_size=1))
+        self.assertEqual([(notice.username, [loan['id'] for loan in notice.loans]) for notice in result],
+                         [('reader', [self.late.pk, self.later.pk]), ('other', [self.other_late.pk])])
+        self.assertEqual(result[0].email, 'reader@example.com')
+
+    def test_report_command(self):
+        out = StringIO()
+        call_command('overdue_report', group_by='book', stdout=out)
+        self.assertEqual(out.getvalue().splitlines()[0],
+                         f'First: 2 overdue, oldest due {self.late.due_back}')
+
+        out = StringIO()
+        call_command('overdue_report', notices=True, batch_size=1, stdout=out, stderr=StringIO())
+        lines = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([line['username'] for line in lines], ['reader', 'other'])
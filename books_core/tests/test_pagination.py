@@ -0,0 +1,95 @@
+import datetime
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.http import Http404
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from books_core.models import Author, Book, BookInstance
+from books_core.pagination import encode_cursor, paginate_keyset, NEXT
+
+
+class KeysetPaginationTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        # Одинаковые фамилии, чтобы проверить сравнение по нескольким полям
+        for author_num in range(10):
+            Author.objects.create(first_name=f'Name {author_num % 4}', last_name=f'Surname {author_num % 3}')
+        cls.user = User.objects.create_user(username='testuser', password='12345')
+        book = Book.objects.create(title='Book Title', summary='Summary', isbn='ABCDEFG')
+        for copy_num in range(7):
+            due_back = None if copy_num < 2 else datetime.date.today() + datetime.timedelta(days=copy_num % 3)
+            BookInstance.objects.create(book=book, imprint='Imprint', due_back=due_back, status='o',
+                                        borrower=cls.user)
+
+    def walk(self, url, context_name):
+        """
+        Walks all pages forward and then back, returns the ids in both directions.
+        """
+        forward, page = [], None
+        resp = self.client.get(url + '?cursor=')
+        while True:
+            page = resp.context['page_obj']
+            forward.extend(obj.pk for obj in resp.context[context_name])
+            if not page.has_next():
+                break
+            resp = self.client.get(url + f'?cursor={page.next_cursor}')
+
+        backward = [obj.pk for obj in reversed(resp.context[context_name])]
+        while page.has_previous():
+            resp = self.client.get(url + f'?cursor={page.previous_cursor}')
+            page = resp.context['page_obj']
+            backward.extend(obj.pk for obj in reversed(resp.context[context_name]))
+        return forward, backward
+
+    def test_authors_walk_all_pages(self):
+        expected = list(Author.objects.order_by('last_name', 'first_name', 'id').values_list('pk', flat=True))
+        forward, backward = self.walk(reverse('authors'), 'author_list')
+        self.assertEqual(forward, expected)
+        self.assertEqual(backward, expected[::-1])
+
+    def test_nullable_key(self):
+        self.client.login(username='testuser', password='12345')
+        expected = list(
+            BookInstance.objects.order_by('due_back', 'id').values_list('pk', flat=True)
+        )
+        forward, backward = self.walk(reverse('my-borrowed'), 'bookinstance_list')
+        self.assertEqual(forward, expected)
+        self.assertEqual(backward, expected[::-1])
+
+    def test_descending_key(self):
+        expected = list(Author.objects.order_by('-last_name', 'id'))
+        page = paginate_keyset(Author.objects.all(), ('-last_name', 'id'), 4)
+        walked = list(page)
+        while page.has_next():
+            page = paginate_keyset(Author.objects.all(), ('-last_name', 'id'), 4, page.next_cursor)
+            walked.extend(page)
+        self.assertEqual(walked, expected)
+
+    @override_settings(KEYSET_PAGINATION=True)
+    def test_keyset_mode_has_no_count(self):
+        with CaptureQueriesContext(connection) as context:
+            resp = self.client.get(reverse('authors'))
+        self.assertTrue(resp.context['is_paginated'])
+        self.assertIsNone(resp.context['paginator'])
+        self.assertContains(resp, f'?cursor={resp.context["page_obj"].next_cursor}')
+        self.assertFalse([query for query in context.captured_queries if 'COUNT(' in query['sql']])
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get(reverse('authors') + '?cursor=garbage').status_code, 404)
+        with self.assertRaises(Http404):
+            paginate_keyset(Author.objects.all(), ('last_name', 'id'), 3, encode_cursor(NEXT, ['Surname 1']))
+
+    def test_cursor_with_wrong_types(self):
+        # Курсор подделан: значения не подходят к полям сортировки
+        self.client.force_login(self.user)
+        for url, values in ((reverse('books'), ['x', 'abc']), (reverse('authors'), ['a', 'b', 'abc']),
+                            (reverse('authors'), ['a', 'b', 10 ** 30]), (reverse('my-borrowed'), ['never', 1]),
+                            (reverse('books') + '?sort=available&', [{}, 'x', 1])):
+            with self.subTest(url=url, values=values):
+                separator = '&' if url.endswith('&') else '?'
+                resp = self.client.get(f'{url.rstrip("&")}{separator}cursor={encode_cursor(NEXT, values)}')
+                self.assertEqual(resp.status_code, 404)
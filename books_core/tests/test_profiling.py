@@ -0,0 +1,108 @@
+import json
+import os
+import re
+import time
+from io import StringIO
+
+from django.contrib.auth.models import Permission, User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from books_core import profiling
+from books_core.models import Author, Book
+
+
+@override_settings(PROFILING=True)
+class ProfilingTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(first_name='John', last_name='Smith')
+        cls.book = Book.objects.create(title='Book Title', summary='Summary', isbn='ABCDEFG', author=cls.author)
+        cls.librarian = User.objects.create_user(username='librarian', password='12345', is_staff=True)
+        cls.librarian.user_permissions.add(Permission.objects.get(codename='staff_perms'))
+
+    def setUp(self):
+        cache.clear()
+        profiling.registry.reset()
+
+    def timing(self, response):
+        return dict(re.findall(r'(\w+);(?:dur=[\d.]+;)?desc="([^"]*)"', response['Server-Timing']))
+
+    def test_server_timing_header(self):
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.get(self.book.get_absolute_url())
+        self.assertRegex(resp['Server-Timing'], r'^total;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries", tpl;dur=[\d.]+')
+        self.assertEqual(self.timing(resp)['db'], f'{len(queries)} queries')
+        # Первый запрос заполняет кэш фрагмента, второй берёт его из кэша
+        first = self.timing(resp)['cache']
+        second = self.timing(self.client.get(self.book.get_absolute_url()))['cache']
+        self.assertRegex(first, r'\d+ hits, [1-9]\d* misses')
+        self.assertRegex(second, r'[1-9]\d* hits, 0 misses')
+
+    def test_aggregates_per_url_name(self):
+        for _ in range(3):
+            self.client.get(reverse('authors'))
+        self.client.get(self.book.get_absolute_url())
+        summary = profiling.summarize(profiling.registry.raw())
+        self.assertEqual(summary['authors']['count'], 3)
+        self.assertEqual(summary['book-detail']['count'], 1)
+        self.assertGreater(summary['authors']['avg_queries'], 0)
+        self.assertGreater(summary['authors']['avg_template_ms'], 0)
+
+    def test_timing_is_shown_to_internal_ips_and_staff(self):
+        resp = self.client.get(reverse('authors'), REMOTE_ADDR='203.0.113.5')
+        self.assertNotIn('Server-Timing', resp)
+        self.assertIn('authors', profiling.registry.raw())
+
+        self.client.login(username='librarian', password='12345')
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.get(reverse('authors'), REMOTE_ADDR='203.0.113.5')
+        # Проверка пользователя не добавляет запросов после ответа
+        self.assertEqual(self.timing(resp)['db'], f'{len(queries)} queries')
+
+    @override_settings(PROFILING_SAMPLE_RATE=0)
+    def test_sampling(self):
+        resp = self.client.get(reverse('authors'), REMOTE_ADDR='203.0.113.5')
+        self.assertNotIn('Server-Timing', resp)
+        self.assertEqual(profiling.registry.raw(), {})
+        # Запросы с INTERNAL_IPS профилируются всегда
+        resp = self.client.get(reverse('authors'))
+        self.assertIn('Server-Timing', resp)
+        self.assertEqual(profiling.registry.raw()['authors']['count'], 1)
+
+    @override_settings(PROFILING=False)
+    def test_disabled(self):
+        resp = self.client.get(reverse('authors'))
+        self.assertNotIn('Server-Timing', resp)
+        self.assertEqual(profiling.registry.raw(), {})
+
+    def test_staff_endpoint(self):
+        self.client.get(reverse('authors'))
+        self.assertEqual(self.client.get(reverse('profiling-stats')).status_code, 302)
+
+        self.client.login(username='librarian', password='12345')
+        resp = self.client.get(reverse('profiling-stats'), {'reset': 1})
+        self.assertEqual(resp.json()['views']['authors']['count'], 1)
+        self.assertNotIn('authors', profiling.registry.raw())
+
+    def test_command_merges_published_aggregates(self):
+        self.client.get(reverse('authors'))
+        profiling.registry.publish()
+        out = StringIO()
+        call_command('profiling_stats', json=True, stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['workers'], 1)
+        self.assertEqual(report['views']['authors']['count'], 1)
+
+    def test_stale_workers_are_dropped(self):
+        cache.set(profiling.WORKERS_KEY, {
+            'profiling:1': time.time() - profiling.WORKER_TIMEOUT - 1,
+            'profiling:2': time.time(),
+        })
+        profiling.registry.publish()
+        self.assertEqual(set(cache.get(profiling.WORKERS_KEY)), {'profiling:2', f'profiling:{os.getpid()}'})
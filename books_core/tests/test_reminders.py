@@ -0,0 +1,86 @@
+import datetime
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from books_core import notices
+from books_core.models import Author, Book, BookInstance
+
+
+class RemindersTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        today = datetime.date.today()
+        author = Author.objects.create(first_name='John', last_name='Smith')
+        book = Book.objects.create(title='Book Title', summary='Summary', isbn='ABCDEFG', author=author)
+        cls.readers = [User.objects.create_user(username=f'reader{num}', email=f'reader{num}@example.com')
+                       for num in range(5)]
+        cls.no_email = User.objects.create_user(username='no-email')
+        for reader in cls.readers + [cls.no_email]:
+            for days in (1, 2, 30, -5):
+                BookInstance.objects.create(book=book, imprint='Imprint', status='o', borrower=reader,
+                                            due_back=today + datetime.timedelta(days=days))
+
+    def test_one_message_per_borrower(self):
+        stats = notices.send_notices(notices.due_soon_notices(3), 'books_core/email/due_soon.txt', 'Due soon',
+                                     batch_size=2)
+        self.assertEqual(stats, {'sent': 5, 'skipped': 1, 'failed': 0})
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox),
+                         [reader.email for reader in self.readers])
+        # Два экземпляра с возвратом в ближайшие дни, просроченный и дальний в письмо не попадают
+        self.assertEqual(mail.outbox[0].body.count('Book Title'), 2)
+
+    def test_connection_is_reused(self):
+        with mock.patch('books_core.notices.get_connection', wraps=notices.get_connection) as get_connection:
+            notices.send_notices(notices.due_soon_notices(3), 'books_core/email/due_soon.txt', 'Due soon',
+                                 batch_size=1, concurrency=2)
+        self.assertEqual(get_connection.call_count, 2)
+        self.assertEqual(len(mail.outbox), 5)
+
+    def test_failed_batch_is_counted(self):
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=OSError), \
+                self.assertLogs('books_core.notices', 'ERROR'):
+            stats = notices.send_notices(notices.overdue_notices(), 'books_core/email/overdue.txt', 'Overdue',
+                                         batch_size=2)
+        self.assertEqual(stats, {'sent': 0, 'skipped': 1, 'failed': 5})
+
+    @override_settings(EMAIL_BACKEND='books_core.missing.EmailBackend')
+    def test_broken_backend_does_not_hang(self):
+        # Больше пачек, чем мест в очереди: без соединения потоки всё равно вычитывают её до конца
+        with self.assertLogs('books_core.notices', 'ERROR'):
+            stats = notices.send_notices(notices.overdue_notices(), 'books_core/email/overdue.txt', 'Overdue',
+                                         batch_size=1, concurrency=1)
+        self.assertEqual(stats, {'sent': 0, 'skipped': 1, 'failed': 5})
+
+    def test_failed_close_is_logged(self):
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=OSError), \
+                mock.patch('django.core.mail.backends.base.BaseEmailBackend.close', side_effect=OSError), \
+                self.assertLogs('books_core.notices', 'ERROR'):
+            stats = notices.send_notices(notices.overdue_notices(), 'books_core/email/overdue.txt', 'Overdue',
+                                         batch_size=1)
+        self.assertEqual(stats, {'sent': 0, 'skipped': 1, 'failed': 5})
+
+    def test_rate_limiter(self):
+        limiter = notices.RateLimiter(1000)
+        with mock.patch('books_core.notices.time.sleep') as sleep:
+            limiter.wait(10)
+            limiter.wait(10)
+        self.assertAlmostEqual(sleep.call_args[0][0], 0.01, delta=0.005)
+
+    def test_command(self):
+        out = StringIO()
+        call_command('send_reminders', overdue=True, stdout=out)
+        self.assertIn('5 sent, 1 without e-mail, 0 failed', out.getvalue())
+        self.assertIn('overdue', mail.outbox[0].body)
+
+    @override_settings(EMAIL_DISABLED=True)
+    def test_email_disabled(self):
+        call_command('send_reminders', stdout=StringIO())
+        self.assertEqual(notices.send_notices(notices.due_soon_notices(3), 'books_core/email/due_soon.txt', 'Due soon'),
+                         {'sent': 0, 'skipped': 6, 'failed': 0})
+        self.assertEqual(mail.outbox, [])
@@ -0,0 +1,98 @@
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from books_core import routers
+from books_core.middleware import ReplicaPinningMiddleware
+from books_core.models import Author, Book, VersionStamp
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], REPLICA_PIN_SECONDS=5)
+class ReplicaRouterTest(SimpleTestCase):
+
+    def setUp(self):
+        self.router = routers.ReplicaRouter()
+        # Чтения идут на реплики только внутри запроса
+        self.token = routers.begin_request()
+
+    def tearDown(self):
+        routers.end_request(self.token)
+
+    def read_from(self):
+        return self.router.db_for_read(Book)
+
+    def test_reads_go_to_replica(self):
+        self.assertEqual(self.read_from(), 'replica')
+        with override_settings(DATABASE_REPLICAS=[]):
+            self.assertEqual(self.read_from(), 'default')
+
+    def test_read_after_write_goes_to_primary(self):
+        self.assertEqual(self.router.db_for_write(Book), 'default')
+        self.assertEqual(self.read_from(), 'default')
+
+    def test_write_pin_ends_with_request(self):
+        token = routers.begin_request()
+        self.router.db_for_write(Book)
+        self.assertEqual(self.read_from(), 'default')
+        routers.end_request(token)
+        self.assertEqual(self.read_from(), 'replica')
+
+    def test_outside_requests_reads_use_primary(self):
+        routers.end_request(self.token)
+        try:
+            self.router.db_for_write(Book)
+            self.assertEqual(self.read_from(), 'default')
+        finally:
+            self.token = routers.begin_request()
+        self.assertEqual(self.read_from(), 'replica')
+
+    def test_only_catalog_models_use_replicas(self):
+        self.assertEqual(self.router.db_for_read(Session), 'default')
+        self.assertEqual(self.router.db_for_read(User), 'default')
+        self.assertEqual(self.router.db_for_read(Book.genre.through), 'replica')
+
+    def test_stamps_are_read_with_the_data(self):
+        # Версии с основной базы при данных с отстающей реплики сделали бы ETag новее страницы
+        with override_settings(DATABASE_REPLICAS=['replica', 'other']):
+            aliases = {self.router.db_for_read(model) for model in (VersionStamp, Book, Author) for _ in range(20)}
+            self.assertEqual(len(aliases), 1)
+            self.assertIn(aliases.pop(), ('replica', 'other'))
+            self.router.db_for_write(Book)
+            self.assertEqual(self.router.db_for_read(VersionStamp), 'default')
+
+    def test_use_primary(self):
+        with routers.use_primary():
+            self.assertEqual(self.read_from(), 'default')
+        self.assertEqual(self.read_from(), 'replica')
+
+    def test_replicas_are_not_migrated(self):
+        self.assertIs(self.router.allow_migrate('replica', 'books_core'), False)
+        self.assertIsNone(self.router.allow_migrate('default', 'books_core'))
+
+    def run_middleware(self, request):
+        seen = []
+
+        def view(request):
+            seen.append(self.read_from())
+            return HttpResponse()
+
+        response = ReplicaPinningMiddleware(view)(request)
+        return seen[0], response
+
+    def test_middleware_pins_unsafe_requests(self):
+        read_from, response = self.run_middleware(RequestFactory().post('/catalog/book/1/renew/'))
+        self.assertEqual(read_from, 'default')
+        self.assertEqual(response.cookies['pin_primary']['max-age'], 5)
+        # Пин снимается после запроса
+        self.assertEqual(self.read_from(), 'replica')
+
+    def test_middleware_pins_after_redirect(self):
+        read_from, response = self.run_middleware(RequestFactory().get('/catalog/borrowed/'))
+        self.assertEqual(read_from, 'replica')
+        self.assertNotIn('pin_primary', response.cookies)
+
+        request = RequestFactory().get('/catalog/borrowed/')
+        request.COOKIES['pin_primary'] = '1'
+        read_from, response = self.run_middleware(request)
+        self.assertEqual(read_from, 'default')
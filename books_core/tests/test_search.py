@@ -0,0 +1,68 @@
+from unittest import mock
+
+from django.test import TestCase
+from django.urls import reverse
+
+from books_core import search
+from books_core.models import Author, Book
+
+
+class BookSearchTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tolstoy = Author.objects.create(first_name='Leo', last_name='Tolstoy')
+        cls.war = Book.objects.create(title='War and Peace', summary='Napoleon invades Russia.', isbn='1',
+                                      author=cls.tolstoy)
+        Book.objects.create(title='Anna Karenina', summary='A story about war of feelings.', isbn='2',
+                            author=cls.tolstoy)
+        Book.objects.create(title='Dune <script>', summary='Desert planet.', isbn='3')
+
+    def test_fts_table_exists(self):
+        self.assertTrue(search.fts_available())
+
+    def test_title_matches_rank_first(self):
+        hits = search.search_books('war')
+        self.assertEqual([hit.book_id for hit in hits][0], self.war.pk)
+        self.assertEqual(len(hits), 2)
+        self.assertEqual(hits[0].title, '<mark>War</mark> and Peace')
+
+    def test_prefix_and_author(self):
+        self.assertEqual(len(search.search_books('tolst')), 2)
+        self.assertEqual(len(search.search_books('napoleon tolstoy')), 1)
+
+    def test_index_follows_changes(self):
+        self.tolstoy.last_name = 'Tolstoi'
+        self.tolstoy.save()
+        self.assertEqual(len(search.search_books('tolstoi')), 2)
+
+        self.war.title = 'Peace'
+        self.war.save()
+        self.assertEqual(len(search.search_books('war')), 1)
+
+        self.war.delete()
+        self.assertEqual(search.search_books('napoleon'), [])
+
+    def test_query_syntax_and_html_are_escaped(self):
+        self.assertEqual(search.search_books('"'), [])
+        hits = search.search_books('dune OR NEAR(')
+        self.assertEqual(hits, [])
+        self.assertEqual(search.search_books('dune')[0].title, '<mark>Dune</mark> &lt;script&gt;')
+
+    def test_fallback_without_fts(self):
+        with mock.patch('books_core.search.fts_available', return_value=False):
+            hits = search.search_books('war tolstoy')
+        self.assertEqual({hit.book_id for hit in hits}, {self.war.pk, self.war.pk + 1})
+        self.assertIn('<mark>War</mark>', hits[1].title)
+
+    def test_search_page_and_api(self):
+        resp = self.client.get(reverse('book-search'), {'q': 'peace'})
+        self.assertContains(resp, '<mark>Peace</mark>')
+
+        resp = self.client.get(reverse('book-search-api'), {'q': 'peace'})
+        self.assertEqual(resp.json()['results'][0]['id'], self.war.pk)
+
+    def test_page_out_of_range(self):
+        for url in (reverse('book-search'), reverse('book-search-api')):
+            self.assertEqual(self.client.get(url, {'q': 'war', 'page': '9' * 25}).status_code, 404)
+            self.assertEqual(self.client.get(url, {'q': 'war', 'page': '²'}).status_code, 200)
@@ -0,0 +1,185 @@
+import datetime
+import threading
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import DatabaseError
+from django.test import TestCase
+
+from books_core import loans, snapshot, versioning
+from books_core.models import Author, Book, BookInstance, Language
+
+
+class SnapshotTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(first_name='Leo', last_name='Tolstoy')
+        cls.language = Language.objects.create(name='Russian')
+        cls.book = Book.objects.create(title='War and Peace', summary='Summary', isbn='ABCDEFG',
+                                       author=cls.author, language=cls.language)
+        cls.anonymous = Book.objects.create(title='Anonymous', summary='Summary', isbn='ABCDEFG')
+        cls.copy = BookInstance.objects.create(book=cls.book, imprint='Imprint', status='a')
+        cls.reader = User.objects.create_user(username='reader', password='12345')
+
+    def setUp(self):
+        # Проверка версии не реже раза в секунду мешала бы видеть изменения внутри теста
+        patcher = mock.patch.object(snapshot, 'CHECK_INTERVAL', 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(snapshot.clear)
+
+    def test_entries(self):
+        current = snapshot.refresh()
+        self.assertIs(snapshot.current(), current)
+        entry = current.get(self.book.pk)
+        self.assertEqual((entry.id, entry.title, entry.author, entry.language),
+                         (self.book.pk, 'War and Peace', str(self.author), 'Russian'))
+        entry = current.get(self.anonymous.pk)
+        self.assertEqual((entry.author, entry.language), (None, None))
+        self.assertIsNone(current.get(self.anonymous.pk + 100))
+        self.assertIsNone(current.get(None))
+        self.assertIn(self.book.pk, current)
+        self.assertEqual(len(current), 2)
+
+    def test_entry_has_no_dict(self):
+        with self.assertRaises(AttributeError):
+            snapshot.refresh().get(self.book.pk).extra = 1
+
+    def test_not_built_by_callers(self):
+        with self.captureOnCommitCallbacks() as callbacks, self.assertNumQueries(0):
+            self.assertIsNone(snapshot.current())
+        # Строится в фоновом потоке после фиксации транзакции
+        self.assertEqual(callbacks, [snapshot._start_refresh])
+
+    def test_refreshed_in_background(self):
+        release = threading.Event()
+        with mock.patch('books_core.snapshot.refresh', side_effect=release.wait) as refresh:
+            snapshot._start_refresh()
+            # Пока поток строит снимок, второй не запускается
+            snapshot._start_refresh()
+            release.set()
+            for thread in threading.enumerate():
+                if thread.name == 'catalog-snapshot':
+                    thread.join()
+        refresh.assert_called_once_with()
+        self.assertFalse(snapshot._refreshing)
+
+    def test_failed_refresh_is_logged(self):
+        with mock.patch('books_core.snapshot.build', side_effect=DatabaseError), \
+                self.assertLogs('books_core.snapshot', 'ERROR'):
+            snapshot._refresh_in_background()
+        self.assertFalse(snapshot._refreshing)
+        self.assertIsNone(snapshot.current())
+
+    def test_cached_between_calls(self):
+        current = snapshot.refresh()
+        # Версия сверяется одним запросом, и не чаще раза в CHECK_INTERVAL секунд
+        with self.captureOnCommitCallbacks() as callbacks, self.assertNumQueries(1):
+            self.assertIs(snapshot.current(), current)
+        with mock.patch.object(snapshot, 'CHECK_INTERVAL', 60), self.assertNumQueries(0):
+            self.assertIs(snapshot.current(), current)
+        self.assertEqual(callbacks, [])
+
+    def updated(self):
+        """
+        snapshot.refresh() that must not rebuild the whole snapshot.
+        """
+        with mock.patch('books_core.snapshot.build', side_effect=AssertionError('full build')):
+            return snapshot.refresh()
+
+    def test_stale_snapshot_is_served_until_refreshed(self):
+        current = snapshot.refresh()
+        self.book.title = 'Anna Karenina'
+        self.book.save()
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.assertIs(snapshot.current(), current)
+        self.assertEqual(callbacks, [snapshot._start_refresh])
+        updated = self.updated()
+        self.assertEqual(updated.title(self.book.pk), 'Anna Karenina')
+        # Обслуживаемый снимок не меняется, обновление делается на копии
+        self.assertEqual(current.title(self.book.pk), 'War and Peace')
+
+    def test_stale_snapshot_is_not_used_for_pages(self):
+        snapshot.refresh()
+        self.book.title = 'Anna Karenina'
+        self.book.save()
+        version = versioning.get_version(versioning.TITLES)
+        with self.captureOnCommitCallbacks() as callbacks, self.assertNumQueries(1):
+            entry = snapshot.entries([self.book.pk], version)[self.book.pk]
+        self.assertEqual(entry.title, 'Anna Karenina')
+        self.assertIn(snapshot._start_refresh, callbacks)
+        self.updated()
+        with self.assertNumQueries(0):
+            self.assertEqual(snapshot.entries([self.book.pk], version)[self.book.pk].title, 'Anna Karenina')
+
+    def test_new_and_deleted_books(self):
+        snapshot.refresh()
+        book = Book.objects.create(title='Resurrection', summary='Summary', isbn='ABCDEFG', author=self.author)
+        self.assertIsNone(snapshot.current().get(book.pk))
+        # Книга, которой ещё нет в снимке, читается из базы
+        self.assertEqual(snapshot.entries([book.pk])[book.pk].author, 'Tolstoy Leo')
+        self.assertEqual(self.updated().get(book.pk).author, 'Tolstoy Leo')
+        self.anonymous.delete()
+        updated = self.updated()
+        self.assertNotIn(self.anonymous.pk, updated)
+        self.assertEqual(list(updated.ids), [self.book.pk, book.pk])
+
+    def test_author_and_language_changes(self):
+        current = snapshot.refresh()
+        self.author.first_name = 'Lev'
+        self.author.save()
+        self.assertNotEqual(versioning.get_version(versioning.TITLES), current.version)
+        self.assertEqual(self.updated().get(self.book.pk).author, 'Tolstoy Lev')
+        self.language.name = 'Русский'
+        self.language.save()
+        self.assertEqual(self.updated().get(self.book.pk).language, 'Русский')
+
+    def test_rebuilt_after_mass_changes(self):
+        snapshot.refresh()
+        with mock.patch.object(snapshot, 'MAX_CHANGES', 1):
+            Book.objects.create(title='Resurrection', summary='Summary', isbn='ABCDEFG', author=self.author)
+            self.book.title = 'Anna Karenina'
+            self.book.save()
+            with mock.patch('books_core.snapshot.build', wraps=snapshot.build) as build:
+                self.assertEqual(snapshot.refresh().title(self.book.pk), 'Anna Karenina')
+        build.assert_called_once()
+
+    def test_rebuilt_after_language_is_deleted(self):
+        snapshot.refresh()
+        self.language.delete()
+        with mock.patch('books_core.snapshot.build', wraps=snapshot.build) as build:
+            self.assertIsNone(snapshot.refresh().get(self.book.pk).language)
+        build.assert_called_once()
+
+    def test_loans_do_not_rebuild(self):
+        current = snapshot.refresh()
+        loans.checkout(self.copy.pk, self.reader, datetime.date.today() + datetime.timedelta(weeks=2))
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.assertIs(snapshot.current(), current)
+        self.assertEqual(callbacks, [])
+
+    def test_book_instance_str(self):
+        copy = BookInstance.objects.get(pk=self.copy.pk)
+        # Без снимка название читается из базы, снимок при этом не строится
+        with self.captureOnCommitCallbacks(), self.assertNumQueries(1):
+            self.assertEqual(str(copy), f'{self.copy.pk} War and Peace')
+        self.assertIsNone(snapshot._snapshot)
+
+        snapshot.refresh()
+        copy = BookInstance.objects.get(pk=self.copy.pk)
+        with mock.patch.object(snapshot, 'CHECK_INTERVAL', 60), self.assertNumQueries(0):
+            self.assertEqual(str(copy), f'{self.copy.pk} War and Peace')
+
+    def test_attach(self):
+        copies = list(BookInstance.objects.all())
+        with self.assertNumQueries(1):
+            snapshot.attach(copies)
+        self.assertEqual(copies[0].book_entry.title, 'War and Peace')
+        self.assertEqual(copies[0].book_entry.author, 'Tolstoy Leo')
+
+        snapshot.refresh()
+        copies = list(BookInstance.objects.all())
+        with mock.patch.object(snapshot, 'CHECK_INTERVAL', 60), self.assertNumQueries(0):
+            snapshot.attach(copies)
+        self.assertEqual(copies[0].book_entry.title, 'War and Peace')
@@ -0,0 +1,120 @@
+import gzip
+import os
+import shutil
+import tempfile
+
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from books_core import staticfiles
+from books_core.middleware import StaticFilesMiddleware, accepted_encodings
+
+
+class CollectStaticTest(SimpleTestCase):
+    """
+    collectstatic with CompressedManifestStaticFilesStorage and serving the result with StaticFilesMiddleware.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.root = tempfile.mkdtemp()
+        cls.settings = override_settings(
+            STATIC_ROOT=cls.root, STATICFILES_STORAGE='books_core.staticfiles.CompressedManifestStaticFilesStorage',
+        )
+        cls.settings.enable()
+        call_command('collectstatic', interactive=False, verbosity=0)
+        from django.contrib.staticfiles.storage import staticfiles_storage
+        cls.css = staticfiles_storage.stored_name('vendor/bootstrap/css/bootstrap.min.css')
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings.disable()
+        shutil.rmtree(cls.root)
+        super().tearDownClass()
+
+    def get(self, path, **headers):
+        middleware = StaticFilesMiddleware(lambda request: HttpResponse('view', status=404))
+        return middleware(RequestFactory().get(path, **headers))
+
+    def test_hashed_and_compressed(self):
+        self.assertRegex(self.css, r'^vendor/bootstrap/css/bootstrap\.min\.[0-9a-f]{12}\.css$')
+        path = os.path.join(self.root, self.css)
+        with open(path, 'rb') as original, gzip.open(path + '.gz') as compressed:
+            self.assertEqual(compressed.read(), original.read())
+        # Ссылки на шрифты в CSS заменены хэшированными именами
+        with open(path) as file:
+            self.assertRegex(file.read(), r'glyphicons-halflings-regular\.[0-9a-f]{12}\.woff2')
+
+    def test_already_compressed_formats_are_skipped(self):
+        fonts = os.listdir(os.path.join(self.root, 'vendor/bootstrap/fonts'))
+        self.assertFalse([name for name in fonts if name.endswith(('.woff.gz', '.woff2.gz'))])
+
+    def test_serves_hashed_file_forever(self):
+        resp = self.get(f'/static/{self.css}', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp['Content-Encoding'], 'gzip')
+        self.assertEqual(resp['Content-Type'], 'text/css')
+        self.assertIn('immutable', resp['Cache-Control'])
+        self.assertEqual(resp['Vary'], 'Accept-Encoding')
+        self.assertNotIn('Content-Disposition', resp)
+        body = b''.join(resp.streaming_content)
+        self.assertEqual(len(body), int(resp['Content-Length']))
+        self.assertTrue(gzip.decompress(body).startswith(b'/*!'))
+
+    def test_identity_and_short_cache_for_original_names(self):
+        resp = self.get('/static/vendor/bootstrap/css/bootstrap.min.css', HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertNotIn('Content-Encoding', resp)
+        self.assertEqual(resp['Cache-Control'], 'public, max-age=60')
+        self.assertTrue(b''.join(resp.streaming_content).startswith(b'/*!'))
+
+    def test_not_modified(self):
+        resp = self.get(f'/static/{self.css}')
+        self.assertEqual(self.get(f'/static/{self.css}', HTTP_IF_NONE_MATCH=resp['ETag']).status_code, 304)
+
+    def test_etag_per_encoding(self):
+        compressed = self.get(f'/static/{self.css}', HTTP_ACCEPT_ENCODING='gzip')
+        identity = self.get(f'/static/{self.css}')
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertNotEqual(compressed['ETag'], identity['ETag'])
+        # ETag сжатого варианта не подтверждает несжатый, и наоборот
+        resp = self.get(f'/static/{self.css}', HTTP_IF_NONE_MATCH=compressed['ETag'])
+        self.assertEqual(resp.status_code, 200)
+        resp = self.get(f'/static/{self.css}', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=identity['ETag'])
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp['Content-Encoding'], 'gzip')
+        resp = self.get(f'/static/{self.css}', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=compressed['ETag'])
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp['ETag'], compressed['ETag'])
+
+    def test_unknown_file_goes_to_the_view(self):
+        self.assertEqual(self.get('/static/missing.css').content, b'view')
+        self.assertEqual(self.get('/catalog/').content, b'view')
+
+
+class AcceptEncodingTest(SimpleTestCase):
+
+    def test_accepted_encodings(self):
+        self.assertEqual(accepted_encodings('gzip, deflate, br'), {'gzip', 'deflate', 'br'})
+        self.assertEqual(accepted_encodings('br;q=0, gzip;q=0.5'), {'gzip'})
+        self.assertEqual(accepted_encodings(''), set())
+
+
+class CompressFileTest(SimpleTestCase):
+
+    def test_small_files_are_not_compressed(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'small.css')
+            with open(path, 'w') as file:
+                file.write('body{}')
+            self.assertEqual(staticfiles.compress_file(path), [])
+
+
+class NoExternalAssetsTest(TestCase):
+
+    def test_pages_use_vendored_assets(self):
+        resp = self.client.get(reverse('authors'))
+        self.assertContains(resp, '/static/vendor/bootstrap/css/bootstrap.min.css')
+        self.assertNotContains(resp, 'https://')
@@ -0,0 +1,122 @@
+import html
+import importlib.util
+import re
+import unittest
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.template import engines
+from django.template.loaders.cached import Loader as CachedLoader
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from books_core import templating, views
+from books_core.management.commands import bench_templates
+from books_core.models import Author, Book, Language
+from books_core.tests.utils import instrument_jinja2
+
+
+def _django_engine():
+    return next(engine for engine in engines.all() if engine.name == 'profiling')
+
+
+class TemplateConfigTest(TestCase):
+
+    def test_cached_loader(self):
+        loaders = _django_engine().engine.template_loaders
+        self.assertIsInstance(loaders[0], CachedLoader)
+
+    def test_precompile(self):
+        # Каждый движок загружает те шаблоны, которые у него есть
+        self.assertGreaterEqual(templating.precompile(), len(templating.HOT_TEMPLATES))
+        cached = _django_engine().engine.template_loaders[0].get_template_cache
+        self.assertIn('books_core/book_list.html', cached)
+
+    def test_sidebar_urls(self):
+        User.objects.create_user(username='reader', password='12345')
+        self.client.login(username='reader', password='12345')
+        resp = self.client.get(reverse('books'))
+        self.assertEqual(resp.context['nav']['my_borrowed'], reverse('my-borrowed'))
+        self.assertContains(resp, f'<a href="{reverse("my-borrowed")}">My Borrowed</a>', html=True)
+        self.assertContains(resp, f'<a href="{reverse("logout")}?next={reverse("books")}">Logout</a>', html=True)
+
+
+def _normalize(content):
+    return re.sub(r'\s+', ' ', html.unescape(content)).strip()
+
+
+@unittest.skipUnless(importlib.util.find_spec('jinja2'), 'jinja2 is not installed')
+class Jinja2TemplatesTest(TestCase):
+    """
+    Templates of books_core/jinja2/ give the same page as the Django templates.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('librarian', password='12345')
+        author = Author.objects.create(first_name='Leo', last_name='Tolstoy', date_of_birth='1828-09-09')
+        language = Language.objects.create(name='Russian')
+        for num in range(3):
+            Book.objects.create(title=f'Book <{num}>', summary='Summary', isbn='ABCDEFG', author=author,
+                                language=language)
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        patcher = instrument_jinja2()
+        patcher.start()
+        cls.addClassCleanup(patcher.stop)
+
+    def setUp(self):
+        cache.clear()
+
+    def assertSameOutput(self, template_name, view_class, path, **kwargs):
+        engines = bench_templates.template_engines()
+        request = RequestFactory().get(path)
+        request.user = self.user
+        context = bench_templates._context(view_class, request, **kwargs)
+        self.assertEqual(
+            _normalize(engines['jinja2'].get_template(template_name).render(context, request)),
+            _normalize(engines['django-cached'].get_template(template_name).render(context, request)),
+        )
+
+    def test_book_list(self):
+        self.assertSameOutput('books_core/book_list.html', views.BookListView, reverse('books'))
+
+    def test_book_detail(self):
+        book = Book.objects.first()
+        self.assertSameOutput('books_core/book_detail.html', views.BookDetailView,
+                              reverse('book-detail', args=[book.pk]), pk=book.pk)
+
+    def test_author_list(self):
+        self.assertSameOutput('books_core/author_list.html', views.AuthorListView, reverse('authors'))
+
+    def test_author_detail(self):
+        author = Author.objects.first()
+        self.assertSameOutput('books_core/author_detail.html', views.AuthorDetailView,
+                              reverse('author-detail', args=[author.pk]), pk=author.pk)
+
+    def test_page_context(self):
+        from books_core.jinja import TimedJinja2Template
+
+        with override_settings(TEMPLATES=[settings.JINJA2_BACKEND, *settings.TEMPLATES]):
+            self.client.login(username='librarian', password='12345')
+            resp = self.client.get(reverse('books'))
+        self.assertTemplateUsed(resp, 'books_core/book_list.html')
+        self.assertIsInstance(resp.templates[0], TimedJinja2Template)
+        self.assertEqual(len(resp.context['book_list']), 3)
+
+
+class BenchTemplatesCommandTest(TestCase):
+
+    def test_command(self):
+        User.objects.create_superuser('librarian', password='12345')
+        Book.objects.create(title='Book', summary='Summary', isbn='ABCDEFG',
+                            author=Author.objects.create(first_name='Leo', last_name='Tolstoy'))
+        out = StringIO()
+        call_command('bench_templates', repeat=2, stdout=out)
+        self.assertIn('books_core/book_detail.html', out.getvalue())
+        self.assertIn('django-uncached', out.getvalue())
@@ -0,0 +1,49 @@
+from django.db import transaction
+from django.test import RequestFactory, TestCase
+
+from books_core import versioning
+from books_core.models import Author, VersionStamp
+
+
+class VersioningTest(TestCase):
+
+    def test_bump(self):
+        versioning.bump('test', 'other')
+        versioning.bump('test')
+        stamps = VersionStamp.objects.filter(namespace__in=['test', 'other'])
+        self.assertEqual({stamp.namespace: stamp.version for stamp in stamps}, {'test': 2, 'other': 1})
+
+    def test_many_namespaces(self):
+        namespaces = [versioning.book_namespace(pk) for pk in range(versioning.BUMP_BATCH_SIZE * 2 + 1)]
+        with self.assertNumQueries(3):
+            versioning.bump(*namespaces)
+        self.assertEqual(VersionStamp.objects.filter(namespace__in=namespaces, version=1).count(), len(namespaces))
+
+    def test_rolled_back_bump_is_not_seen(self):
+        before = versioning.get_version(versioning.CATALOG)
+        try:
+            with transaction.atomic():
+                Author.objects.create(first_name='Leo', last_name='Tolstoy')
+                self.assertNotEqual(versioning.get_version(versioning.CATALOG), before)
+                raise ValueError
+        except ValueError:
+            pass
+        self.assertEqual(versioning.get_version(versioning.CATALOG), before)
+
+    def test_stamps_are_read_with_one_query(self):
+        versioning.bump(versioning.author_namespace(1))
+        with self.assertNumQueries(1):
+            stamps = versioning.Stamps(versioning.CATALOG, versioning.author_namespace(1), 'never-changed')
+            key = stamps.key()
+        self.assertTrue(key.endswith(':0-None'))
+        self.assertEqual(stamps.key('never-changed'), '0-None')
+        self.assertIsNotNone(stamps.last_modified())
+        self.assertIsNone(versioning.Stamps('never-changed').last_modified())
+
+    def test_etag_follows_changes(self):
+        request = RequestFactory().get('/catalog/books/')
+        etag = versioning.etag_for(request)
+        self.assertEqual(versioning.etag_for(request), etag)
+        self.assertNotEqual(versioning.etag_for(request, vary_on=[1]), etag)
+        versioning.bump(versioning.CATALOG)
+        self.assertNotEqual(versioning.etag_for(request), etag)
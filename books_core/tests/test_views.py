@@ -1,11 +1,14 @@
 import datetime
 
-from django.contrib.auth.models import User
+from django.contrib.auth.models import Permission, User
+from django.core.cache import cache
 from django.test import TestCase
 from django.urls import reverse
 from django.utils import timezone
 
+from books_core import snapshot
 from books_core.models import Author, Genre, Language, Book, BookInstance
+from books_core.tests.utils import QueryBudgetMixin
 
 
 class AuthorListViewTest(TestCase):
@@ -153,3 +156,138 @@ class LoanedBookInstancesByUserListViewTest(TestCase):
                 last_date = copy.due_back
             else:
                 self.assertTrue(last_date <= copy.due_back)
+
+
+class CatalogQueryBudgetTest(QueryBudgetMixin, TestCase):
+    """
+    Число запросов каждой страницы не должно зависеть от размера каталога
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='reader', password='12345')
+        cls.librarian = User.objects.create_user(username='librarian', password='12345')
+        cls.librarian.user_permissions.add(Permission.objects.get(codename='staff_perms'))
+
+        cls.author = Author.objects.create(first_name='John', last_name='Smith')
+        language = Language.objects.create(name='English')
+        genres = [Genre.objects.create(name=f'Genre {num}') for num in range(3)]
+        for book_num in range(5):
+            book = Book.objects.create(title=f'Book {book_num}', summary='Summary', isbn='ABCDEFG',
+                                       author=cls.author, language=language)
+            book.genre.set(genres)
+            for copy_num in range(3):
+                BookInstance.objects.create(book=book, imprint='Imprint', status='o', borrower=cls.user,
+                                            due_back=datetime.date.today() + datetime.timedelta(days=copy_num))
+        cls.book = book
+
+    def test_book_list(self):
+        self.client.login(username='reader', password='12345')
+        # Счётчики фильтров (books_core.facets) считаются при первом запросе и затем берутся из кэша
+        self.assertQueryBudget(15, reverse('books'))
+        self.assertQueryBudget(8, reverse('books'))
+
+    def test_book_detail(self):
+        self.assertQueryBudget(5, reverse('book-detail', args=[self.book.pk]))
+
+    def test_author_detail(self):
+        self.assertQueryBudget(3, reverse('author-detail', args=[self.author.pk]))
+
+    def test_loaned_books_by_user(self):
+        self.client.login(username='reader', password='12345')
+        # Без снимка каталога (books_core.snapshot) названия страницы читаются одним запросом
+        resp = self.assertQueryBudget(8, reverse('my-borrowed'))
+        self.assertEqual(len(resp.context['bookinstance_list']), 10)
+
+        snapshot.refresh()
+        self.addCleanup(snapshot.clear)
+        resp = self.assertQueryBudget(7, reverse('my-borrowed'))
+        copy = resp.context['bookinstance_list'][0]
+        self.assertEqual(copy.book_entry.title, Book.objects.get(pk=copy.book_id).title)
+
+    def test_borrowed_books_staff(self):
+        self.client.login(username='librarian', password='12345')
+        resp = self.assertQueryBudget(8, reverse('all-borrowed'))
+        self.assertEqual(len(resp.context['bookinstance_list_staff']), 15)
+
+
+class ConditionalPageTest(TestCase):
+    """
+    ETag страниц каталога строится из версий данных (books_core.versioning), 304 отдаётся без запросов к каталогу
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='reader', password='12345')
+        cls.other = User.objects.create_user(username='other', password='12345')
+        cls.author = Author.objects.create(first_name='John', last_name='Smith')
+        cls.book = Book.objects.create(title='Book', summary='Summary', isbn='ABCDEFG', author=cls.author)
+        cls.other_book = Book.objects.create(title='Other', summary='Summary', isbn='ABCDEFH', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client.login(username='reader', password='12345')
+
+    def assertNotModified(self, url, etag):
+        # Только сессия, пользователь и версии данных, без запросов к каталогу
+        with self.assertNumQueries(3):
+            resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp['ETag'], etag)
+        self.assertEqual(resp.content, b'')
+
+    def test_read_views_answer_304(self):
+        for url in (reverse('books'), reverse('authors'), reverse('book-detail', args=[self.book.pk]),
+                    reverse('author-detail', args=[self.author.pk]), reverse('my-borrowed'),
+                    reverse('book-search') + '?q=book', reverse('book-search-api') + '?q=book'):
+            with self.subTest(url=url):
+                resp = self.client.get(url)
+                self.assertEqual(resp.status_code, 200)
+                self.assertIn('Last-Modified', resp)
+                self.assertIn('Cookie', resp['Vary'])
+                self.assertNotModified(url, resp['ETag'])
+
+    def test_write_changes_etag(self):
+        url = reverse('books')
+        etag = self.client.get(url)['ETag']
+        Book.objects.create(title='New', summary='Summary', isbn='ABCDEFI', author=self.author)
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertContains(resp, 'New')
+
+    def test_borrowed_page_does_not_use_stale_snapshot(self):
+        self.addCleanup(snapshot.clear)
+        BookInstance.objects.create(book=self.book, imprint='Imprint', status='o', borrower=self.user,
+                                    due_back=datetime.date.today())
+        snapshot.refresh()
+        url = reverse('my-borrowed')
+        etag = self.client.get(url)['ETag']
+        self.book.title = 'Renamed'
+        self.book.save()
+        # Снимок ещё не обновлён, а страница с новым ETag уже показывает новое название
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertContains(resp, 'Renamed')
+
+    def test_detail_etag_is_per_object(self):
+        url = reverse('book-detail', args=[self.book.pk])
+        etag = self.client.get(url)['ETag']
+        BookInstance.objects.create(book=self.other_book, imprint='Imprint', status='a')
+        self.assertNotModified(url, etag)
+        BookInstance.objects.create(book=self.book, imprint='Imprint', status='a')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_etag_depends_on_user(self):
+        url = reverse('authors')
+        etag = self.client.get(url)['ETag']
+        self.client.login(username='other', password='12345')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_login_is_checked_first(self):
+        url = reverse('books')
+        etag = self.client.get(url)['ETag']
+        self.client.logout()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 302)
+
+    def test_index_is_not_conditional(self):
+        self.assertNotIn('ETag', self.client.get(reverse('index')))
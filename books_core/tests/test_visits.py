@@ -0,0 +1,113 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from books_core import auth
+
+
+@override_settings(VISITS_FLUSH_EVERY=3, VISITS_FLUSH_INTERVAL=300)
+class VisitCounterTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='12345')
+        self.client.login(username='testuser', password='12345')
+
+    def test_counts_every_visit(self):
+        seen = [self.client.get(reverse('index')).context['num_visits'] for _ in range(8)]
+        self.assertEqual(seen, list(range(8)))
+
+    def test_session_is_written_in_batches(self):
+        self.client.get(reverse('index'))
+        writes = []
+        for _ in range(6):
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(reverse('index'))
+            writes.append(any('django_session' in query['sql'] and query['sql'].startswith('UPDATE')
+                              for query in queries.captured_queries))
+        self.assertEqual(writes, [False, False, True, False, False, True])
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+    def test_signed_cookie_sessions(self):
+        self.client.login(username='testuser', password='12345')
+        seen = [self.client.get(reverse('index')).context['num_visits'] for _ in range(5)]
+        self.assertEqual(seen, list(range(5)))
+
+
+class CachedUserTest(TestCase):
+    """
+    Пользователи кэшируются только в общем для процессов кэше (здесь файловом).
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cache_dir = tempfile.mkdtemp()
+        cls.shared_cache = override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': cls.cache_dir,
+        }})
+        cls.shared_cache.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.shared_cache.disable()
+        shutil.rmtree(cls.cache_dir)
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='12345')
+        self.client.login(username='testuser', password='12345')
+
+    def user_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('authors'))
+        return [query for query in queries.captured_queries if 'FROM "auth_user"' in query['sql']]
+
+    def test_user_is_read_from_cache(self):
+        self.user_queries()
+        self.assertEqual(self.user_queries(), [])
+
+    def test_cached_user_follows_changes(self):
+        self.user_queries()
+        self.user.first_name = 'Changed'
+        self.user.save()
+        self.assertIsNone(cache.get(auth.user_key(self.user.pk)))
+        self.assertEqual(len(self.user_queries()), 1)
+
+        self.user.is_active = False
+        self.user.save()
+        resp = self.client.get(reverse('index'))
+        self.assertEqual(resp.status_code, 302)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_process_local_cache_is_not_used(self):
+        # update() не отправляет сигналов, как и запись пользователя в другом процессе
+        self.assertFalse(auth.cache_is_shared())
+        self.assertEqual(len(self.user_queries()), 1)
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.client.get(reverse('index')).status_code, 302)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_password_change_ends_session(self):
+        self.assertEqual(self.client.get(reverse('index')).status_code, 200)
+        User.objects.filter(pk=self.user.pk).update(password=make_password('new password'))
+        self.assertEqual(self.client.get(reverse('index')).status_code, 302)
+
+
+class BenchSessionsCommandTest(TestCase):
+
+    def test_command_rolls_back(self):
+        out = StringIO()
+        call_command('bench_sessions', requests=2, strategy=['cached_db'], stdout=out)
+        self.assertIn('cached_db', out.getvalue())
+        self.assertFalse(User.objects.exists())
@@ -0,0 +1,44 @@
+from unittest import mock
+
+from django.db import connections
+from django.test.signals import template_rendered
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """
+    Mixin for TestCase classes that checks how many SQL queries a page needs.
+    """
+
+    def assertQueryBudget(self, budget, url, using='default', **extra):
+        """
+        Requests the url with the test client and fails if the view executes more than `budget` queries.
+        Returns the response, so the test can check it further.
+        """
+        with CaptureQueriesContext(connections[using]) as context:
+            resp = self.client.get(url, **extra)
+
+        executed = len(context.captured_queries)
+        if executed > budget:
+            queries = '\n'.join(
+                f'{num}. {query["sql"]}' for num, query in enumerate(context.captured_queries, start=1)
+            )
+            self.fail(f'{url} executed {executed} queries, budget is {budget}:\n{queries}')
+        return resp
+
+
+def instrument_jinja2():
+    """
+    Patcher that makes the Jinja2 templates send template_rendered, as setup_test_environment() does for the
+    Django ones, so the test client collects response.context and response.templates of Jinja2 pages.
+    """
+    from books_core.jinja import TimedJinja2Template
+
+    render = TimedJinja2Template.render
+
+    def instrumented_render(self, context=None, request=None):
+        context = {} if context is None else context
+        template_rendered.send(sender=self, template=self, context=context)
+        return render(self, context, request)
+
+    return mock.patch.object(TimedJinja2Template, 'render', instrumented_render)
@@ -1,15 +1,39 @@
-from django.urls import path
+from django.conf import settings
+from django.urls import include, path
+from rest_framework.routers import DefaultRouter
 
-from . import views
+from . import api, async_views, views
 
-urlpatterns = [
-    path('', views.index, name='index'),
-    path('books/', views.BookListView.as_view(), name='books'),
-    path('book/<int:pk>/', views.BookDetailView.as_view(), name='book-detail'),
-    path('authors/', views.AuthorListView.as_view(), name='authors'),
-    path('author/<int:pk>/', views.AuthorDetailView.as_view(), name='author-detail'),
-    path('mybooks/', views.LoanedBooksByUserListView.as_view(), name='my-borrowed'),
+router = DefaultRouter()
+router.register('books', api.BookViewSet, basename='api-book')
+router.register('authors', api.AuthorViewSet, basename='api-author')
+router.register('copies', api.BookInstanceViewSet, basename='api-copy')
+
+if settings.ASYNC_CATALOG_VIEWS:
+    read_urlpatterns = [
+        path('', async_views.index, name='index'),
+        path('books/', async_views.book_list, name='books'),
+        path('book/<int:pk>/', async_views.book_detail, name='book-detail'),
+        path('authors/', async_views.author_list, name='authors'),
+        path('author/<int:pk>/', async_views.author_detail, name='author-detail'),
+        path('mybooks/', async_views.loaned_books_by_user, name='my-borrowed'),
+    ]
+else:
+    read_urlpatterns = [
+        path('', views.index, name='index'),
+        path('books/', views.BookListView.as_view(), name='books'),
+        path('book/<int:pk>/', views.BookDetailView.as_view(), name='book-detail'),
+        path('authors/', views.AuthorListView.as_view(), name='authors'),
+        path('author/<int:pk>/', views.AuthorDetailView.as_view(), name='author-detail'),
+        path('mybooks/', views.LoanedBooksByUserListView.as_view(), name='my-borrowed'),
+    ]
+
+urlpatterns = read_urlpatterns + [
+    path('search/', views.book_search, name='book-search'),
+    path('api/search/', views.book_search_api, name='book-search-api'),
     path('borrowed/', views.BorrowedBookStaffList.as_view(), name='all-borrowed'),
+    path('profiling/', views.profiling_stats, name='profiling-stats'),
+    path('export/<slug:name>/', views.export, name='export'),
     path('book/<pk>/renew/', views.renew_book_librarian, name='renew-book-librarian'),
     path('author/create/', views.AuthorCreate.as_view(), name='author_create'),
     path('author/<int:pk>/update/', views.AuthorUpdate.as_view(), name='author_update'),
@@ -17,4 +41,5 @@ urlpatterns = [
     path('book/create/', views.BookCreate.as_view(), name='book_create'),
     path('book/<int:pk>/update/', views.BookUpdate.as_view(), name='book_update'),
     path('book/<int:pk>/delete/', views.BookDelete.as_view(), name='book_delete'),
+    path('api/', include(router.urls)),
 ]
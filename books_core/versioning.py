@@ -0,0 +1,120 @@
+"""
+Version stamps of the catalog data.
+
+A stamp is a counter and the time of the last change of a namespace, stored in the VersionStamp table.
+books_core.signals bumps it on every write to the catalog models, in the transaction of the write, so all
+processes see the same stamps and a stamp is never newer than the committed data. A response built from the
+data can be identified by the stamps it depends on (ETag, Last-Modified, keys of cached fragments and counts)
+with one small query instead of the queries that build it.
+"""
+import datetime
+import hashlib
+import time
+
+from django.db import connections, router
+
+from books_core import models
+
+CATALOG = 'catalog'
+# Названия жанров и языков, которые показываются на страницах книг
+TAXONOMY = 'taxonomy'
+# Названия книг, имена авторов и языки книг (books_core.snapshot)
+TITLES = 'titles'
+# Жанры книг, для счётчиков фильтров списка книг (books_core.facets)
+FACETS = 'facets'
+
+# Не больше 999 параметров в одном запросе (ограничение старых версий SQLite)
+BUMP_BATCH_SIZE = 300
+
+
+def book_namespace(pk):
+    return f'book:{pk}'
+
+
+def author_namespace(pk):
+    return f'author:{pk}'
+
+
+class Stamps:
+    """
+    Stamps of several namespaces read with one query. A namespace that has never changed has no row
+    (version 0, no time).
+    """
+
+    def __init__(self, *namespaces):
+        self.namespaces = namespaces or (CATALOG,)
+        rows = models.VersionStamp.objects.filter(namespace__in=set(self.namespaces))
+        self.stamps = {namespace: (version, changed)
+                       for namespace, version, changed in rows.values_list('namespace', 'version', 'changed')}
+
+    def key(self, *namespaces):
+        """
+        The stamps of the namespaces (all read ones by default) joined into one string.
+        """
+        stamps = [self.stamps.get(namespace, (0, None)) for namespace in namespaces or self.namespaces]
+        return ':'.join(f'{version}-{changed!r}' for version, changed in stamps)
+
+    def changed(self, namespace):
+        """
+        Time of the last change of the namespace, None if it has never changed.
+        """
+        return self.stamps.get(namespace, (0, None))[1]
+
+    def etag(self, request, vary_on=()):
+        """
+        ETag for a response that depends on the namespaces and on the requested URL and representation.
+        vary_on adds other values the response depends on (the user of an HTML page, the date).
+        """
+        source = f'{self.key()}:{request.get_full_path()}:{request.META.get("HTTP_ACCEPT", "")}'
+        if vary_on:
+            source += ':' + ':'.join(map(str, vary_on))
+        return hashlib.md5(source.encode()).hexdigest()
+
+    def last_modified(self):
+        """
+        Time of the last change of the namespaces, None if none of them has changed.
+        """
+        times = [changed for version, changed in self.stamps.values()]
+        if not times:
+            return None
+        return datetime.datetime.fromtimestamp(max(times), tz=datetime.timezone.utc)
+
+
+def get_version(namespace=CATALOG):
+    return Stamps(namespace).key()
+
+
+def get_versions(*namespaces):
+    """
+    Stamps of several namespaces joined into one string (one query).
+    """
+    return Stamps(*namespaces).key()
+
+
+def bump(*namespaces):
+    """
+    Marks the namespaces as changed.
+    """
+    # Строки блокируются в одном порядке во всех транзакциях, без взаимных блокировок параллельных записей
+    namespaces = sorted(set(namespaces or (CATALOG,)))
+    connection = connections[router.db_for_write(models.VersionStamp)]
+    table = connection.ops.quote_name(models.VersionStamp._meta.db_table)
+    now = time.time()
+    with connection.cursor() as cursor:
+        for start in range(0, len(namespaces), BUMP_BATCH_SIZE):
+            batch = namespaces[start:start + BUMP_BATCH_SIZE]
+            values = ', '.join(['(%s, 1, %s)'] * len(batch))
+            # ON CONFLICT есть в SQLite 3.24+ и PostgreSQL 9.5+, bulk_create(update_conflicts) - с Django 4.1
+            cursor.execute(
+                f'INSERT INTO {table} (namespace, version, changed) VALUES {values} '
+                f'ON CONFLICT (namespace) DO UPDATE SET version = {table}.version + 1, changed = excluded.changed',
+                [param for namespace in batch for param in (namespace, now)],
+            )
+
+
+def etag_for(request, *namespaces, vary_on=()):
+    return Stamps(*namespaces).etag(request, vary_on)
+
+
+def last_modified_for(*namespaces):
+    return Stamps(*namespaces).last_modified()
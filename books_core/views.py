@@ -1,16 +1,102 @@
 import datetime
+import os
+import re
+from functools import wraps
 
 from django.contrib.auth.decorators import login_required, permission_required
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
-from django.http import HttpResponseRedirect
+from django.http import Http404, HttpResponseRedirect, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404
 from django.urls import reverse, reverse_lazy
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
 from django.views import generic
 from django.views.generic import CreateView, UpdateView, DeleteView
 
 # from books_core.forms import RenewBookModelForm
+from books_core import counters, exports, facets, loans, profiling, search, snapshot, versioning, visits
 from books_core.forms import RenewBookForm
 from books_core.models import Book, BookInstance, Author
+from books_core.pagination import KeysetPaginationMixin
+
+
+def page_validators(request, stamps, daily=False):
+    """
+    (ETag, Last-Modified timestamp) of an HTML page built from the version stamps it depends on
+    (books_core.versioning.Stamps). Pages show the user's name and the staff menu, so the user is a part of
+    the ETag; `daily` pages also change at midnight (overdue marks).
+    """
+    vary_on = [request.user.pk]
+    last_modified = stamps.last_modified()
+    last_modified = last_modified.timestamp() if last_modified is not None else None
+    if daily:
+        today = datetime.date.today()
+        vary_on.append(today)
+        last_modified = max(last_modified or 0, datetime.datetime.combine(today, datetime.time.min).timestamp())
+    return quote_etag(stamps.etag(request, vary_on=vary_on)), None if last_modified is None else int(last_modified)
+
+
+def not_modified(request, validators):
+    """
+    304 response when the client's copy of the page is current, otherwise None.
+    """
+    etag, last_modified = validators
+    return get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+
+def add_validators(response, validators):
+    etag, last_modified = validators
+    if response.status_code in (200, 304):
+        response.headers.setdefault('ETag', etag)
+        if last_modified is not None:
+            response.headers.setdefault('Last-Modified', http_date(last_modified))
+    # Страница зависит от пользователя сессии
+    patch_vary_headers(response, ['Cookie'])
+    return response
+
+
+class ConditionalPageMixin:
+    """
+    Conditional GET of a read view: ETag and Last-Modified from page_validators(), 304 for a current
+    If-None-Match (If-Modified-Since) before the view makes any query to the catalog.
+    """
+    version_namespaces = (versioning.CATALOG,)
+    daily = False
+
+    def get_version_namespaces(self):
+        return self.version_namespaces
+
+    def get_stamps(self):
+        # Одним запросом на страницу: те же версии служат ключом кэша её фрагментов
+        if not hasattr(self, 'stamps'):
+            self.stamps = versioning.Stamps(*self.get_version_namespaces())
+        return self.stamps
+
+    def get_validators(self):
+        return page_validators(self.request, self.get_stamps(), self.daily)
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return super().dispatch(request, *args, **kwargs)
+        validators = self.get_validators()
+        response = not_modified(request, validators) or super().dispatch(request, *args, **kwargs)
+        return add_validators(response, validators)
+
+
+def conditional_page(*namespaces):
+    """
+    ConditionalPageMixin for function views.
+    """
+    def decorator(view):
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            validators = page_validators(request, versioning.Stamps(*namespaces))
+            response = not_modified(request, validators) or view(request, *args, **kwargs)
+            return add_validators(response, validators)
+        return inner
+    return decorator
 
 
 @login_required
@@ -18,34 +104,50 @@ def index(request):
     """
     Функция отображения для домашней страницы сайта.
     """
-    # Генерация "количеств" некоторых главных объектов
-    num_books = Book.objects.all().count()
-    num_instances = BookInstance.objects.all().count()
-    # Доступные книги (статус = 'a')
-    num_instances_available = BookInstance.objects.filter(status__exact='a').count()
-    num_authors = Author.objects.count()  # Метод 'all()' применён по умолчанию.
-    # Сессии. Подсчет количества визитов
-    num_visits = request.session.get('num_visits', 0)
-    request.session['num_visits'] = num_visits + 1
+    # Без ETag: число визитов на странице меняется при каждом запросе
+    # "Количества" главных объектов берутся из кэша, см. books_core.counters
+    counts = counters.get_counts()
+    # Сессии. Подсчет количества визитов, сессия записывается не на каждом визите
+    num_visits = visits.record_visit(request)
 
     # Отрисовка HTML-шаблона index.html с данными внутри
     # переменной контекста context
     return render(
         request,
         'index.html',
-        context={'num_books': num_books, 'num_instances': num_instances,
-                 'num_instances_available': num_instances_available, 'num_authors': num_authors,
-                 'num_visits': num_visits},
+        context={**counts, 'num_visits': num_visits},
     )
 
 
-class BookListView(LoginRequiredMixin, generic.ListView):
+class BookListView(LoginRequiredMixin, ConditionalPageMixin, KeysetPaginationMixin, generic.ListView):
     model = Book
     paginate_by = 4
+    # ?sort=available - сначала книги с наибольшим числом доступных экземпляров
+    sort_fields = {
+        'title': ('title', 'id'),
+        'available': ('-availability__available', 'title', 'id'),
+    }
+
+    @property
+    def keyset_fields(self):
+        return self.sort_fields.get(self.request.GET.get('sort'), self.sort_fields['title'])
 
     def get_queryset(self):
         # Book.objects.filter(title__icontains='war')[:5]  # Получить 5 книг, содержащих 'war' в заголовке
-        return Book.objects.all().order_by('title')
+        queryset = Book.objects.select_related('author', 'availability')
+        # Фильтры ?genre=, ?language=, ?author= и ?available=1 (books_core.facets), их можно сочетать
+        queryset = facets.filter_books(queryset, facets.selection(self.request.GET))
+        return queryset.order_by(*self.keyset_fields)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['facets'] = facets.facet_list(self.request.GET)
+        # Ссылки сортировки сохраняют выбранные фильтры
+        query = self.request.GET.copy()
+        for name in ('sort', self.page_kwarg, self.cursor_kwarg):
+            query.pop(name, None)
+        context['filter_query'] = f'{query.urlencode()}&' if query else ''
+        return context
 
     # def get_context_data(self, **kwargs):
     #     # В первую очередь получаем базовую реализацию контекста
@@ -55,56 +157,149 @@ class BookListView(LoginRequiredMixin, generic.ListView):
     #     return context
 
 
-class BookDetailView(generic.DetailView):
-    model = Book
+class BookDetailView(ConditionalPageMixin, generic.DetailView):
+    # Жанры и экземпляры загружаются в шаблоне, только если фрагмент страницы не нашёлся в кэше
+    queryset = Book.objects.select_related('author', 'language', 'availability')
+
+    def get_version_namespaces(self):
+        return versioning.book_namespace(self.kwargs['pk']), versioning.TAXONOMY
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['fragment_version'] = self.get_stamps().key()
+        return context
 
 
-class AuthorListView(generic.ListView):
+class AuthorListView(ConditionalPageMixin, KeysetPaginationMixin, generic.ListView):
     model = Author
     paginate_by = 3
+    keyset_fields = ('last_name', 'first_name', 'id')
+    ordering = keyset_fields
 
     # def get_queryset(self):
     #     return Author.objects.all()
 
 
-class AuthorDetailView(generic.DetailView):
+class AuthorDetailView(ConditionalPageMixin, generic.DetailView):
     model = Author
 
+    def get_version_namespaces(self):
+        return versioning.author_namespace(self.kwargs['pk']),
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['fragment_version'] = self.get_stamps().key()
+        return context
+
     # def get_context_data(self, **kwargs):
     #     context = super().get_context_data(**kwargs)
     #     context['book_list'] = Book.objects.filter(author=self.object)
     #     return context
 
 
-class LoanedBooksByUserListView(LoginRequiredMixin, generic.ListView):
+class LoanedBooksByUserListView(LoginRequiredMixin, ConditionalPageMixin, KeysetPaginationMixin, generic.ListView):
     """
     Обобщённый класс отображения списка взятых книг текущим пользователем
     """
     model = BookInstance
+    # Просроченные экземпляры отмечаются по сегодняшней дате
+    daily = True
+    # Названия книг из снимка каталога той же версии, что и страница
+    version_namespaces = (versioning.CATALOG, versioning.TITLES)
     # context_object_name = 'test_name'   # переопределение контекстного имени
     template_name = 'books_core/bookinstance_list_borrowed_user.html'
     paginate_by = 10
+    keyset_fields = ('due_back', 'id')
 
     def get_queryset(self):
-        return BookInstance.objects.filter(borrower=self.request.user).filter(status__exact='o').order_by('due_back')
+        # Названия книг берутся из books_core.snapshot, без JOIN и объектов Book
+        return (BookInstance.objects.with_overdue()
+                .filter(borrower=self.request.user).filter(status__exact='o').order_by(*self.keyset_fields))
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['bookinstance_list'] = BookInstance.objects.filter(borrower__username=self.request.user)
+        snapshot.attach(context['object_list'], version=self.get_stamps().key(versioning.TITLES))
         return context
 
 
-class BorrowedBookStaffList(PermissionRequiredMixin, generic.ListView):
+class BorrowedBookStaffList(PermissionRequiredMixin, ConditionalPageMixin, KeysetPaginationMixin, generic.ListView):
     model = BookInstance
+    daily = True
+    version_namespaces = (versioning.CATALOG, versioning.TITLES)
     permission_required = 'books_core.staff_perms'
     template_name = 'books_core/bookinstance_list_boorowed_staff.html'
+    context_object_name = 'bookinstance_list_staff'
+    paginate_by = 20
+    keyset_fields = ('due_back', 'id')
+    # Дальше года вперёд фильтр ?due_within не смотрит
+    max_due_within = 365
+
+    def get_queryset(self):
+        queryset = BookInstance.objects.select_related('borrower').with_overdue()
+        # Фильтры: ?overdue=1 - только просроченные, ?due_within=N - возврат в ближайшие N дней
+        if self.request.GET.get('overdue'):
+            queryset = queryset.overdue()
+        due_within = self.request.GET.get('due_within', '')
+        # Только ASCII-цифры: str.isdigit() пропускает '²', а большое число дней не помещается в timedelta
+        if re.fullmatch(r'[0-9]{1,18}', due_within):
+            queryset = queryset.due_within(min(int(due_within), self.max_due_within))
+        return queryset.filter(due_back__isnull=False).order_by(*self.keyset_fields)
 
-    def get_context_data(self, *, object_list=None, **kwargs):
+    def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['bookinstance_list_staff'] = BookInstance.objects.exclude(due_back=None)
+        snapshot.attach(context['object_list'], version=self.get_stamps().key(versioning.TITLES))
         return context
 
 
+SEARCH_RESULTS_PER_PAGE = 20
+SEARCH_MAX_PAGE = 50
+
+
+def _search_page(request):
+    """
+    Reads the query and page number from GET parameters and runs the search.
+    """
+    query = request.GET.get('q', '').strip()
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+    # Глубже SEARCH_MAX_PAGE страниц поиск не листается (и OFFSET не выходит за пределы SQLite)
+    if page > SEARCH_MAX_PAGE:
+        raise Http404
+    hits = search.search_books(query, limit=SEARCH_RESULTS_PER_PAGE, offset=(page - 1) * SEARCH_RESULTS_PER_PAGE)
+    return query, page, hits
+
+
+@conditional_page(versioning.CATALOG)
+def book_search(request):
+    """
+    Страница поиска книг по названию, описанию и автору.
+    """
+    query, page, hits = _search_page(request)
+    return render(request, 'books_core/book_search.html', {
+        'query': query, 'hits': hits, 'page': page,
+        'has_next': len(hits) == SEARCH_RESULTS_PER_PAGE,
+    })
+
+
+@conditional_page(versioning.CATALOG)
+def book_search_api(request):
+    """
+    Поиск книг в формате JSON. Поля title, author и snippet содержат HTML с подсветкой <mark>.
+    """
+    query, page, hits = _search_page(request)
+    return JsonResponse({
+        'query': query,
+        'page': page,
+        'results': [
+            {'id': hit.book_id, 'url': reverse('book-detail', args=[hit.book_id]),
+             'title': hit.title, 'author': hit.author, 'snippet': hit.snippet}
+            for hit in hits
+        ],
+    })
+
+
 @permission_required('books_core.staff_perms')
 def renew_book_librarian(request, pk: int):
     book_inst = get_object_or_404(BookInstance, id=pk)
@@ -118,13 +313,15 @@ def renew_book_librarian(request, pk: int):
 
         # Проверка валидности данных формы:
         if form.is_valid():
-            # Обработка данных из form.cleaned_data
-            # (здесь мы просто присваиваем их полю due_back)
-            book_inst.due_back = form.cleaned_data['renewal_date']
-            book_inst.save()
-
-            # Переход по адресу 'all-borrowed':
-            return HttpResponseRedirect(reverse('all-borrowed'))
+            # Обработка данных из form.cleaned_data: продление через books_core.loans,
+            # параллельный возврат или выдача экземпляра не теряются
+            try:
+                loans.renew(book_inst.pk, form.cleaned_data['renewal_date'])
+            except loans.LoanError as exc:
+                form.add_error(None, str(exc))
+            else:
+                # Переход по адресу 'all-borrowed':
+                return HttpResponseRedirect(reverse('all-borrowed'))
 
     # Если это GET (или какой-либо ещё), создать форму по умолчанию.
     else:
@@ -134,6 +331,31 @@ def renew_book_librarian(request, pk: int):
     return render(request, 'books_core/book_renew_librarian.html', {'form': form, 'bookinst': book_inst})
 
 
+@permission_required('books_core.staff_perms')
+def profiling_stats(request):
+    """
+    Статистика запросов этого процесса по URL (books_core.profiling), ?reset=1 начинает её заново.
+    """
+    summary = profiling.summarize(profiling.registry.raw())
+    if request.GET.get('reset'):
+        profiling.registry.reset()
+    return JsonResponse({'pid': os.getpid(), 'views': summary})
+
+
+@permission_required('books_core.staff_perms')
+def export(request, name):
+    """
+    Потоковая выгрузка books, copies или loans (books_core.exports), ?format=csv|jsonl.
+    """
+    file_format = request.GET.get('format', 'csv')
+    if name not in exports.EXPORTS or file_format not in exports.FORMATS:
+        raise Http404
+    response = StreamingHttpResponse(exports.render(name, file_format),
+                                     content_type=f'{exports.FORMATS[file_format]}; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{exports.filename(name, file_format)}"'
+    return response
+
+
 class AuthorCreate(CreateView):
     model = Author
     fields = '__all__'
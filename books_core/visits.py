@@ -0,0 +1,54 @@
+"""
+Visit counter of the home page that does not write the session on every hit.
+
+Visits are counted in the cache under a per-session key and added to session['num_visits'] every
+settings.VISITS_FLUSH_EVERY visits or settings.VISITS_FLUSH_INTERVAL seconds, so only those requests save
+the session. Visits not flushed yet are lost if the cache entry is evicted.
+"""
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+SESSION_KEY = 'num_visits'
+VISITOR_KEY = 'visitor'
+FLUSHED_AT_KEY = 'visits_flushed_at'
+
+
+def _pending_key(visitor):
+    return f'visits:{visitor}'
+
+
+def record_visit(request):
+    """
+    Counts the current visit and returns the number of earlier visits in this session.
+    """
+    session = request.session
+    stored = session.get(SESSION_KEY, 0)
+    visitor = session.get(VISITOR_KEY)
+    if visitor is None:
+        # Ключ сессии меняется при входе и в signed_cookies, поэтому у посетителя свой постоянный id
+        session[VISITOR_KEY] = uuid.uuid4().hex
+        session[SESSION_KEY] = stored + 1
+        session[FLUSHED_AT_KEY] = time.time()
+        return stored
+
+    key = _pending_key(visitor)
+    cache.add(key, 0, timeout=None)
+    try:
+        pending = cache.incr(key)
+    except ValueError:  # запись вытеснена между add() и incr()
+        cache.set(key, 1, timeout=None)
+        pending = 1
+
+    now = time.time()
+    if pending >= settings.VISITS_FLUSH_EVERY or now - session.get(FLUSHED_AT_KEY, 0) >= settings.VISITS_FLUSH_INTERVAL:
+        session[SESSION_KEY] = stored + pending
+        session[FLUSHED_AT_KEY] = now
+        try:
+            # decr, а не delete: визиты параллельных запросов остаются до следующей записи
+            cache.decr(key, pending)
+        except ValueError:
+            pass
+    return stored + pending - 1
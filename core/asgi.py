@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
 application = get_asgi_application()
+
+# Горячие шаблоны компилируются при старте процесса, а не на первых запросах
+from books_core.templating import precompile  # noqa: E402
+
+precompile()
@@ -35,12 +35,17 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'rest_framework',
 
     # 'learning_app',
     'books_core'
 ]
 
 MIDDLEWARE = [
+    # Статика отдаётся до сессий, аутентификации и профилирования
+    'books_core.middleware.StaticFilesMiddleware',
+    'books_core.profiling.ProfilingMiddleware',
+    'books_core.middleware.ReplicaPinningMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -52,24 +57,51 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'core.urls'
 
+TEMPLATE_CONTEXT_PROCESSORS = [
+    'django.template.context_processors.debug',
+    'django.template.context_processors.request',
+    'django.contrib.auth.context_processors.auth',
+    'django.contrib.messages.context_processors.messages',
+    'books_core.templating.navigation',
+]
+
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates с замером времени отрисовки для books_core.profiling
+        'BACKEND': 'books_core.profiling.ProfilingDjangoTemplates',
         'DIRS': ['templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
-            'context_processors': [
-                'django.template.context_processors.debug',
-                'django.template.context_processors.request',
-                'django.contrib.auth.context_processors.auth',
-                'django.contrib.messages.context_processors.messages',
+            'context_processors': TEMPLATE_CONTEXT_PROCESSORS,
+            # Шаблоны разбираются один раз на процесс, в том числе при DEBUG (Django сбрасывает кэш
+            # загрузчика, когда runserver замечает изменение шаблона)
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
             ],
         },
     },
 ]
 
+# Jinja2 для горячих шаблонов каталога (books_core/jinja2/, см. books_core.jinja), нужен пакет jinja2
+JINJA2_TEMPLATES = False
+JINJA2_BACKEND = {
+    'BACKEND': 'books_core.jinja.ProfilingJinja2',
+    'APP_DIRS': True,
+    'OPTIONS': {
+        'environment': 'books_core.jinja.environment',
+        'context_processors': TEMPLATE_CONTEXT_PROCESSORS,
+    },
+}
+if JINJA2_TEMPLATES:
+    TEMPLATES.insert(0, JINJA2_BACKEND)
+
 WSGI_APPLICATION = 'core.wsgi.application'
 
+# Async-версии страниц каталога (books_core.async_views) для запуска под ASGI (uvicorn core.asgi:application)
+ASYNC_CATALOG_VIEWS = False
+
 EMAIL_DISABLED = False
 
 # Database
@@ -79,9 +111,75 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Соединение живёт между запросами, перед запросом проверяется (books_core.database)
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+    }
+}
+# Прагмы каждого соединения SQLite: 'production' (WAL, synchronous=NORMAL, busy_timeout, кэш и mmap)
+# или 'default' (журнал отката SQLite), см. books_core.database.SQLITE_PROFILES
+SQLITE_PROFILE = 'production'
+
+# Реплики только для чтения, см. books_core.routers. Для проверки без настоящей репликации
+# подойдёт копия базы, которую обновляет manage.py sync_replicas:
+# DATABASES['replica'] = {
+#     'ENGINE': 'django.db.backends.sqlite3',
+#     'NAME': BASE_DIR / 'db.replica.sqlite3',
+#     'TEST': {'MIRROR': 'default'},
+# }
+# DATABASE_REPLICAS = ['replica']
+DATABASE_REPLICAS = []
+DATABASE_ROUTERS = ['books_core.routers.ReplicaRouter']
+# Сколько секунд после POST запросы клиента читают с основной базы
+REPLICA_PIN_SECONDS = 5
+
+# Cache
+# https://docs.djangoproject.com/en/4.0/topics/cache/
+# Счётчики главной страницы живут в кэше (books_core.counters). LocMemCache свой у каждого процесса,
+# при нескольких воркерах нужен общий кэш (memcached, redis).
+
+CACHES = {
+    'default': {
+        # LocMemCache с подсчётом попаданий для books_core.profiling
+        'BACKEND': 'books_core.profiling.InstrumentedLocMemCache',
     }
 }
 
+# Профилирование запросов: заголовок Server-Timing и статистика по URL, см. books_core.profiling
+PROFILING = True
+# Доля профилируемых запросов (запросы с INTERNAL_IPS профилируются всегда), на нагруженном сервере можно уменьшить
+PROFILING_SAMPLE_RATE = 1.0
+# Server-Timing отдаётся только этим адресам и сотрудникам
+INTERNAL_IPS = ['127.0.0.1']
+# Сколько последних длительностей на URL хранится для перцентилей
+PROFILING_SAMPLES = 1000
+
+# Постраничный вывод списков по курсору (keyset) вместо номеров страниц, см. books_core.pagination
+KEYSET_PAGINATION = False
+
+REST_FRAMEWORK = {
+    # API каталога только для чтения
+    'DEFAULT_PERMISSION_CLASSES': ['rest_framework.permissions.AllowAny'],
+}
+
+# Sessions
+# https://docs.djangoproject.com/en/4.0/topics/http/sessions/
+# 'db' - каждая запись сессии идёт в таблицу django_session, 'cached_db' - чтение из кэша,
+# 'signed_cookies' - сессия хранится в cookie, база не используется
+SESSION_STRATEGY = 'db'
+SESSION_ENGINE = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}[SESSION_STRATEGY]
+
+# Счётчик визитов копится в кэше и записывается в сессию раз в N визитов или M секунд, см. books_core.visits
+VISITS_FLUSH_EVERY = 10
+VISITS_FLUSH_INTERVAL = 300
+
+# Пользователь сессии берётся из кэша, а не из базы на каждом запросе, см. books_core.auth
+AUTHENTICATION_BACKENDS = ['books_core.auth.CachedModelBackend']
+
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
 
@@ -117,12 +215,17 @@ USE_TZ = True
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/4.0/howto/static-files/
 
-STATIC_ROOT = 'staticccc/'  # сАбака кусачая
+# Сюда собирает файлы manage.py collectstatic, отсюда их отдаёт books_core.middleware.StaticFilesMiddleware
+STATIC_ROOT = BASE_DIR / 'staticfiles'
 # префикс к урлу
 STATIC_URL = 'static/'
 STATICFILES_DIRS = [
     BASE_DIR / 'static'
 ]
+# Без DEBUG имена с хэшем содержимого (кэшируются навсегда) и заранее сжатые .gz/.br, см. books_core.staticfiles.
+# Манифест создаёт collectstatic, поэтому при DEBUG используется обычное хранилище
+if not DEBUG:
+    STATICFILES_STORAGE = 'books_core.staticfiles.CompressedManifestStaticFilesStorage'
 
 MEDIA_ROOT = 'media/'
 MEDIA_URL = 'media/'
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
 application = get_wsgi_application()
+
+# Горячие шаблоны компилируются при старте процесса, а не на первых запросах
+from books_core.templating import precompile  # noqa: E402
+
+precompile()